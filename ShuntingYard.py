@@ -1,5 +1,7 @@
 import re
 
+from cardinality import CONSTRAINT_PATTERN, CONSTRAINT_REGEX, strict_constraint
+
 
 class ShuntingYardConverter:
     def __init__(self, expression):
@@ -25,10 +27,17 @@ class ShuntingYardConverter:
     def convert(self):
         # Tokenize the input
         print(f"Converting the expression: {self.expression}")
-        tokens = re.findall(r"[A-Z][0-9]*|¬|∧|∨|⇒|⇔|[()]|⊤|⊥", self.expression)
+        tokens = re.findall(rf"{CONSTRAINT_PATTERN}|[A-Z][0-9]*|¬|∧|∨|⇒|⇔|[()]|⊤|⊥", self.expression)
+        constraints = [token for token in tokens if CONSTRAINT_REGEX.fullmatch(token)]
+        if len(constraints) != len(re.findall(r"AtMost|AtLeast|Exactly", self.expression)):
+            raise Exception("Error: Malformed cardinality constraint, expected e.g. AtMost(2; A, B, ¬C) or AtLeast(3; 2*A, B)")
         for token in tokens:
             print(f"Processing token: {token}")
-            if re.match(r"[A-Z][0-9]*|⊤|⊥", token):  # Atomic proposition
+            if CONSTRAINT_REGEX.fullmatch(token):  # Treated as an operand, written in strict syntax
+                token = strict_constraint(token)
+                print(f"Token is a cardinality constraint, adding to output queue: {token}")
+                self.output_queue.append(token)
+            elif re.match(r"[A-Z][0-9]*|⊤|⊥", token):  # Atomic proposition
                 print(f"Token is atomic proposition, adding to output queue: {token}")
                 self.output_queue.append(token)
             elif token == '(':
@@ -0,0 +1,448 @@
+from cardinality import CONSTRAINTS, constraint_range
+
+FALSE, TRUE = 0, 1
+
+
+class BDD:
+    """
+    Reduced ordered binary decision diagrams sharing one node store.
+    Nodes are ints: 0 and 1 are the terminals, every other node has a variable, a low (false)
+    and a high (true) child. Two nodes are equal exactly when they denote the same function, so
+    validity and equivalence checks are comparisons once the diagrams are built.
+
+    Nodes returned by the public operations carry a reference owned by the caller; release it
+    with deref. Garbage collection and reordering only happen when a public operation starts,
+    and free every node that no referenced node can reach. Reordering keeps each node id
+    denoting the same function, so references stay valid.
+    """
+
+    def __init__(self, gc_threshold=100000, auto_reorder=False, reorder_threshold=5000):
+        self.var = [None, None]
+        self.low = [FALSE, TRUE]
+        self.high = [FALSE, TRUE]
+        self.refs = [1, 1]
+        self.free = []
+        self.names = []
+        self.index = {}
+        self.level_of = []
+        self.var_at = []
+        self.unique = []  # One table per variable: (low, high) -> node
+        self.cache = {}
+        self.parents = None  # While reordering: node -> references from parents and from outside
+        self.gc_threshold = gc_threshold
+        self.auto_reorder = auto_reorder
+        self.reorder_threshold = reorder_threshold
+        self.counters = {"cache_lookups": 0, "cache_hits": 0, "gc_runs": 0, "collected": 0,
+                         "reorderings": 0, "swaps": 0, "peak_nodes": 0}
+
+    # Node store
+
+    def variable(self, name):
+        """The variable's index, adding it below all existing variables if it is new."""
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+            self.level_of.append(len(self.var_at))
+            self.var_at.append(self.index[name])
+            self.unique.append({})
+        return self.index[name]
+
+    def level(self, node):
+        return self.level_of[self.var[node]] if node > TRUE else len(self.var_at)
+
+    def node_count(self):
+        return len(self.var) - 2 - len(self.free)
+
+    def mk(self, var, low, high):
+        if low == high:
+            return low
+        table = self.unique[var]
+        node = table.get((low, high))
+        if node is not None:
+            return node
+        if self.free:
+            node = self.free.pop()
+            self.var[node], self.low[node], self.high[node], self.refs[node] = var, low, high, 0
+        else:
+            node = len(self.var)
+            self.var.append(var)
+            self.low.append(low)
+            self.high.append(high)
+            self.refs.append(0)
+        table[(low, high)] = node
+        self.counters["peak_nodes"] = max(self.counters["peak_nodes"], self.node_count())
+        return node
+
+    def ref(self, node):
+        self.refs[node] += 1
+        return node
+
+    def deref(self, node):
+        if node > TRUE and self.refs[node] > 0:
+            self.refs[node] -= 1
+
+    def cofactors(self, node, var):
+        if node > TRUE and self.var[node] == var:
+            return self.low[node], self.high[node]
+        return node, node
+
+    # Operations
+
+    def ite(self, f, g, h):
+        """If-then-else, the one operation every connective is built from."""
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+        key = (f, g, h)
+        self.counters["cache_lookups"] += 1
+        result = self.cache.get(key)
+        if result is not None:
+            self.counters["cache_hits"] += 1
+            return result
+        top = min(self.level(f), self.level(g), self.level(h))
+        var = self.var_at[top]
+        f0, f1 = self.cofactors(f, var)
+        g0, g1 = self.cofactors(g, var)
+        h0, h1 = self.cofactors(h, var)
+        result = self.mk(var, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+        self.cache[key] = result
+        return result
+
+    def negate_node(self, f):
+        return self.ite(f, FALSE, TRUE)
+
+    def apply_node(self, operator, f, g):
+        if operator == "∧":
+            return self.ite(f, g, FALSE)
+        if operator == "∨":
+            return self.ite(f, TRUE, g)
+        if operator == "⇒":
+            return self.ite(f, g, TRUE)
+        if operator == "⇔":
+            return self.ite(f, g, self.negate_node(g))
+        raise ValueError(f"Unknown connective {operator}")
+
+    def threshold(self, literals, weights, low, high):
+        """
+        Diagram of low ≤ Σ weights[i]·literals[i] ≤ high, built over the partial sums: the node for
+        (operand i, sum so far) is shared by every prefix reaching it, so there are O(n·Σ weights).
+        """
+        remaining = [0] * (len(literals) + 1)
+        for i in reversed(range(len(literals))):
+            remaining[i] = remaining[i + 1] + weights[i]
+        memo = {}
+
+        def at(i, total):
+            if total > high or total + remaining[i] < low:
+                return FALSE
+            if total >= low and total + remaining[i] <= high:
+                return TRUE
+            if (i, total) not in memo:
+                memo[(i, total)] = self.ite(literals[i], at(i + 1, total + weights[i]), at(i + 1, total))
+            return memo[(i, total)]
+
+        return at(0, 0)
+
+    def apply(self, operator, f, g):
+        self.safe_point()
+        return self.ref(self.apply_node(operator, f, g))
+
+    def negate(self, f):
+        self.safe_point()
+        return self.ref(self.negate_node(f))
+
+    def literal(self, name):
+        return self.ref(self.mk(self.variable(name), FALSE, TRUE))
+
+    def build(self, root):
+        """Builds the diagram of a formula tree from LogicalWFFParser (or formula_converter)."""
+        self.safe_point()
+        memo = {}
+
+        def convert(node):
+            if id(node) in memo:
+                return memo[id(node)]
+            if node.name == "⊤":
+                result = TRUE
+            elif node.name == "⊥":
+                result = FALSE
+            elif node.is_leaf:
+                result = self.mk(self.variable(node.name), FALSE, TRUE)
+            elif node.name == "¬":
+                result = self.negate_node(convert(node.children[0]))
+            elif node.name in ["∧", "∨"]:
+                result = convert(node.children[0])
+                for child in node.children[1:]:
+                    result = self.apply_node(node.name, result, convert(child))
+            elif node.name in CONSTRAINTS:
+                low, high = constraint_range(node.name, node.bound, sum(node.weights))
+                result = self.threshold([convert(child) for child in node.children], node.weights, low, high)
+            else:
+                result = self.apply_node(node.name, convert(node.children[0]), convert(node.children[1]))
+            memo[id(node)] = result
+            return result
+
+        return self.ref(convert(root))
+
+    # Queries
+
+    def is_tautology(self, f):
+        return f == TRUE
+
+    def is_satisfiable(self, f):
+        return f != FALSE
+
+    def equivalent(self, f, g):
+        return f == g
+
+    def support(self, f):
+        seen, names = set(), set()
+        stack = [f]
+        while stack:
+            node = stack.pop()
+            if node <= TRUE or node in seen:
+                continue
+            seen.add(node)
+            names.add(self.names[self.var[node]])
+            stack.extend((self.low[node], self.high[node]))
+        return names
+
+    def count_models(self, f, variables=None):
+        """
+        Satisfying assignments of f over the given variable names (default: its support), in one
+        pass over the diagram: a skipped level doubles the count.
+        """
+        variables = self.support(f) if variables is None else set(variables)
+        missing = self.support(f) - variables
+        if missing:
+            raise ValueError(f"The formula depends on variables outside the count: {sorted(missing)}")
+        counts = {FALSE: 0, TRUE: 1}
+
+        def count(node):
+            # Assignments to the levels from this node's level down to the bottom
+            if node not in counts:
+                level = self.level(node)
+                low, high = self.low[node], self.high[node]
+                counts[node] = (count(low) << (self.level(low) - level - 1)) + \
+                               (count(high) << (self.level(high) - level - 1))
+            return counts[node]
+
+        # Count over every variable of the manager, then drop the ones outside the count (f does
+        # not depend on them) and add the named ones the manager has not seen
+        total = count(f) << self.level(f)
+        inside = len(variables & set(self.names))
+        return (total >> (len(self.var_at) - inside)) << (len(variables) - inside)
+
+    def satisfying_assignment(self, f):
+        if f == FALSE:
+            return None
+        assignment = {}
+        while f > TRUE:
+            name = self.names[self.var[f]]
+            if self.high[f] != FALSE:
+                assignment[name], f = True, self.high[f]
+            else:
+                assignment[name], f = False, self.low[f]
+        return assignment
+
+    # Garbage collection
+
+    def safe_point(self):
+        if self.node_count() > self.gc_threshold:
+            self.collect()
+            if self.node_count() > self.gc_threshold // 2:
+                self.gc_threshold *= 2
+        if self.auto_reorder and self.node_count() > self.reorder_threshold:
+            self.reorder()
+            self.reorder_threshold = max(self.reorder_threshold, 2 * self.node_count())
+
+    def mark(self):
+        alive = {FALSE, TRUE}
+        stack = [node for node in range(2, len(self.var)) if self.refs[node] > 0 and self.var[node] is not None]
+        while stack:
+            node = stack.pop()
+            if node in alive:
+                continue
+            alive.add(node)
+            stack.append(self.low[node])
+            stack.append(self.high[node])
+        return alive
+
+    def collect(self):
+        """Mark and sweep from the referenced nodes; the computed table is dropped with them."""
+        alive = self.mark()
+        collected = 0
+        for table in self.unique:
+            for key, node in list(table.items()):
+                if node not in alive:
+                    del table[key]
+                    self.var[node] = None
+                    self.free.append(node)
+                    collected += 1
+        if collected:
+            self.cache.clear()
+        self.counters["gc_runs"] += 1
+        self.counters["collected"] += collected
+        return collected
+
+    # Reordering
+
+    def swap(self, level):
+        """
+        Exchanges the variables at level and level + 1 in place. A node x ? f1 : f0 whose children
+        test y becomes y ? (x ? f11 : f01) : (x ? f10 : f00) under the same id, so it keeps its
+        function and every reference to it stays valid. While reordering, the y nodes it no longer
+        points to are freed as soon as nothing references them, so the unique tables only hold live nodes.
+        """
+        x, y = self.var_at[level], self.var_at[level + 1]
+        self.var_at[level], self.var_at[level + 1] = y, x
+        self.level_of[x], self.level_of[y] = level + 1, level
+        for (low, high), node in list(self.unique[x].items()):
+            if not (low > TRUE and self.var[low] == y) and not (high > TRUE and self.var[high] == y):
+                continue
+            f00, f01 = self.cofactors(low, y)
+            f10, f11 = self.cofactors(high, y)
+            del self.unique[x][(low, high)]
+            new_low, new_high = self.mk(x, f00, f10), self.mk(x, f01, f11)
+            self.var[node], self.low[node], self.high[node] = y, new_low, new_high
+            self.unique[y][(new_low, new_high)] = node
+            if self.parents is not None:
+                # Count the new edges before dropping the old ones, which may lead to the same nodes
+                self.attach(new_low)
+                self.attach(new_high)
+                self.release(low)
+                self.release(high)
+        self.counters["swaps"] += 1
+
+    def attach(self, node):
+        if node > TRUE:
+            if node not in self.parents:  # Just made by mk
+                self.parents[node] = 0
+                self.attach(self.low[node])
+                self.attach(self.high[node])
+            self.parents[node] += 1
+
+    def release(self, node):
+        if node <= TRUE:
+            return
+        self.parents[node] -= 1
+        if self.parents[node] == 0:
+            del self.parents[node]
+            del self.unique[self.var[node]][(self.low[node], self.high[node])]
+            self.var[node] = None
+            self.free.append(node)
+            self.release(self.low[node])
+            self.release(self.high[node])
+
+    def live_size(self):
+        return len(self.mark()) - 2
+
+    def reorder(self, max_growth=1.2):
+        """
+        Sifting: each variable, most populous first, is moved through every level by adjacent
+        swaps and left where the diagram was smallest. A direction is abandoned once the size
+        grows past max_growth times the best seen. Each swap only changes the unique tables of
+        the two levels it exchanges, so the size is kept up to date from their counts.
+        """
+        self.collect()
+        self.parents = {}
+        for node in range(2, len(self.var)):
+            if self.var[node] is not None:
+                self.parents[node] = self.parents.get(node, 0) + self.refs[node]
+                for child in (self.low[node], self.high[node]):
+                    if child > TRUE:
+                        self.parents[child] = self.parents.get(child, 0) + 1
+        size = self.node_count()
+
+        def swap_counted(level):
+            pair = (self.unique[self.var_at[level]], self.unique[self.var_at[level + 1]])
+            before = len(pair[0]) + len(pair[1])
+            self.swap(level)
+            return size + len(pair[0]) + len(pair[1]) - before
+
+        variables = sorted(range(len(self.names)), key=lambda v: -len(self.unique[v]))
+        for var in variables:
+            best_size = size
+            best_level = start = self.level_of[var]
+            # Down to the bottom, then up to the top
+            while self.level_of[var] < len(self.var_at) - 1:
+                size = swap_counted(self.level_of[var])
+                if size < best_size:
+                    best_size, best_level = size, self.level_of[var]
+                elif size > max_growth * best_size:
+                    break
+            while self.level_of[var] > 0:
+                size = swap_counted(self.level_of[var] - 1)
+                if size < best_size:
+                    best_size, best_level = size, self.level_of[var]
+                elif size > max_growth * best_size and self.level_of[var] < start:
+                    break
+            while self.level_of[var] < best_level:
+                size = swap_counted(self.level_of[var])
+            while self.level_of[var] > best_level:
+                size = swap_counted(self.level_of[var] - 1)
+        self.parents = None
+        # Freed ids may be reused for other functions, so cached results about them are stale
+        self.cache.clear()
+        self.counters["reorderings"] += 1
+        return size
+
+    def order(self):
+        return [self.names[var] for var in self.var_at]
+
+    # Output
+
+    def to_dot(self, roots, names=None):
+        """Graphviz source for the given root nodes; dashed edges are the low (false) children."""
+        roots = [roots] if isinstance(roots, int) else list(roots)
+        names = names or [f"f{i}" for i in range(len(roots))]
+        lines = ["digraph BDD {", '  node0 [label="0", shape=box];', '  node1 [label="1", shape=box];']
+        seen = set()
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if node <= TRUE or node in seen:
+                continue
+            seen.add(node)
+            lines.append(f'  node{node} [label="{self.names[self.var[node]]}", shape=circle];')
+            lines.append(f"  node{node} -> node{self.low[node]} [style=dashed];")
+            lines.append(f"  node{node} -> node{self.high[node]};")
+            stack.extend((self.low[node], self.high[node]))
+        for name, root in zip(names, roots):
+            lines.append(f'  "{name}" [shape=plaintext];')
+            lines.append(f'  "{name}" -> node{root};')
+        lines.append("}")
+        return "\n".join(lines)
+
+    def stats(self):
+        lookups = self.counters["cache_lookups"]
+        return {
+            "nodes": self.node_count(),
+            "variables": len(self.names),
+            "cache_entries": len(self.cache),
+            "cache_hit_rate": self.counters["cache_hits"] / lookups if lookups else 0.0,
+            **self.counters,
+        }
+
+
+if __name__ == "__main__":
+    from anytree import Node
+
+    manager = BDD()
+    # (A1 ∧ B1) ∨ (A2 ∧ B2) ∨ ... is linear in the interleaved order and exponential when all A come first
+    n = 8
+    for prefix in "AB":
+        for i in range(1, n + 1):
+            manager.variable(f"{prefix}{i}")
+    formula = Node("∨", children=[Node("∧", children=[Node(f"A{i}"), Node(f"B{i}")]) for i in range(1, n + 1)])
+    f = manager.build(formula)
+    print("Nodes before sifting:", manager.live_size())
+    print("Nodes after sifting:", manager.reorder())
+    print("Order:", " ".join(manager.order()))
+    print("Models:", manager.count_models(f))
+    print(manager.stats())
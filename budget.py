@@ -0,0 +1,76 @@
+import os
+import time
+
+MEMORY_PERIOD = 1024  # Checks between two readings of the process memory
+
+
+def memory_in_use():
+    """Resident size of the process in bytes, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+class BudgetExceeded(Exception):
+    """
+    The UNKNOWN result of an operation stopped by its Budget: reason names the limit that was
+    passed and stats holds what the operation had done by then. Operations return it in place of
+    their usual result; it is only raised inside their recursions and caught before it leaves them.
+    """
+
+    def __init__(self, reason, stats):
+        super().__init__(reason, stats)
+        self.reason = reason
+        self.stats = stats
+
+    def __str__(self):
+        details = ", ".join(f"{key}: {value}" for key, value in self.stats.items())
+        return f"Budget exceeded ({self.reason}; {details})"
+
+
+class Budget:
+    """
+    Limits for long-running operations: seconds of wall-clock time, a number of steps (rows,
+    distributions, resolvents, branches or conflicts, depending on the operation) and an
+    approximate memory cap in megabytes, compared with the resident size of the process every
+    MEMORY_PERIOD checks. Operations check it cooperatively in their main loop. One budget can be
+    shared by several calls: the steps add up and the deadline is common.
+    """
+
+    def __init__(self, seconds=None, steps=None, memory=None):
+        self.start = time.monotonic()
+        self.deadline = None if seconds is None else self.start + seconds
+        self.steps = steps
+        self.memory = None if memory is None else memory * 1024 * 1024
+        self.used = 0
+        self.checks = 0
+        self.reason = None
+
+    def exhausted(self, steps=1):
+        """Counts steps and returns True once any limit has been passed."""
+        self.used += steps
+        if self.reason is not None:
+            return True
+        if self.steps is not None and self.used > self.steps:
+            self.reason = f"more than {self.steps} steps"
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = f"deadline of {self.deadline - self.start:g}s passed"
+        elif self.memory is not None:
+            if self.checks % MEMORY_PERIOD == 0:
+                in_use = memory_in_use()
+                if in_use is not None and in_use > self.memory:
+                    self.reason = f"memory above {self.memory // (1024 * 1024)}MB"
+            self.checks += 1
+        return self.reason is not None
+
+    def charge(self, steps=1):
+        """exhausted for deep recursions: raises the BudgetExceeded for their entry point to return."""
+        if self.exhausted(steps):
+            raise self.exceeded()
+
+    def exceeded(self, **stats):
+        """The BudgetExceeded result, with the operation's statistics, the steps and the elapsed time."""
+        stats.update(steps=self.used, seconds=round(time.monotonic() - self.start, 3))
+        return BudgetExceeded(self.reason, stats)
@@ -0,0 +1,211 @@
+import re
+from itertools import combinations, count
+
+from anytree import Node
+
+CONSTRAINTS = ("AtMost", "AtLeast", "Exactly")
+# An operand is a literal with an optional positive weight: A, 2*A, (¬A) or, in relaxed syntax, ¬A
+OPERAND = r"(?:[0-9]+\*)?(?:\(¬[A-Z][0-9]*\)|¬?[A-Z][0-9]*)"
+CONSTRAINT_PATTERN = rf"(?:AtMost|AtLeast|Exactly)\([0-9]+;{OPERAND}(?:,{OPERAND})*\)"
+CONSTRAINT_REGEX = re.compile(CONSTRAINT_PATTERN)
+OPERAND_REGEX = re.compile(r"(?:([0-9]+)\*)?(\(¬|¬)?([A-Z][0-9]*)\)?")
+
+
+def split_constraint(text):
+    """(name, bound, [(weight, literal)]) of a constraint written AtMost(2;A,3*B,(¬C))."""
+    name, rest = text[:-1].split("(", 1)
+    bound, operands = rest.split(";", 1)
+    parsed = []
+    for operand in operands.split(","):
+        weight, negation, atom = OPERAND_REGEX.fullmatch(operand).groups()
+        if weight is not None and int(weight) == 0:
+            raise Exception(f"Error: Weights must be positive in {text}")
+        parsed.append((1 if weight is None else int(weight), "¬" + atom if negation else atom))
+    return name, int(bound), parsed
+
+
+def strict_constraint(text):
+    """Rewrites a constraint in strict syntax, with every negated operand in parentheses."""
+    name, bound, operands = split_constraint(text)
+    return constraint_expression(name, bound, [weight for weight, _ in operands],
+                                 [f"({literal})" if literal.startswith("¬") else literal for _, literal in operands])
+
+
+def constraint_expression(name, bound, weights, operands):
+    terms = [operand if weight == 1 else f"{weight}*{operand}" for weight, operand in zip(weights, operands)]
+    return f"{name}({bound};{','.join(terms)})"
+
+
+def literal_node(literal):
+    if literal.startswith("¬"):
+        return Node("¬", children=[Node(literal[1:])])
+    return Node(literal)
+
+
+def constraint_node(text):
+    """The formula tree of a constraint: its literals are the children, bound and weights are attributes."""
+    name, bound, operands = split_constraint(text)
+    return Node(name, bound=bound, weights=[weight for weight, _ in operands],
+                children=[literal_node(literal) for _, literal in operands])
+
+
+def make_constraint(name, bound, weights, children):
+    """A constraint node, or ⊤/⊥ when the bound alone decides it."""
+    low, high = constraint_range(name, bound, sum(weights))
+    if high < 0 or low > sum(weights) or low > high:
+        return Node("⊥")
+    if low <= 0 and high >= sum(weights):
+        return Node("⊤")
+    return Node(name, bound=bound, weights=list(weights), children=children)
+
+
+def constraint_attributes(node):
+    """Keyword arguments that recreate a node's bound and weights (none for a connective or an atom)."""
+    if node.name in CONSTRAINTS:
+        return {"bound": node.bound, "weights": list(node.weights)}
+    return {}
+
+
+def constraint_label(node):
+    """The name of a node, extended with the bound and weights for a constraint so equal labels mean equal operators."""
+    if node.name in CONSTRAINTS:
+        return node.name, node.bound, tuple(node.weights)
+    return node.name
+
+
+def constraint_range(name, bound, total):
+    """The (low, high) range the weighted sum of the true operands must fall in."""
+    if name == "AtMost":
+        return 0, bound
+    if name == "AtLeast":
+        return bound, total
+    return bound, bound
+
+
+def constraint_holds(node, values):
+    """Evaluates a constraint node given the truth values of its operand subtrees."""
+    total = sum(weight for weight, value in zip(node.weights, values) if value)
+    low, high = constraint_range(node.name, node.bound, sum(node.weights))
+    return low <= total <= high
+
+
+def negate_constraint(node, children):
+    """
+    The negation of a constraint over the given (already detached) operands:
+    ¬AtMost(k) = AtLeast(k+1), ¬AtLeast(k) = AtMost(k-1) and ¬Exactly(k) = AtMost(k-1) ∨ AtLeast(k+1).
+    """
+    if node.name == "AtMost":
+        return make_constraint("AtLeast", node.bound + 1, node.weights, children)
+    if node.name == "AtLeast":
+        return make_constraint("AtMost", node.bound - 1, node.weights, children)
+    copies = [Node(child.name, children=[Node(grandchild.name) for grandchild in child.children]) for child in children]
+    below = make_constraint("AtMost", node.bound - 1, node.weights, children)
+    above = make_constraint("AtLeast", node.bound + 1, node.weights, copies)
+    return Node("∨", children=[below, above])
+
+
+def node_literal(node):
+    return "¬" + node.children[0].name if node.name == "¬" else node.name
+
+
+def choose(n, r):
+    result = 1
+    for i in range(min(r, n - r)):
+        result = result * (n - i) // (i + 1)
+    return result if 0 <= r <= n else 0
+
+
+def at_most_clauses(literals, weights, bound, fresh):
+    """
+    Clauses for Σ weights[i]·literals[i] ≤ bound. Literals heavier than the bound are forced false;
+    small unweighted constraints use the pairwise (binomial) encoding, one clause per set of bound+1
+    literals, and the rest the weighted sequential counter with O(n·bound) clauses. Register
+    variables are named c<constraint>_<i>_<j> and mean "the first i operands weigh at least j".
+    """
+    if bound < 0:
+        return [set()]
+    clauses = [{complement(literal)} for literal, weight in zip(literals, weights) if weight > bound]
+    kept = [(literal, weight) for literal, weight in zip(literals, weights) if weight <= bound]
+    if sum(weight for _, weight in kept) <= bound:
+        return clauses
+    n = len(kept)
+    if all(weight == 1 for _, weight in kept) and choose(n, bound + 1) <= 2 * n * bound:
+        for subset in combinations([literal for literal, _ in kept], bound + 1):
+            clauses.append({complement(literal) for literal in subset})
+        return clauses
+    prefix = f"c{next(fresh)}"
+
+    def register(i, j):
+        return f"{prefix}_{i}_{j}"
+
+    for i, (literal, weight) in enumerate(kept, 1):
+        if i > 1:
+            # Adding a literal whose weight would pass the bound is forbidden
+            clauses.append({complement(literal), "¬" + register(i - 1, bound + 1 - weight)})
+        if i == n:
+            break
+        for j in range(1, weight + 1):
+            clauses.append({complement(literal), register(i, j)})
+        if i > 1:
+            for j in range(1, bound + 1):
+                clauses.append({"¬" + register(i - 1, j), register(i, j)})
+            for j in range(1, bound - weight + 1):
+                clauses.append({complement(literal), "¬" + register(i - 1, j), register(i, j + weight)})
+    return clauses
+
+
+def complement(literal):
+    return literal[1:] if literal.startswith("¬") else "¬" + literal
+
+
+def constraint_clauses(node, fresh):
+    """Clauses of a constraint node; AtLeast(k) is encoded as AtMost(total-k) over the complemented literals."""
+    literals = [node_literal(child) for child in node.children]
+    total = sum(node.weights)
+    low, high = constraint_range(node.name, node.bound, total)
+    clauses = []
+    if high < total:
+        clauses.extend(at_most_clauses(literals, node.weights, high, fresh))
+    if low > 0:
+        clauses.extend(at_most_clauses([complement(literal) for literal in literals], node.weights, total - low, fresh))
+    return clauses
+
+
+def is_auxiliary(name):
+    """Counter registers and selectors start with a lowercase letter, so they never clash with atoms."""
+    return name[:1].islower()
+
+
+def formula_clauses(node):
+    """
+    CNF clauses (a list of sets) of a formula in NNF that may contain constraints. Constraints
+    that are conjuncts of the formula are encoded directly; a nested one is replaced by a
+    selector x<n> and its clauses are only required when the selector is true, which is enough
+    because NNF leaves every constraint in positive position. The rest of the formula goes
+    through iter_normal_form_clauses.
+    """
+    from formula_converter import iter_normal_form_clauses
+
+    fresh = count(1)
+    clauses = []
+
+    def replace(current):
+        if current.name in CONSTRAINTS:
+            selector = f"x{next(fresh)}"
+            clauses.extend(clause | {"¬" + selector} for clause in constraint_clauses(current, fresh))
+            return Node(selector)
+        if current.children:
+            current.children = [replace(child) for child in current.children]
+        return current
+
+    conjuncts = node.children if node.name == "∧" else (node,)
+    rest = []
+    for conjunct in conjuncts:
+        if conjunct.name in CONSTRAINTS:
+            clauses.extend(constraint_clauses(conjunct, fresh))
+        else:
+            rest.append(conjunct)
+    if rest:
+        remaining = rest[0] if len(rest) == 1 else Node("∧", children=rest)
+        clauses = [set(clause) for clause in iter_normal_form_clauses(replace(remaining), "cnf")] + clauses
+    return clauses
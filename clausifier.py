@@ -0,0 +1,289 @@
+import re
+
+from lexer import user_defined_symbols
+
+QUANTIFIERS = ("∀", "∃", "∄", "∃!")
+CONNECTIVES = ("¬", "∧", "∨", "⇒", "⇔")
+NUMBER_SETS = {"ℝ", "ℕ", "ℤ", "ℚ", "ℂ"}
+variable_regex = re.compile(r"[a-zεδ][0-9]*(_[0-9]+)?")
+
+
+class FreshNames:
+    """Generates variable, Skolem and definition names that do not clash with each other."""
+
+    def __init__(self):
+        self.variable_counter = 0
+        self.skolem_counter = 0
+        self.definition_counter = 0
+
+    def variable(self, base):
+        self.variable_counter += 1
+        return f"{base.split('_')[0]}_{self.variable_counter}"
+
+    def skolem(self):
+        self.skolem_counter += 1
+        return f"sk{self.skolem_counter}"
+
+    def definition(self):
+        self.definition_counter += 1
+        return f"_D{self.definition_counter}"
+
+
+def is_variable(term):
+    """Variables are lowercase names that are not user defined constants."""
+    return (isinstance(term, str) and term not in user_defined_symbols["constants"]
+            and term not in NUMBER_SETS and bool(variable_regex.fullmatch(term)))
+
+
+def negate_literal(literal):
+    return literal[1] if literal[0] == "¬" else ("¬", literal)
+
+
+def normalize_term(term, renaming):
+    """
+    Brings a math.py term into the uniform (symbol, (arguments...)) shape used by clauses.
+    Prefix functions carry a list of arguments, infix and postfix ones carry them inline.
+    """
+    if not isinstance(term, tuple):
+        return renaming.get(term, term) if isinstance(term, str) else term
+    arguments = term[1] if len(term) == 2 and isinstance(term[1], list) else term[1:]
+    return term[0], tuple(normalize_term(argument, renaming) for argument in arguments)
+
+
+def rename_apart(formula, fresh=None):
+    """
+    Step 1: gives every quantifier its own variable and normalizes atoms and terms.
+    Free variables keep their names.
+    """
+    fresh = fresh or FreshNames()
+
+    def rename(node, renaming):
+        name = node[0]
+        if name in QUANTIFIERS:
+            variable = fresh.variable(node[1])
+            return name, variable, rename(node[2], {**renaming, node[1]: variable})
+        if name in CONNECTIVES:
+            return (name,) + tuple(rename(child, renaming) for child in node[1:])
+        return normalize_term(node, renaming)
+
+    return rename(formula, {})
+
+
+def substitute(formula, mapping):
+    """Replaces variables in a normalized formula or term."""
+    if isinstance(formula, str):
+        return mapping.get(formula, formula)
+    if not isinstance(formula, tuple):
+        return formula
+    name = formula[0]
+    if name in QUANTIFIERS:
+        inner = {key: value for key, value in mapping.items() if key != formula[1]}
+        return name, formula[1], substitute(formula[2], inner)
+    if name in CONNECTIVES:
+        return (name,) + tuple(substitute(child, mapping) for child in formula[1:])
+    return name, tuple(substitute(argument, mapping) for argument in formula[1])
+
+
+def free_variables(formula, bound=frozenset()):
+    if isinstance(formula, str):
+        return {formula} if formula not in bound and is_variable(formula) else set()
+    if not isinstance(formula, tuple):
+        return set()
+    name = formula[0]
+    if name in QUANTIFIERS:
+        return free_variables(formula[2], bound | {formula[1]})
+    children = formula[1:] if name in CONNECTIVES else formula[1]
+    found = set()
+    for child in children:
+        found |= free_variables(child, bound)
+    return found
+
+
+def universal_closure(formula):
+    """Binds the free variables of a normalized formula universally, as clause form assumes."""
+    for variable in sorted(free_variables(formula), reverse=True):
+        formula = ("∀", variable, formula)
+    return formula
+
+
+def is_literal(node):
+    return node[0] not in CONNECTIVES + QUANTIFIERS or (node[0] == "¬" and node[1][0] not in CONNECTIVES + QUANTIFIERS)
+
+
+def to_nnf(formula, fresh=None):
+    """
+    Step 2: pushes negations down to the atoms by tracking polarity, so every node is visited once.
+    ⇒, ⇔, ∄ and ∃! are rewritten into ∧, ∨, ∀ and ∃ on the way.
+    Expanding ⇔ uses each operand in both polarities, which doubles it at every nested ⇔, so an
+    operand that is not a literal is first named by a definition atom D(x̄) over its free
+    variables: the ⇔ is expanded over D(x̄), and ∀x̄(D(x̄) ⇔ operand) is expanded once and
+    conjoined to the result. Equal operands share their definition, so the output stays linear in
+    size; it is equisatisfiable with the input rather than equivalent.
+    """
+    fresh = fresh or FreshNames()
+    definitions = {}  # operand -> definition atom
+    pending = []
+
+    def define(operand):
+        if is_literal(operand):
+            return operand
+        if operand not in definitions:
+            definitions[operand] = (fresh.definition(), tuple(sorted(free_variables(operand), key=str)))
+            pending.append(operand)
+        return definitions[operand]
+
+    def nnf(node, positive):
+        name = node[0]
+        if name == "¬":
+            return nnf(node[1], not positive)
+        if name in ("∧", "∨"):
+            operator = name if positive else ("∨" if name == "∧" else "∧")
+            return (operator,) + tuple(nnf(child, positive) for child in node[1:])
+        if name == "⇒":
+            if positive:
+                return "∨", nnf(node[1], False), nnf(node[2], True)
+            return "∧", nnf(node[1], True), nnf(node[2], False)
+        if name == "⇔":
+            left, right = define(node[1]), define(node[2])
+            if positive:
+                return "∧", ("∨", nnf(left, False), nnf(right, True)), ("∨", nnf(left, True), nnf(right, False))
+            return "∨", ("∧", nnf(left, True), nnf(right, False)), ("∧", nnf(left, False), nnf(right, True))
+        if name in ("∀", "∃"):
+            quantifier = name if positive else ("∃" if name == "∀" else "∀")
+            return quantifier, node[1], nnf(node[2], positive)
+        if name == "∄":
+            return nnf(("∃", node[1], node[2]), not positive)
+        if name == "∃!":
+            # ∃!x φ(x) ≡ ∃x(φ(x) ∧ ∀y(φ(y) ⇒ y = x))
+            variable, body = node[1], node[2]
+            other = fresh.variable(variable)
+            unique = ("∀", other, ("⇒", substitute(body, {variable: other}), ("=", (other, variable))))
+            return nnf(("∃", variable, ("∧", body, unique)), positive)
+        return node if positive else ("¬", node)
+
+    result = nnf(formula, True)
+    conjuncts = []
+    while pending:
+        operand = pending.pop()
+        definition = definitions[operand]
+        body = ("∧", ("∨", ("¬", definition), nnf(operand, True)), ("∨", definition, nnf(operand, False)))
+        for variable in sorted(definition[1], key=str, reverse=True):
+            body = ("∀", variable, body)
+        conjuncts.append(body)
+    return ("∧", result, *conjuncts) if conjuncts else result
+
+
+def to_prenex(formula, fresh=None):
+    """
+    Step 3: pulls every quantifier of an NNF formula to the front.
+    Returns the prefix as (quantifier, variable, universals in scope) triples and the quantifier-free matrix.
+    Variables bound more than once (e.g. after ⇔ was expanded) are renamed on the way.
+    """
+    fresh = fresh or FreshNames()
+    prefix = []
+    used = set()
+
+    def pull(node, renaming, universals):
+        name = node[0]
+        if name in ("∀", "∃"):
+            variable = node[1]
+            if variable in used:
+                variable = fresh.variable(variable)
+            used.add(variable)
+            prefix.append((name, variable, universals))
+            inner = {**renaming, node[1]: variable}
+            return pull(node[2], inner, universals + (variable,) if name == "∀" else universals)
+        if name in ("∧", "∨"):
+            return (name,) + tuple(pull(child, renaming, universals) for child in node[1:])
+        return substitute(node, renaming) if renaming else node
+
+    matrix = pull(formula, {}, ())
+    return prefix, matrix
+
+
+def skolemize(prefix, matrix, fresh=None):
+    """
+    Step 4: replaces each existential variable by a fresh Skolem function of the universals
+    in whose scope it was bound. The remaining variables are implicitly universal.
+    """
+    fresh = fresh or FreshNames()
+    mapping = {}
+    for quantifier, variable, universals in prefix:
+        if quantifier == "∃":
+            mapping[variable] = (fresh.skolem(), tuple(mapping.get(u, u) for u in universals))
+    return substitute(matrix, mapping) if mapping else matrix
+
+
+def definitional_clauses(matrix, fresh=None):
+    """
+    Step 5: streams the clauses of a Skolemized NNF matrix.
+    A conjunction nested inside a disjunction is replaced by a new definition atom D(x̄) over its
+    free variables, with clauses ¬D(x̄) ∨ Cᵢ for its conjuncts, so the output stays linear in size.
+    """
+    fresh = fresh or FreshNames()
+    pending = [matrix]
+    while pending:
+        node = pending.pop()
+        if node[0] == "∧":
+            pending.extend(reversed(node[1:]))
+            continue
+        literals = set()
+        disjuncts = [node]
+        while disjuncts:
+            disjunct = disjuncts.pop()
+            if disjunct[0] == "∨":
+                disjuncts.extend(disjunct[1:])
+            elif disjunct[0] == "∧":
+                definition = (fresh.definition(), tuple(sorted(free_variables(disjunct), key=str)))
+                literals.add(definition)
+                for conjunct in disjunct[1:]:
+                    pending.append(("∨", ("¬", definition), conjunct))
+            else:
+                literals.add(disjunct)
+        if not any(negate_literal(literal) in literals for literal in literals):
+            yield frozenset(literals)
+
+
+def clausify(formula, fresh=None, negated=False):
+    """
+    Turns a math.py formula into clauses, yielded one at a time.
+    Each clause is a frozenset of literals: an atom (symbol, (arguments...)) or ("¬", atom).
+    Free variables are read universally, as in clause form. With negated=True the clauses
+    of the negated universal closure are produced, as needed for refutation proofs.
+    """
+    fresh = fresh or FreshNames()
+    renamed = universal_closure(rename_apart(formula, fresh))
+    if negated:
+        renamed = ("¬", renamed)
+    nnf = to_nnf(renamed, fresh)
+    prefix, matrix = to_prenex(nnf, fresh)
+    matrix = skolemize(prefix, matrix, fresh)
+    yield from definitional_clauses(matrix, fresh)
+
+
+def clausify_theory(formulas):
+    """Streams the clauses of several formulas, keeping Skolem and definition names distinct."""
+    fresh = FreshNames()
+    for formula in formulas:
+        yield from clausify(formula, fresh)
+
+
+def format_term(term):
+    if not isinstance(term, tuple):
+        return str(term)
+    name, arguments = term
+    if name == "¬":
+        return f"¬{format_term(arguments)}"
+    return f"{name}({', '.join(format_term(argument) for argument in arguments)})"
+
+
+def format_clause(clause):
+    return "{" + ", ".join(sorted(format_term(literal) for literal in clause)) + "}"
+
+
+if __name__ == "__main__":
+    from math import parser
+
+    data = "∀x∃y∀z(P(y, z)∨Q(x, y, z)) ⇒ (R(x, z, y)∨¬P(x, z))"
+    for clause in clausify(parser.parse(data)):
+        print(format_clause(clause))
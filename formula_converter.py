@@ -3,6 +3,9 @@ from itertools import product
 from anytree import Node, RenderTree
 from copy import deepcopy
 
+from budget import BudgetExceeded
+from cardinality import CONSTRAINTS, constraint_attributes, constraint_expression, constraint_label, constraint_range, negate_constraint
+
 def duplicate_node(node):
     new_node = deepcopy(node)
     return new_node
@@ -11,130 +14,138 @@ def print_tree(node):
     for pre, _, node in RenderTree(node):
         print(f"{pre}{node.name}")
 
-def get_node_expression(node):
+def get_node_expression(node, memo=None):
+    """
+    The expression of a formula tree in strict syntax. A memo dictionary keeps the expression of
+    every node it writes (with the node, so its id stays unique), for callers that write many
+    overlapping subformulas of an unchanged tree.
+    """
+    if memo is not None and id(node) in memo:
+        return memo[id(node)][1]
     if node.is_leaf:
-        return node.name
+        expression = node.name
     elif node.name == "¬":
-        return f"(¬{get_node_expression(node.children[0])})"
+        expression = f"(¬{get_node_expression(node.children[0], memo)})"
     elif node.name in ["∧", "∨"]:
         # Join expressions of all children with the operator symbol
-        child_expressions = [get_node_expression(child) for child in node.children]
-        return f"({f'{node.name}'.join(child_expressions)})"
+        child_expressions = [get_node_expression(child, memo) for child in node.children]
+        expression = f"({f'{node.name}'.join(child_expressions)})"
     elif node.name in ["⇒", "⇔"]:
         # For binary operators like ⇒ and ⇔, assume exactly two children
-        left_expr = get_node_expression(node.children[0])
-        right_expr = get_node_expression(node.children[1])
-        return f"({left_expr}{node.name}{right_expr})"
-    return node.name
+        left_expr = get_node_expression(node.children[0], memo)
+        right_expr = get_node_expression(node.children[1], memo)
+        expression = f"({left_expr}{node.name}{right_expr})"
+    elif node.name in CONSTRAINTS:
+        expression = constraint_expression(node.name, node.bound, node.weights,
+                                           [get_node_expression(child, memo) for child in node.children])
+    else:
+        expression = node.name
+    if memo is not None:
+        memo[id(node)] = node, expression
+    return expression
 
 
-def transform_to_nnf(node, indent=0):
-    """Transform a formula into Negation Normal Form (NNF) with indented print statements."""
-    if node.name == "¬":
-        child = node.children[0]
+def copy_tree(node):
+    """Structural copy of a formula tree, without deepcopy's memo and attribute copying."""
+    return Node(node.name, children=[copy_tree(child) for child in node.children], **constraint_attributes(node))
 
-        # Case: Double negation
-        if child.name == "¬":
-            print("Transformed this formula:")
-            print(f"{get_node_expression(node)}")
-            print("Into its equivalent:")
-            print(f"{get_node_expression(child.children[0])}")
-            return transform_to_nnf(child.children[0], indent)
-
-        # Case: Negation of conjunction (De Morgan's Law)
-        elif child.name == "∧":
-            node_copy = deepcopy(node)
-            new_node = Node("∨", parent=node.parent)
-            for grandchild in child.children:
-                # Create a new negation node for each child of the conjunction
-                negated_child = Node("¬", parent=new_node)
-                negated_child.children = [transform_to_nnf(grandchild, indent + 1)]
-            print("Transformed this formula:")
-            print(f"{get_node_expression(node_copy)}")
-            print("Into its equivalent:")
-            print(f"{get_node_expression(new_node)}")
-            return transform_to_nnf(new_node, indent)
-
-        # Case: Negation of disjunction (De Morgan's Law)
-        elif child.name == "∨":
-            node_copy = deepcopy(node)
-            new_node = Node("∧", parent=node.parent)
-            for grandchild in child.children:
-                negated_child = Node("¬", parent=new_node)
-                negated_child.children = [transform_to_nnf(grandchild, indent + 1)]
-            print("Transformed this formula:")
-            print(f"{get_node_expression(node_copy)}")
-            print("Into its equivalent:")
-            print(f"{get_node_expression(new_node)}")
-            return transform_to_nnf(new_node, indent)
-
-        # Case: Negation of implication (Eliminating ⇒)
-        elif child.name == "⇒":
-            left, right = child.children
-            new_node = Node("∧", parent=node.parent)
-            # Negate the left child and keep the right child as is
-            negated_right = Node("¬", parent=new_node, children=[transform_to_nnf(duplicate_node(right), indent + 1)])
-            new_node.children = [transform_to_nnf(duplicate_node(left), indent + 1), negated_right]
-            print("Transformed this formula:")
-            print(f"{get_node_expression(node)}")
-            print("Into its equivalent:")
-            print(f"{get_node_expression(new_node)}")
-            return transform_to_nnf(new_node, indent)
-
-        # Case: Negation of equivalence (⇔)
-        elif child.name == "⇔":
-            left, right = child.children
-            left_neg = Node("¬", parent=node.parent, children=[transform_to_nnf(duplicate_node(left), indent + 1)])
-            right_neg = Node("¬", parent=node.parent, children=[transform_to_nnf(duplicate_node(right), indent + 1)])
-            new_node = Node("∨", parent=node.parent)
-            new_node.children = [
-                Node("∧", parent=node.parent, children=[transform_to_nnf(duplicate_node(left), indent + 1), right_neg]),
-                Node("∧", parent=node.parent, children=[left_neg, transform_to_nnf(duplicate_node(right), indent + 1)]),
-            ]
+
+def mark_nnf(node, in_nnf):
+    """Records for every node whether its subtree is already in NNF."""
+    children_in_nnf = all([mark_nnf(child, in_nnf) for child in node.children])
+    if node.is_leaf:
+        result = True
+    elif node.name == "¬":
+        result = node.children[0].is_leaf
+    else:
+        # A constraint over literals is NNF as it is: its negation flips the bound, not the literals
+        result = node.name in ("∧", "∨") + CONSTRAINTS and children_in_nnf
+    in_nnf[id(node)] = result
+    return result
+
+
+def transform_to_nnf(node, trace=False):
+    """
+    Transform a formula into Negation Normal Form (NNF).
+    Negations are pushed down by tracking the polarity of each subformula, so every node is
+    visited once and ⇒/⇔ are rewritten without copying their operands. Subtrees that are already
+    in NNF are moved into the result rather than copied, which consumes the input tree.
+    With trace=True each rewrite is explained as it happens; the expressions are written once per
+    subformula and reused, so tracing stays linear in the size of the tree plus the printed text.
+    """
+    in_nnf = {}
+    mark_nnf(node, in_nnf)
+
+    def reuse(original, movable):
+        # The operands of ⇔ are visited twice; only the last visit may take the original nodes,
+        # since an anytree node has a single parent
+        if not movable:
+            return copy_tree(original)
+        original.parent = None
+        return original
+
+    expressions = {}
+
+    def explain(original, positive, result):
+        if trace:
             print("Transformed this formula:")
-            print(f"{get_node_expression(node)}")
+            print(original if positive else f"(¬{original})")
             print("Into its equivalent:")
-            print(f"{get_node_expression(new_node)}")
-            return transform_to_nnf(new_node, indent)
-
+            print(get_node_expression(result, expressions))
+
+    def nnf(current, positive, movable):
+        if positive and in_nnf[id(current)]:
+            return reuse(current, movable)
+        if current.is_leaf:
+            if current.name in ["⊤", "⊥"]:
+                return Node("⊥" if current.name == "⊤" else "⊤")
+            return Node("¬", children=[reuse(current, movable)])
+        # The original expression is written before reuse moves the operands away
+        rewritten = not positive or current.name in ["⇒", "⇔"]
+        original = get_node_expression(current, expressions) if trace and rewritten else None
+        left = current.children[0]
+        if current.name == "¬":
+            result = nnf(left, not positive, movable)
+            if trace and not positive:
+                explain(original, positive, result)
+            return result
+        if current.name in ["∧", "∨"]:
+            name = current.name if positive else ("∨" if current.name == "∧" else "∧")
+            result = Node(name, children=[nnf(child, positive, movable) for child in list(current.children)])
+        elif current.name == "⇒":
+            right = current.children[1]
+            if positive:
+                result = Node("∨", children=[nnf(left, False, movable), nnf(right, True, movable)])
+            else:
+                result = Node("∧", children=[nnf(left, True, movable), nnf(right, False, movable)])
+        elif current.name == "⇔":
+            right = current.children[1]
+            if positive:
+                first = Node("∨", children=[nnf(left, False, False), nnf(right, True, False)])
+                second = Node("∨", children=[nnf(left, True, movable), nnf(right, False, movable)])
+                result = Node("∧", children=[first, second])
+            else:
+                first = Node("∧", children=[nnf(left, True, False), nnf(right, False, False)])
+                second = Node("∧", children=[nnf(left, False, movable), nnf(right, True, movable)])
+                result = Node("∨", children=[first, second])
+        elif current.name in CONSTRAINTS:
+            result = negate_constraint(current, [reuse(child, movable) for child in list(current.children)])
         else:
-            return duplicate_node(node)
-
-    # Handle implications (⇒)
-    elif node.name == "⇒":
-        left, right = node.children
-        new_node = Node("∨", parent=node.parent)
-        # Negate the left child and keep the right child as is
-        negated_left = Node("¬", parent=new_node, children=[transform_to_nnf(duplicate_node(left), indent + 1)])
-        new_node.children = [negated_left, transform_to_nnf(duplicate_node(right), indent + 1)]
-        print("Transformed this formula:")
-        print(f"{get_node_expression(node)}")
-        print("Into its equivalent:")
-        print(f"{get_node_expression(new_node)}")
-        return transform_to_nnf(new_node, indent)
-
-    # Handle equivalences (⇔)
-    elif node.name == "⇔":
-        left, right = node.children
-        # Create mutual implications
-        left_impl = Node("⇒", parent=node.parent, children=[duplicate_node(left), duplicate_node(right)])
-        right_impl = Node("⇒", parent=node.parent, children=[duplicate_node(right), duplicate_node(left)])
-        new_node = Node("∧", parent=node.parent, children=[left_impl, right_impl])
-        print("Transformed this formula:")
-        print(f"{get_node_expression(node)}")
-        print("Into its equivalent:")
-        print(f"{get_node_expression(new_node)}")
-        return transform_to_nnf(new_node, indent)
-
-    # Handle conjunction and disjunction nodes
-    elif node.name in ["∧", "∨"]:
-        node.children = [transform_to_nnf(child) for child in node.children]
+            return reuse(current, movable) if positive else Node("¬", children=[reuse(current, movable)])
+        if trace and rewritten:
+            explain(original, positive, result)
+        return result
 
     # Final simplification pass before returning
-    return simplify_tree(Node(node.name, parent=node.parent, children=node.children))
+    return simplify_tree(nnf(node, True, True))
 
 
-def transform_to_normal_form(node, conversion_type):
+def transform_to_normal_form(node, conversion_type, budget=None):
+    """
+    Converts a formula in NNF to CNF or DNF by distributing one operator over the other, printing
+    each step. With a budget every distributed combination is a step; once it runs out the
+    BudgetExceeded is returned and the tree is left partly converted.
+    """
     if conversion_type == "dnf":
         op_list = ["∧", "∨"] # For DNF: distribute AND over OR
     else:
@@ -146,11 +157,14 @@ def transform_to_normal_form(node, conversion_type):
         if node.name == op_list[0]:
             if op_list[1] in [child.name for child in node.children]:
                 all_children = [[duplicate_node(grandchild) for grandchild in child.children] if len(child.children) > 1 else [duplicate_node(child)] for child in node.children]
-                distributed_children = list(product(*all_children)) # Generate Cartesian product of all child combinations for distribution
+                distributed_children = product(*all_children) # Cartesian product of all child combinations, generated one at a time
                 node.name = op_list[1]  # Convert current node to secondary operator
                 node.children = []
+                invalidate_simplified(node)
                 # Process each combination from the Cartesian product
                 for children in distributed_children:
+                    if budget is not None:
+                        budget.charge()
                     print(f"Distributed {op_list[0]} over {op_list[1]}:")
                     # Create new primary operator node with combined children
                     n = Node(op_list[0], children=[duplicate_node(child) for child in children])
@@ -170,114 +184,423 @@ def transform_to_normal_form(node, conversion_type):
             convert(child)
         return node
 
-    node = convert(node)
+    try:
+        node = convert(node)
+    except BudgetExceeded as stop:
+        return stop
     node = simplify_tree(node)
 
     return node
 
+class ClauseIndex:
+    """
+    Clauses indexed by their literals, so a new clause can be checked for subsumption by
+    counting, for each stored clause, how many of its literals the new clause contains.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.occurrences = {}
+        self.has_empty = False
+
+    def subsumes(self, clause):
+        """True if a stored clause is a subset of the given one (duplicates included)."""
+        if self.has_empty:
+            return True
+        counts = {}
+        for literal in clause:
+            for index in self.occurrences.get(literal, ()):
+                counts[index] = counts.get(index, 0) + 1
+                if counts[index] == len(self.clauses[index]):
+                    return True
+        return False
+
+    def add(self, clause):
+        if not clause:
+            self.has_empty = True
+        for literal in clause:
+            self.occurrences.setdefault(literal, []).append(len(self.clauses))
+        self.clauses.append(clause)
+
+
+def complement_literal(literal):
+    return literal[1:] if literal.startswith("¬") else "¬" + literal
+
+
+def reduce_clauses(clauses):
+    """Drops duplicate and subsumed clauses; shorter clauses are indexed first so one pass suffices."""
+    index = ClauseIndex()
+    for clause in sorted(clauses, key=len):
+        if not index.subsumes(clause):
+            index.add(clause)
+    return index.clauses
+
+
+def iter_normal_form_clauses(node, conversion_type):
+    """
+    Streams the clauses of a formula in NNF (see transform_to_nnf) without building the
+    normal form tree. For "cnf" each clause is a frozenset of literals read as a disjunction,
+    for "dnf" it is read as a conjunction (a term). Combinations are generated one at a time
+    from the cartesian product, branches that already contain a complementary pair are cut,
+    and each clause is only checked against the ones yielded before it: duplicates and clauses
+    subsumed by an earlier one are dropped, but an emitted clause is never retracted, so one
+    subsumed by a later, shorter clause still comes out. Only the emitted clauses are kept in memory.
+    """
+    outer, inner = ("∧", "∨") if conversion_type == "cnf" else ("∨", "∧")
+    # The constant that makes a clause (resp. the whole formula) trivially true
+    absorbing, neutral = ("⊤", "⊥") if conversion_type == "cnf" else ("⊥", "⊤")
+
+    def combine(groups, position, current):
+        if position == len(groups):
+            yield current
+            return
+        for clause in groups[position]:
+            if any(complement_literal(literal) in current for literal in clause):
+                continue
+            yield from combine(groups, position + 1, current | clause)
+
+    def clauses(current):
+        if current.name == absorbing:
+            return
+        if current.name == neutral:
+            yield frozenset()
+        elif current.is_leaf:
+            yield frozenset([current.name])
+        elif current.name == "¬":
+            if not current.children[0].is_leaf:
+                raise ValueError("The formula must be in NNF before streaming its clauses.")
+            yield frozenset(["¬" + current.children[0].name])
+        elif current.name == outer:
+            for child in current.children:
+                yield from clauses(child)
+        elif current.name == inner:
+            # Each operand's clause set is small compared to the product, so it is kept whole
+            groups = [reduce_clauses(clauses(child)) for child in current.children]
+            yield from combine(groups, 0, frozenset())
+        else:
+            raise ValueError("The formula must be in NNF before streaming its clauses.")
+
+    index = ClauseIndex()
+    for clause in clauses(node):
+        if not index.subsumes(clause):
+            index.add(clause)
+            yield clause
+
+
+def clauses_to_expression(clauses, conversion_type):
+    """Writes streamed clauses back as a CNF or DNF expression."""
+    outer, inner = ("∧", "∨") if conversion_type == "cnf" else ("∨", "∧")
+    empty, trivial = ("⊥", "⊤") if conversion_type == "cnf" else ("⊤", "⊥")
+    parts = []
+    for clause in clauses:
+        literals = sorted(clause, key=lambda literal: (literal.lstrip("¬"), literal))
+        literals = [f"({literal})" if literal.startswith("¬") else literal for literal in literals]
+        if not literals:
+            parts.append(empty)
+        elif len(literals) == 1:
+            parts.append(literals[0])
+        else:
+            parts.append(f"({inner.join(literals)})")
+    if not parts:
+        return trivial
+    return parts[0] if len(parts) == 1 else f"({outer.join(parts)})"
+
+def structural_key(name, child_keys):
+    """Hashable identity of a formula up to the order of ∧/∨ operands."""
+    if not child_keys:
+        return name
+    if name in ["∧", "∨"]:
+        return name, frozenset(child_keys)
+    return (name,) + tuple(child_keys)
+
+
+def complement_key(key):
+    return key[1] if isinstance(key, tuple) and key[0] == "¬" else ("¬", key)
+
+
+def invalidate_simplified(node):
+    """Forgets the cached simplification of a node that was changed in place, and of its ancestors."""
+    for current in (node,) + node.ancestors:
+        current._simplified = None
+
+
 def simplify_tree(node):
+    """
+    Simplifies a formula tree bottom-up in one pass:
+    - ⊤/⊥ propagation and double negation,
+    - flattening of nested ∧/∨ and removal of duplicate operands,
+    - X ∧ ¬X = ⊥ and X ∨ ¬X = ⊤ for any subformula X, compared structurally,
+    - absorption and subsumption among siblings: A ∧ (A ∨ B) = A, (A ∨ B) ∧ (A ∨ B ∨ C) = A ∨ B.
+    The result is cached on every node. A linear walk first drops the caches of the subtrees that
+    were edited in place since, so simplifying the tree again only redoes those.
+    """
     if node is None:
         return None  # Early exit if node is None
-
-    # Recursively simplify children
-    children_to_remove = []
-    for child in node.children[:]:  # Use a copy of the list to allow safe modification
-        simplified_child = simplify_tree(child)
-        if simplified_child is None:  # If child simplifies to None, mark for removal
-            children_to_remove.append(child)
-
-    # Remove any None children
-    for child in children_to_remove:
-        node.children.remove(child)
-
-    if node.name in {"∨", "∧"}:
-        new_children = []
-        for child in node.children:
-            if child.name == node.name:  # Flatten nested disjunctions/conjunctions
-                new_children.extend(child.children)
-            else:
-                new_children.append(child)
-        node.children = new_children
-
-    # Handle specific tautology and contradiction cases
-    if node.name == "∨":
-        literals = set()
-        negations = set()
-        for child in node.children:
-            if child.name == "¬" and child.children:
-                negations.add(child.children[0].name)
-            elif child.name:
-                literals.add(child.name)
-
-        # Tautology (P ∨ ¬P)
-        if literals & negations:
-            node.name = "⊤"
-            node.children = []
-            return node
-
-    elif node.name == "∧":
-        literals = set()
-        negations = set()
-        for child in node.children:
-            if child.name == "¬" and child.children:
-                negations.add(child.children[0].name)
-            elif child.name:
-                literals.add(child.name)
-
-        # Contradiction (P ∧ ¬P)
-        if literals & negations:
-            node.name = "⊥"
-            node.children = []
-            return node
-
-    # Handle negations of tautologies and contradictions
-    if node.name == "¬" and node.children:
-        child = node.children[0]
-        if child.name == "⊤":
-            node.name = "⊥"
-            node.children = []
-        elif child.name == "⊥":
-            node.name = "⊤"
-            node.children = []
-
-    # Simplify conjunctions
-    elif node.name == "∧":
-        new_children = []
-        for child in node.children:
-            if child.name == "⊤":  # Ignore tautology
-                continue
-            elif child.name == "⊥":  # Contradiction propagates
-                node.name = "⊥"
-                node.children = []
-                return node
+    drop_stale(node)
+    return simplify_node(node)[0]
+
+
+def drop_stale(node):
+    """Clears the cache of every node whose subtree changed since it was cached; True if the node's cache is current."""
+    current = all([drop_stale(child) for child in node.children])  # A list, so every child is visited
+    cached = getattr(node, "_simplified", None)
+    if not current or cached is None or cached[0] != (node.name, node.children):
+        node._simplified = None
+        return False
+    return True
+
+
+def simplify_node(node):
+    cached = getattr(node, "_simplified", None)
+    if cached is not None and cached[0] == (node.name, node.children):
+        return cached[1], cached[2]
+    results = [simplify_node(child) for child in node.children]
+    result, key = node, node.name
+
+    def become(constant):
+        node.name = constant
+        node.children = []
+        return node, constant
+
+    if node.name == "¬" and results:
+        child, child_key = results[0]
+        if child.name in ["⊤", "⊥"] and child.is_leaf:
+            result, key = become("⊥" if child.name == "⊤" else "⊤")
+        elif child.name == "¬" and child.children:
+            # Double negation
+            result, key = child.children[0], child_key[1]
+        else:
+            set_children(node, [child])
+            key = ("¬", child_key)
+    elif node.name in ["∧", "∨"]:
+        absorbing, neutral = ("⊥", "⊤") if node.name == "∧" else ("⊤", "⊥")
+        dual = "∨" if node.name == "∧" else "∧"
+        operands = []
+        for child, child_key in results:
+            if child.name == node.name and child.children:
+                # Flatten nested conjunctions/disjunctions
+                operands.extend(simplify_node(grandchild) for grandchild in child.children)
             else:
-                new_children.append(child)
-        node.children = new_children
-        if len(node.children) == 0:
-            node.name = "⊤"
-            node.children = []
-            return node
-        if len(node.children) == 1:
-            node = node.children[0]
-
-    # Simplify disjunctions
-    elif node.name == "∨":
-        new_children = []
-        for child in node.children:
-            if child.name == "⊥":  # Ignore contradiction
-                continue
-            elif child.name == "⊤":  # Tautology propagates
-                node.name = "⊤"
-                node.children = []
-                return node
+                operands.append((child, child_key))
+        kept = {}
+        for child, child_key in operands:
+            if child.name == absorbing and child.is_leaf:
+                return store(node, *become(absorbing))
+            if child.name != neutral and child_key not in kept:
+                kept[child_key] = child
+        if any(complement_key(child_key) in kept for child_key in kept):
+            # Contradiction (X ∧ ¬X) or tautology (X ∨ ¬X)
+            return store(node, *become(absorbing))
+        kept = remove_subsumed(kept, dual)
+        if not kept:
+            result, key = become(neutral)
+        elif len(kept) == 1:
+            (key, result), = kept.items()
+        else:
+            set_children(node, list(kept.values()))
+            key = structural_key(node.name, list(kept))
+    elif results:
+        set_children(node, [child for child, _ in results])
+        key = structural_key(constraint_label(node), [child_key for _, child_key in results])
+    return store(node, result, key)
+
+
+def set_children(node, children):
+    # Reassigning children costs anytree quadratic time in their number, so skip it when nothing changed
+    if tuple(children) != node.children:
+        node.children = children
+
+
+def remove_subsumed(operands, dual):
+    """
+    Drops every operand of a ∧ (resp. ∨) node that is a ∨ (resp. ∧) over a superset of another
+    operand's literals. Operands are indexed by their literals and visited smallest first, so a
+    superset is found by counting how many of its literals each kept operand has.
+    """
+    def literals(key, child):
+        return key[1] if child.name == dual and child.children else frozenset([key])
+
+    ordered = sorted(operands.items(), key=lambda item: len(literals(*item)))
+    kept_sizes = []
+    occurrences = {}
+    kept = set()
+    for key, child in ordered:
+        own = literals(key, child)
+        counts = {}
+        subsumed = False
+        for literal in own:
+            for index in occurrences.get(literal, ()):
+                counts[index] = counts.get(index, 0) + 1
+                if counts[index] == kept_sizes[index]:
+                    subsumed = True
+                    break
+            if subsumed:
+                break
+        if subsumed:
+            continue
+        for literal in own:
+            occurrences.setdefault(literal, []).append(len(kept_sizes))
+        kept_sizes.append(len(own))
+        kept.add(key)
+    # Keep the original operand order
+    return {key: child for key, child in operands.items() if key in kept}
+
+
+def store(node, result, key):
+    entry = (result.name, result.children), result, key
+    result._simplified = entry
+    if node is not result:
+        node._simplified = (node.name, node.children), result, key
+    return result, key
+
+
+class FormulaTable:
+    """
+    Hash-consed formulas for partial evaluation. A frozen formula is a tuple (name, *children);
+    every distinct subformula exists once, so identical subtrees are shared and compared by
+    identity. Each formula also records its variables as a bitset, which tells restrict in
+    O(1) whether an assignment touches a subtree at all.
+    """
+
+    def __init__(self):
+        self.unique = {}  # (name, child ids) -> formula
+        self.supports = {}  # id(formula) -> bitset of its variables
+        self.bits = {}  # variable -> bit
+        self.memo = {}  # (id(formula), assigned bits, true bits) -> restricted formula
+        self.top = self.make("⊤")
+        self.bottom = self.make("⊥")
+
+    def make(self, name, children=()):
+        key = (name,) + tuple(id(child) for child in children)
+        formula = self.unique.get(key)
+        if formula is None:
+            formula = (name,) + tuple(children)
+            self.unique[key] = formula
+            if children:
+                support = 0
+                for child in children:
+                    support |= self.supports[id(child)]
+            elif name in ["⊤", "⊥"]:
+                support = 0
             else:
-                new_children.append(child)
-        node.children = new_children
-        if len(node.children) == 0:
-            node.name = "⊥"
-            node.children = []
-            return node
-        if len(node.children) == 1:
-            node = node.children[0]
-
-    return node
+                support = 1 << self.bits.setdefault(name, len(self.bits))
+            self.supports[id(formula)] = support
+        return formula
+
+    def freeze(self, node):
+        """Turns an anytree formula into a shared frozen formula."""
+        return self.make(constraint_label(node), [self.freeze(child) for child in node.children])
+
+    def thaw(self, formula):
+        """Turns a frozen formula back into an anytree tree (shared subformulas are copied)."""
+        children = [self.thaw(child) for child in formula[1:]]
+        if isinstance(formula[0], tuple):
+            name, bound, weights = formula[0]
+            return Node(name, bound=bound, weights=list(weights), children=children)
+        return Node(formula[0], children=children)
+
+    def negate(self, formula):
+        if formula is self.top:
+            return self.bottom
+        if formula is self.bottom:
+            return self.top
+        if formula[0] == "¬":
+            return formula[1]
+        return self.make("¬", [formula])
+
+    def assignment_bits(self, assignment):
+        """(assigned, true) bitsets of an assignment; variables the table never saw are ignored."""
+        assigned = true = 0
+        for name, value in assignment.items():
+            if name in self.bits:
+                bit = 1 << self.bits[name]
+                assigned |= bit
+                if value:
+                    true |= bit
+        return assigned, true
+
+    def restrict(self, formula, assignment):
+        """
+        The residual formula once the variables of a partial assignment are replaced by their
+        values and the constants folded away. Subformulas without an assigned variable are
+        returned as they are, and results are memoized per (subformula, values of its assigned
+        variables), so each shared subformula is restricted once and later queries that agree
+        on its variables reuse the result.
+        """
+        assigned, true = self.assignment_bits(assignment)
+
+        def visit(current):
+            relevant = self.supports[id(current)] & assigned
+            if not relevant:
+                return current
+            key = (id(current), relevant, true & relevant)
+            result = self.memo.get(key)
+            if result is None:
+                if len(current) == 1:
+                    result = self.top if true & relevant else self.bottom
+                else:
+                    result = self.fold(current[0], [visit(child) for child in current[1:]])
+                self.memo[key] = result
+            return result
+
+        return visit(formula)
+
+    def fold(self, name, children):
+        """Rebuilds a node over restricted children, folding away constants."""
+        if name == "¬":
+            return self.negate(children[0])
+        if name in ["∧", "∨"]:
+            absorbing, neutral = (self.bottom, self.top) if name == "∧" else (self.top, self.bottom)
+            kept = {}
+            for child in children:
+                if child is absorbing:
+                    return absorbing
+                if child is not neutral:
+                    kept[id(child)] = child
+            # X ∧ ¬X = ⊥ and X ∨ ¬X = ⊤
+            if any(child[0] == "¬" and id(child[1]) in kept for child in kept.values()):
+                return absorbing
+            if not kept:
+                return neutral
+            if len(kept) == 1:
+                return next(iter(kept.values()))
+            return self.make(name, list(kept.values()))
+        if isinstance(name, tuple):
+            return self.fold_constraint(name, children)
+        left, right = children
+        if name == "⇒":
+            if left is self.bottom or right is self.top or left is right:
+                return self.top
+            if left is self.top:
+                return right
+            if right is self.bottom:
+                return self.negate(left)
+        elif name == "⇔":
+            if left is right:
+                return self.top
+            for constant, other in [(left, right), (right, left)]:
+                if constant is self.top:
+                    return other
+                if constant is self.bottom:
+                    return self.negate(other)
+        return self.make(name, children)
+
+    def fold_constraint(self, label, children):
+        """A constraint whose true operands are moved into the bound and whose false ones are dropped."""
+        name, bound, weights = label
+        low, high = constraint_range(name, bound, sum(weights))
+        kept, kept_weights = [], []
+        for child, weight in zip(children, weights):
+            if child is self.top:
+                low, high = low - weight, high - weight
+            elif child is not self.bottom:
+                kept.append(child)
+                kept_weights.append(weight)
+        if high < 0 or low > sum(kept_weights):
+            return self.bottom
+        if low <= 0 and high >= sum(kept_weights):
+            return self.top
+        return self.make((name, high if name == "AtMost" else low, tuple(kept_weights)), kept)
+
+    def clear(self):
+        self.memo.clear()
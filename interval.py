@@ -0,0 +1,474 @@
+from lexer import user_defined_symbols
+
+INF = float("inf")
+NUMBER_SETS = {"ℝ", "ℕ", "ℤ", "ℚ", "ℂ"}
+EPSILON = 2.0 ** -52
+TINY = 5e-324
+
+
+def round_down(value):
+    """Widen a float bound downwards so rounding errors never shrink an interval."""
+    if isinstance(value, int) or value in (INF, -INF):
+        return value
+    return value - abs(value) * EPSILON - TINY
+
+
+def round_up(value):
+    """Widen a float bound upwards so rounding errors never shrink an interval."""
+    if isinstance(value, int) or value in (INF, -INF):
+        return value
+    return value + abs(value) * EPSILON + TINY
+
+
+def safe_mul(a, b):
+    """Multiply two bounds, treating 0 * ∞ as 0."""
+    if a == 0 or b == 0:
+        return 0
+    return a * b
+
+
+def exact_factorial(n):
+    """Factorial of a non-negative integer, ∞ once it no longer fits in a float."""
+    if n > 170:
+        return INF
+    result = 1
+    for k in range(2, n + 1):
+        result *= k
+    return result
+
+
+class Interval:
+    """
+    A closed interval [lo, hi] of reals.
+    partial is set when some points of the input box lie outside the domain of the term,
+    e.g. √ over a range that includes negative numbers.
+    """
+
+    def __init__(self, lo, hi, partial=False):
+        self.lo = lo
+        self.hi = hi
+        self.partial = partial
+
+    @classmethod
+    def point(cls, value):
+        return cls(value, value)
+
+    @classmethod
+    def whole(cls):
+        return cls(-INF, INF)
+
+    def is_point(self):
+        return self.lo == self.hi
+
+    def width(self):
+        return self.hi - self.lo
+
+    def midpoint(self):
+        """A finite split point, also for unbounded intervals."""
+        if self.lo == -INF and self.hi == INF:
+            return 0
+        if self.lo == -INF:
+            return self.hi - max(1, abs(self.hi))
+        if self.hi == INF:
+            return self.lo + max(1, abs(self.lo))
+        return self.lo + (self.hi - self.lo) / 2
+
+    def contains_integer(self):
+        if self.lo in (INF, -INF) or self.hi in (INF, -INF):
+            return True
+        return int(-(-self.lo // 1)) <= int(self.hi // 1)
+
+    def __repr__(self):
+        return f"[{self.lo}, {self.hi}]" + ("?" if self.partial else "")
+
+
+def join_partial(*intervals):
+    return any(interval.partial for interval in intervals)
+
+
+def interval_add(x, y):
+    return Interval(round_down(x.lo + y.lo), round_up(x.hi + y.hi), join_partial(x, y))
+
+
+def interval_sub(x, y):
+    return Interval(round_down(x.lo - y.hi), round_up(x.hi - y.lo), join_partial(x, y))
+
+
+def interval_neg(x):
+    return Interval(-x.hi, -x.lo, x.partial)
+
+
+def interval_mul(x, y):
+    products = [safe_mul(a, b) for a in (x.lo, x.hi) for b in (y.lo, y.hi)]
+    return Interval(round_down(min(products)), round_up(max(products)), join_partial(x, y))
+
+
+def interval_div(x, y):
+    """Division, undefined where the divisor is 0."""
+    if y.lo == 0 and y.hi == 0:
+        return None
+    if y.lo > 0 or y.hi < 0:
+        reciprocal = Interval(round_down(1 / y.hi), round_up(1 / y.lo), y.partial)
+    elif y.lo == 0:
+        reciprocal = Interval(round_down(1 / y.hi), INF, True)
+    elif y.hi == 0:
+        reciprocal = Interval(-INF, round_up(1 / y.lo), True)
+    else:
+        return Interval(-INF, INF, True)
+    return interval_mul(x, reciprocal)
+
+
+def interval_abs(x):
+    if x.lo >= 0:
+        return Interval(x.lo, x.hi, x.partial)
+    if x.hi <= 0:
+        return Interval(-x.hi, -x.lo, x.partial)
+    return Interval(0, max(-x.lo, x.hi), x.partial)
+
+
+def interval_sqrt(x):
+    """Square root, undefined for negative numbers."""
+    if x.hi < 0:
+        return None
+    lo = max(x.lo, 0)
+    return Interval(max(round_down(lo ** 0.5), 0), round_up(x.hi ** 0.5), x.partial or x.lo < 0)
+
+
+def to_float(value):
+    """A float, or ±INF for an int beyond the float range."""
+    try:
+        return float(value)
+    except OverflowError:
+        return -INF if value < 0 else INF
+
+
+def float_power(base, exponent):
+    """base ** exponent, with ±INF where the float result overflows or divides by zero (±0.0 ** negative)."""
+    try:
+        result = to_float(base) ** to_float(exponent)
+    except (OverflowError, ZeroDivisionError):
+        result = INF
+    # A negative base (-0.0 included, hence the sign of its text) keeps its sign under an odd exponent
+    negative = base < 0 or (base == 0 and str(base).startswith("-"))
+    return -INF if result == INF and negative and exponent % 2 == 1 else result
+
+
+def interval_integer_power(x, n):
+    """x ^ n for a fixed integer exponent n."""
+    if n == 0:
+        return Interval(1, 1, x.partial)
+    if n < 0:
+        return interval_div(Interval(1, 1), interval_integer_power(x, -n))
+    lo_power, hi_power = float_power(x.lo, n), float_power(x.hi, n)
+    if n % 2 == 1:
+        return Interval(round_down(lo_power), round_up(hi_power), x.partial)
+    if x.lo >= 0:
+        return Interval(round_down(lo_power), round_up(hi_power), x.partial)
+    if x.hi <= 0:
+        return Interval(round_down(hi_power), round_up(lo_power), x.partial)
+    return Interval(0, round_up(max(lo_power, hi_power)), x.partial)
+
+
+def integer_exponents(y):
+    """The smallest and largest even and odd integers in y, [] if it holds none, None if they are unbounded."""
+    if y.lo == -INF or y.hi == INF:
+        return None
+    first, last = -(-y.lo // 1), y.hi // 1
+    if first > last:
+        return []
+    if abs(first) >= 2 ** 31 or abs(last) >= 2 ** 31:
+        return None
+    first, last = int(first), int(last)
+    return sorted({first, min(first + 1, last), max(last - 1, first), last})
+
+
+def interval_pow(x, y):
+    """
+    x ^ y. Integer exponents are handled exactly, otherwise the base must be positive.
+    For a positive base x ^ y is monotone in each argument, so its extremes are at the corners.
+    A negative base is only defined at the integer exponents in y; for each parity its powers
+    are monotone in the exponent, so the smallest and largest even and odd ones bound them.
+    """
+    if y.is_point() and float(y.lo).is_integer() and abs(y.lo) < 2 ** 31:
+        result = interval_integer_power(x, int(y.lo))
+        if result is not None:
+            result.partial = result.partial or y.partial
+        return result
+    partial = join_partial(x, y) or x.lo <= 0
+    pieces = []
+    if x.lo < 0:
+        exponents = integer_exponents(y)
+        if exponents is None:
+            return Interval(-INF, INF, True)
+        negative = Interval(x.lo, min(x.hi, 0), x.partial)
+        pieces.extend(interval_integer_power(negative, n) for n in exponents)
+    if x.hi > 0 or (x.hi == 0 and y.hi > 0):
+        if x.lo <= 0 and y.lo <= 0:
+            pieces.append(Interval(0, INF, True))
+        else:
+            corners = [float_power(base, exponent) for base in (max(x.lo, 0), x.hi) for exponent in (y.lo, y.hi)]
+            pieces.append(Interval(round_down(min(corners)), round_up(max(corners)), partial))
+    pieces = [piece for piece in pieces if piece is not None]
+    if not pieces:
+        return None
+    return Interval(min(piece.lo for piece in pieces), max(piece.hi for piece in pieces), partial)
+
+
+def interval_factorial(x):
+    """Factorial, defined on the non-negative integers only."""
+    lo = 0 if x.lo == -INF or x.lo < 0 else int(-(-x.lo // 1))
+    if x.hi == INF:
+        return Interval(exact_factorial(lo), INF, True)
+    hi = int(x.hi // 1)
+    if lo > hi:
+        return None
+    exact = x.is_point() and x.lo >= 0 and float(x.lo).is_integer()
+    return Interval(exact_factorial(lo), exact_factorial(hi), x.partial or not exact)
+
+
+def interval_unknown(*arguments):
+    """Uninterpreted functions may take any value."""
+    return Interval(-INF, INF, join_partial(*arguments))
+
+
+interval_functions = {
+    "f": interval_unknown,
+    "g": interval_unknown,
+    "−": interval_sub,
+    "+": interval_add,
+    "*": interval_mul,
+    "/": interval_div,
+    "√": interval_sqrt,
+    "^": interval_pow,
+    "□□": interval_mul,
+    "!": interval_factorial,
+    "-": interval_neg,
+    "|": interval_abs,
+}
+
+for function in user_defined_symbols["functions"]:
+    if function not in interval_functions:
+        interval_functions[function] = interval_unknown
+
+
+def to_interval(value):
+    if isinstance(value, Interval):
+        return value
+    if isinstance(value, tuple):
+        return Interval(*value)
+    return Interval.point(value)
+
+
+def normalize_box(box):
+    """Accept intervals, (lo, hi) pairs or plain numbers as variable ranges."""
+    return {name: to_interval(value) for name, value in box.items()}
+
+
+def evaluate_interval(term, box):
+    """
+    Evaluates a math.py term over a box of variable ranges.
+    Returns an Interval enclosing every defined value, or None when the term is undefined everywhere.
+    """
+    if isinstance(term, (int, float)):
+        return Interval.point(term)
+    if isinstance(term, str):
+        if term in box:
+            return box[term]
+        return Interval.whole()
+    name = term[0]
+    if len(term) == 2 and isinstance(term[1], list):
+        arguments = term[1]
+    else:
+        arguments = term[1:]
+    values = []
+    for argument in arguments:
+        value = evaluate_interval(argument, box)
+        if value is None:
+            return None
+        values.append(value)
+    if name not in interval_functions:
+        raise Exception(f"Error: No interval semantics for function '{name}'.")
+    if name in ("+", "*") and len(values) > 2:
+        # Flattened chains from term_simplifier.py are evaluated left to right
+        result = values[0]
+        for value in values[1:]:
+            result = interval_functions[name](result, value)
+        return result
+    return interval_functions[name](*values)
+
+
+def compare(predicate, left, right):
+    """Three-valued comparison of two intervals: True, False or None (unknown)."""
+    if predicate == "≥":
+        return True if left.lo >= right.hi else False if left.hi < right.lo else None
+    if predicate == ">":
+        return True if left.lo > right.hi else False if left.hi <= right.lo else None
+    if predicate == "≤":
+        return True if left.hi <= right.lo else False if left.lo > right.hi else None
+    if predicate == "<":
+        return True if left.hi < right.lo else False if left.lo >= right.hi else None
+    if predicate == "=":
+        if left.hi < right.lo or right.hi < left.lo:
+            return False
+        return True if left.is_point() and right.is_point() and left.lo == right.lo else None
+    if predicate == "≠":
+        result = compare("=", left, right)
+        return None if result is None else not result
+    return None
+
+
+def membership(value, set_name):
+    """Three-valued x ∈ S for the number sets known to the lexer."""
+    if set_name in ("ℝ", "ℂ"):
+        return True
+    if set_name in ("ℤ", "ℕ"):
+        if set_name == "ℕ" and value.hi < 0:
+            return False
+        if not value.contains_integer():
+            return False
+        if value.is_point():
+            return float(value.lo).is_integer() and (set_name == "ℤ" or value.lo >= 0)
+        return None
+    if set_name == "ℚ" and value.is_point() and isinstance(value.lo, int):
+        return True
+    return None
+
+
+def kleene_not(value):
+    return None if value is None else not value
+
+
+def kleene_and(values):
+    if False in values:
+        return False
+    return None if None in values else True
+
+
+def kleene_or(values):
+    if True in values:
+        return True
+    return None if None in values else False
+
+
+def decide(formula, box):
+    """
+    Decides a math.py formula over a box: True (holds everywhere), False (fails everywhere)
+    or None (unknown). Atoms whose terms are undefined at a point are false at that point.
+    """
+    box = normalize_box(box)
+    return decide_formula(formula, box)
+
+
+def decide_formula(formula, box):
+    name = formula[0]
+    if name == "¬":
+        return kleene_not(decide_formula(formula[1], box))
+    if name == "∧":
+        return kleene_and([decide_formula(child, box) for child in formula[1:]])
+    if name == "∨":
+        return kleene_or([decide_formula(child, box) for child in formula[1:]])
+    if name == "⇒":
+        return kleene_or([kleene_not(decide_formula(formula[1], box)), decide_formula(formula[2], box)])
+    if name == "⇔":
+        left, right = decide_formula(formula[1], box), decide_formula(formula[2], box)
+        return None if left is None or right is None else left == right
+    if name in ("∀", "∃", "∄", "∃!"):
+        return decide_quantifier(formula, box)
+    if name in ("≥", ">", "≤", "<", "=", "≠"):
+        left, right = evaluate_interval(formula[1], box), evaluate_interval(formula[2], box)
+        if left is None or right is None:
+            return False
+        result = compare(name, left, right)
+        if result is True and (left.partial or right.partial):
+            return None
+        return result
+    if name == "∈":
+        value = evaluate_interval(formula[1], box)
+        if value is None:
+            return False
+        result = membership(value, formula[2])
+        return None if result is True and value.partial else result
+    # Uninterpreted predicates such as P, Q, R or Z
+    return None
+
+
+def decide_quantifier(formula, box):
+    """The bound variable ranges over the whole real line unless the box says otherwise."""
+    quantifier, variable, body = formula
+    inner_box = dict(box)
+    inner_box[variable] = Interval.whole()
+    result = decide_formula(body, inner_box)
+    if quantifier in ("∀", "∃"):
+        return result
+    if quantifier == "∄":
+        return kleene_not(decide_quantifier(("∃", variable, body), box))
+    # ∃! can only be refuted by interval reasoning
+    return False if result is False else None
+
+
+def formula_variables(formula, bound=frozenset()):
+    """Free variables of a formula or term."""
+    if isinstance(formula, str):
+        if formula in bound or formula in user_defined_symbols["constants"] or formula in NUMBER_SETS:
+            return set()
+        return {formula}
+    if not isinstance(formula, (tuple, list)):
+        return set()
+    if isinstance(formula, tuple) and formula[0] in ("∀", "∃", "∄", "∃!"):
+        return formula_variables(formula[2], bound | {formula[1]})
+    children = formula if isinstance(formula, list) else formula[1:]
+    found = set()
+    for child in children:
+        found |= formula_variables(child, bound)
+    return found
+
+
+def split_box(box, variables):
+    """Bisects the widest variable of the box."""
+    widest = max(variables, key=lambda name: box[name].width())
+    interval = box[widest]
+    middle = interval.midpoint()
+    left, right = dict(box), dict(box)
+    left[widest] = Interval(interval.lo, middle)
+    right[widest] = Interval(middle, interval.hi)
+    return left, right
+
+
+def branch_and_prune(formula, box, max_boxes=10000, min_width=1e-9):
+    """
+    Splits the box adaptively until every piece is decided or the budget of box evaluations runs out.
+    Returns the decided and undecided boxes together with a few statistics.
+    """
+    box = normalize_box(box)
+    variables = sorted(formula_variables(formula))
+    for name in variables:
+        box.setdefault(name, Interval.whole())
+    result = {"true": [], "false": [], "unknown": [], "evaluations": 0, "splits": 0}
+    stack = [box]
+    while stack:
+        if result["evaluations"] >= max_boxes:
+            result["unknown"].extend(stack)
+            break
+        current = stack.pop()
+        result["evaluations"] += 1
+        verdict = decide_formula(formula, current)
+        if verdict is True:
+            result["true"].append(current)
+        elif verdict is False:
+            result["false"].append(current)
+        elif not variables or all(current[name].width() <= min_width for name in variables):
+            result["unknown"].append(current)
+        else:
+            result["splits"] += 1
+            left, right = split_box(current, variables)
+            stack.append(right)
+            stack.append(left)
+    return result
+
+
+def can_violate(formula, box, max_boxes=10000):
+    """True if some point of the box violates the formula, False if none can, None if undecided."""
+    result = branch_and_prune(formula, box, max_boxes)
+    if result["false"]:
+        return True
+    return None if result["unknown"] else False
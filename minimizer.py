@@ -0,0 +1,339 @@
+from array import array
+
+OFF, ON, DONT_CARE = 0, 1, 2
+EXACT_LIMIT = 10  # Up to this many inputs Quine–McCluskey is used, above it the heuristic
+NODE_LIMIT = 20000  # Branch-and-bound nodes for the exact cover before settling for the best found
+
+
+def variable_name(index):
+    """A..Z, then X26, X27, ... so every name is still an atomic proposition."""
+    return chr(ord("A") + index) if index < 26 else f"X{index}"
+
+
+def care_table(truth_table):
+    """
+    Packs rows [input..., output] into a care table with one byte per row: OFF, ON or DONT_CARE.
+    The first input is the most significant bit of the row index; missing rows are OFF.
+    """
+    n = len(truth_table[0]) - 1
+    table = bytearray(1 << n)
+    for row in truth_table:
+        *inputs, output = row
+        if output not in (OFF, ON, DONT_CARE):
+            raise ValueError(f"Invalid output value {output}, expected 0, 1 or a don't care.")
+        index = 0
+        for value in inputs:
+            index = index << 1 | (1 if value else 0)
+        table[index] = output
+    return n, table
+
+
+# A cube is a pair of ints (value, mask): bits set in mask are variables the cube does not mention,
+# the other bits of value give the polarity of the variables it does mention (value & mask == 0).
+
+def cube_literals(cube, n):
+    return n - bin(cube[1]).count("1")
+
+
+def cube_blocks(value, mask):
+    """
+    Yields the cube's points as runs (start, length) of consecutive row indices:
+    the raised low-order bits of the mask form contiguous runs of the table.
+    """
+    low = mask & ~(mask + 1)
+    high = mask ^ low
+    sub = high
+    while True:
+        yield value | sub, low + 1
+        if sub == 0:
+            break
+        sub = (sub - 1) & high
+
+
+def cube_has(table, value, mask, state):
+    """True if some row inside the cube has the given state."""
+    return any(table.find(state, start, start + length) != -1 for start, length in cube_blocks(value, mask))
+
+
+def cube_points(value, mask):
+    for start, length in cube_blocks(value, mask):
+        yield from range(start, start + length)
+
+
+def supercube(points):
+    common_ones, any_ones = -1, 0
+    for point in points:
+        common_ones &= point
+        any_ones |= point
+    return common_ones, common_ones ^ any_ones
+
+
+def prime_implicants(table, n):
+    """
+    Quine–McCluskey: merges cubes of ON and DONT_CARE rows that differ in one variable,
+    level by level. The neighbour of a cube is looked up by hash, so each level costs
+    one probe per cube and variable; cubes that never merge are prime.
+    """
+    current = {(row, 0) for row in range(1 << n) if table[row] != OFF}
+    primes = []
+    while current:
+        merged = set()
+        following = set()
+        for value, mask in current:
+            for i in range(n):
+                bit = 1 << i
+                if mask & bit or value & bit:
+                    continue
+                if (value | bit, mask) in current:
+                    following.add((value, mask | bit))
+                    merged.add((value, mask))
+                    merged.add((value | bit, mask))
+        primes.extend(cube for cube in current if cube not in merged)
+        current = following
+    return primes
+
+
+def select_cover(primes, table, n, initial=None, node_limit=NODE_LIMIT):
+    """
+    Picks the fewest primes (then the fewest literals) covering every ON row: essential primes
+    first, then branch and bound on the row with the fewest candidates. The bound starts from the
+    better of a greedy cover and the given initial cover, and counts rows that no single prime
+    covers together, since each of them needs its own cube.
+    """
+    coverage = [frozenset(row for row in cube_points(*prime) if table[row] == ON) for prime in primes]
+    literal_counts = [cube_literals(prime, n) for prime in primes]
+    candidates = {}
+    for index, rows in enumerate(coverage):
+        for row in rows:
+            candidates.setdefault(row, []).append(index)
+    uncovered = set(candidates)
+    chosen = []
+    for row, indices in candidates.items():
+        if len(indices) == 1 and row in uncovered:
+            chosen.append(indices[0])
+            uncovered -= coverage[indices[0]]
+
+    def cost(indices):
+        return len(indices), sum(literal_counts[index] for index in indices)
+
+    greedy = list(chosen)
+    remaining = set(uncovered)
+    while remaining:
+        index = max((i for row in remaining for i in candidates[row]),
+                    key=lambda i: (len(coverage[i] & remaining), -literal_counts[i]))
+        greedy.append(index)
+        remaining -= coverage[index]
+    best = [greedy, cost(greedy)]
+    if initial is not None:
+        positions = {prime: index for index, prime in enumerate(primes)}
+        if all(cube in positions for cube in initial):
+            indices = [positions[cube] for cube in initial]
+            if cost(indices) < best[1]:
+                best = [indices, cost(indices)]
+    nodes = [0]
+
+    def lower_bound(uncovered):
+        used = set()
+        needed = 0
+        for row in sorted(uncovered, key=lambda r: len(candidates[r])):
+            if used.isdisjoint(candidates[row]):
+                used.update(candidates[row])
+                needed += 1
+        return needed
+
+    def search(uncovered, selected, count, literals):
+        nodes[0] += 1
+        if nodes[0] > node_limit:
+            return
+        if not uncovered:
+            if (count, literals) < best[1]:
+                best[0], best[1] = list(selected), (count, literals)
+            return
+        if (count + lower_bound(uncovered), literals) >= best[1]:
+            return
+        row = min(uncovered, key=lambda r: len(candidates[r]))
+        options = sorted(candidates[row], key=lambda i: (-len(coverage[i] & uncovered), literal_counts[i]))
+        for index in options:
+            selected.append(index)
+            search(uncovered - coverage[index], selected, count + 1, literals + literal_counts[index])
+            selected.pop()
+
+    if uncovered:
+        search(uncovered, chosen, *cost(chosen))
+    elif cost(chosen) < best[1]:
+        best[0] = chosen
+    return [primes[index] for index in best[0]]
+
+
+def quine_mccluskey(table, n):
+    """Exact minimum over all prime implicants; the Espresso cover seeds the bound."""
+    return select_cover(prime_implicants(table, n), table, n, initial=espresso(table, n))
+
+
+def expand(table, value, mask, n):
+    """
+    Raises literals of a cube for as long as it stays clear of OFF rows. Each raise doubles the
+    cube, and only the new half has to be checked. Variables whose neighbouring row is ON are
+    tried first, those whose neighbour is OFF can never be raised and are skipped.
+    """
+    order = []
+    for i in range(n):
+        bit = 1 << i
+        if mask & bit:
+            continue
+        neighbour = table[value ^ bit]
+        if neighbour != OFF:
+            order.append((0 if neighbour == ON else 1, i, bit))
+    for _, _, bit in sorted(order):
+        flipped = (value ^ bit) & ~mask
+        if not cube_has(table, flipped, mask, OFF):
+            mask |= bit
+            value &= ~bit
+    return value, mask
+
+
+def cover_counts(table, cover, n):
+    counts = array("I", [0]) * (1 << n)
+    for cube in cover:
+        for row in cube_points(*cube):
+            if table[row] == ON:
+                counts[row] += 1
+    return counts
+
+
+def irredundant(table, cover, n):
+    """Drops cubes whose ON rows are all covered by other cubes, smallest cubes first."""
+    cover = list(dict.fromkeys(cover))
+    counts = cover_counts(table, cover, n)
+    kept = []
+    for cube in sorted(cover, key=lambda c: -cube_literals(c, n)):
+        rows = [row for row in cube_points(*cube) if table[row] == ON]
+        if all(counts[row] > 1 for row in rows):
+            for row in rows:
+                counts[row] -= 1
+        else:
+            kept.append(cube)
+    return kept, counts
+
+
+def reduce(table, cover, counts, n):
+    """
+    Shrinks each cube, largest first, to the smallest cube holding the ON rows no other cube covers,
+    which gives the next expansion room to move in another direction.
+    """
+    reduced = []
+    for cube in sorted(cover, key=lambda c: cube_literals(c, n)):
+        rows = [row for row in cube_points(*cube) if table[row] == ON]
+        unique = [row for row in rows if counts[row] == 1]
+        for row in rows:
+            counts[row] -= 1
+        if not unique:
+            continue
+        smaller = supercube(unique)
+        for row in cube_points(*smaller):
+            if table[row] == ON:
+                counts[row] += 1
+        reduced.append(smaller)
+    return reduced
+
+
+def espresso(table, n, max_rounds=8):
+    """
+    Espresso-style heuristic: every ON row not yet covered is expanded into a prime, then the
+    cover is made irredundant and improved by reduce/expand/irredundant rounds until its cost
+    (cubes, then literals) stops decreasing.
+    """
+    pending = table.translate(bytes([0, 1] + [0] * 254))
+    cover = []
+    row = pending.find(ON)
+    while row != -1:
+        cube = expand(table, row, 0, n)
+        cover.append(cube)
+        for start, length in cube_blocks(*cube):
+            pending[start:start + length] = bytes(length)
+        row = pending.find(ON, row + 1)
+    cover, counts = irredundant(table, cover, n)
+
+    def cost(cubes):
+        return len(cubes), sum(cube_literals(cube, n) for cube in cubes)
+
+    for _ in range(max_rounds):
+        reduced = reduce(table, cover, counts, n)
+        candidate, candidate_counts = irredundant(table, [expand(table, value, mask, n) for value, mask in reduced], n)
+        if cost(candidate) >= cost(cover):
+            break
+        cover, counts = candidate, candidate_counts
+    return cover
+
+
+def minimize(table, n, method="auto"):
+    """Two-level cover of the ON rows of a care table, as a list of cubes sorted by row."""
+    if method == "exact" or (method == "auto" and n <= EXACT_LIMIT):
+        cover = quine_mccluskey(table, n)
+    else:
+        cover = espresso(table, n)
+    return sorted(cover)
+
+
+def complement_table(table):
+    return table.translate(bytes([ON, OFF, DONT_CARE] + [0] * 253))
+
+
+def cube_to_literals(cube, n, names, negate=False):
+    value, mask = cube
+    literals = []
+    for i in range(n):
+        bit = 1 << (n - 1 - i)
+        if mask & bit:
+            continue
+        positive = bool(value & bit) != negate
+        literals.append(names[i] if positive else f"¬{names[i]}")
+    return literals
+
+
+def join_two_level(groups, inner, outer, empty_group, no_groups):
+    if not groups:
+        return no_groups
+    parts = []
+    for literals in groups:
+        if not literals:
+            return empty_group
+        parts.append(literals[0] if len(literals) == 1 else "(" + f" {inner} ".join(literals) + ")")
+    if len(parts) == 1 and len(groups[0]) > 1:
+        return parts[0][1:-1]
+    return f" {outer} ".join(parts)
+
+
+def minimal_dnf(table, n, method="auto", names=None):
+    names = names or [variable_name(i) for i in range(n)]
+    terms = [cube_to_literals(cube, n, names) for cube in minimize(table, n, method)]
+    return join_two_level(terms, "∧", "∨", "⊤", "⊥")
+
+
+def minimal_cnf(table, n, method="auto", names=None):
+    """The CNF is read off a minimal DNF of the complement: each of its terms negated is a clause."""
+    names = names or [variable_name(i) for i in range(n)]
+    clauses = [cube_to_literals(cube, n, names, negate=True) for cube in minimize(complement_table(table), n, method)]
+    return join_two_level(clauses, "∨", "∧", "⊥", "⊤")
+
+
+if __name__ == "__main__":
+    import time
+
+    # 7-segment style example: ON for 0, 2, 5, 7, 8, 10, 13, 15, don't care for 12 and 14
+    table = bytearray(16)
+    for row in [0, 2, 5, 7, 8, 10, 13, 15]:
+        table[row] = ON
+    for row in [12, 14]:
+        table[row] = DONT_CARE
+    print("DNF:", minimal_dnf(table, 4))
+    print("CNF:", minimal_cnf(table, 4))
+
+    n = 20
+    table = bytearray(1 << n)
+    for row in range(1 << n):
+        # Majority of the first three inputs, or the last input together with the fifth
+        a, b, c = row >> 19 & 1, row >> 18 & 1, row >> 17 & 1
+        table[row] = ON if a + b + c >= 2 or (row & 1 and row >> 15 & 1) else OFF
+    start = time.perf_counter()
+    print(f"{n} inputs:", minimal_dnf(table, n), f"({time.perf_counter() - start:.2f}s)")
@@ -0,0 +1,290 @@
+import sys
+
+
+def encode_clauses(clauses):
+    """
+    Numbers the variables of resolver.py clauses (sets of literals such as "P" and "¬P") from 1
+    and turns each clause into a list of ints, -v standing for ¬v. Tautologies are dropped.
+    """
+    index = {}
+    names = [None]
+    encoded = []
+    for clause in clauses:
+        literals = set()
+        for literal in clause:
+            name = literal.lstrip("¬")
+            if name not in index:
+                index[name] = len(names)
+                names.append(name)
+            # An even number of ¬ cancels out
+            negations = len(literal) - len(name)
+            literals.add(-index[name] if negations % 2 else index[name])
+        if not any(-literal in literals for literal in literals):
+            encoded.append(sorted(literals, key=abs))
+    return encoded, names, index
+
+
+class ModelCounter:
+    """
+    Exact model counting (#SAT) over a CNF.
+    The residual formula under the current assignment is split into components that share no
+    variables; their counts multiply, and each count is cached under the component's residual
+    clauses, so a component met again on another branch is not counted twice. Branches are
+    propagated with two watched literals per clause. Counts are Python ints, so they are exact.
+
+    With a projection only the assignments to the projected variables are counted: they are
+    branched on first, and a component without projected variables only needs to be satisfiable.
+    """
+
+    def __init__(self, clauses, variables=None, projection=None):
+        self.clauses, self.names, self.index = encode_clauses(clauses)
+        for name in list(variables or []) + list(projection or []):
+            if name not in self.index:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+        count = len(self.names) - 1
+        projected = set(projection) if projection is not None else None
+        self.counted = [False] + [projected is None or name in projected for name in self.names[1:]]
+        self.projected = projection is not None
+        self.values = [0] * (count + 1)
+        self.trail = []
+        self.queue_head = 0
+        self.watches = {}
+        self.units = []
+        self.empty = False
+        for position, clause in enumerate(self.clauses):
+            if not clause:
+                self.empty = True
+            elif len(clause) == 1:
+                self.units.append(clause[0])
+            else:
+                self.watches.setdefault(clause[0], []).append(position)
+                self.watches.setdefault(clause[1], []).append(position)
+        self.rank = self.frontier_order()
+        self.cache = {}
+        self.cache_hits = 0
+        self.decisions = 0
+
+    def frontier_order(self):
+        """
+        Ranks variables by a breadth-first sweep of the primal graph (variables sharing a clause
+        are neighbours) started from a least connected variable. Branching in this order keeps
+        the assigned variables a contiguous region, so the residual components only depend on
+        its frontier and recur often enough for the cache to pay off.
+        """
+        neighbours = [set() for _ in self.names]
+        for clause in self.clauses:
+            for literal in clause:
+                neighbours[abs(literal)].update(abs(other) for other in clause if other != literal)
+        rank = [0] * len(self.names)
+        position = 0
+        seen = set()
+        for start in sorted(range(1, len(self.names)), key=lambda v: len(neighbours[v])):
+            if start in seen:
+                continue
+            seen.add(start)
+            queue = [start]
+            for v in queue:
+                rank[v] = position
+                position += 1
+                for other in sorted(neighbours[v] - seen):
+                    seen.add(other)
+                    queue.append(other)
+        return rank
+
+    def value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def assign(self, literal):
+        value = self.value(literal)
+        if value:
+            return value > 0
+        self.values[abs(literal)] = 1 if literal > 0 else -1
+        self.trail.append(literal)
+        return True
+
+    def propagate(self):
+        """Unit propagation over the watch lists; False on a conflict."""
+        while self.queue_head < len(self.trail):
+            false_literal = -self.trail[self.queue_head]
+            self.queue_head += 1
+            watchers = self.watches.get(false_literal, [])
+            kept = 0
+            position = 0
+            while position < len(watchers):
+                index = watchers[position]
+                position += 1
+                clause = self.clauses[index]
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) > 0:
+                    watchers[kept] = index
+                    kept += 1
+                    continue
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) >= 0:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(index)
+                        break
+                else:
+                    watchers[kept] = index
+                    kept += 1
+                    if not self.assign(clause[0]):
+                        # Conflict: keep the watchers that were not visited
+                        while position < len(watchers):
+                            watchers[kept] = watchers[position]
+                            kept += 1
+                            position += 1
+                        del watchers[kept:]
+                        return False
+            del watchers[kept:]
+        return True
+
+    def backtrack(self, mark):
+        while len(self.trail) > mark:
+            self.values[abs(self.trail.pop())] = 0
+        self.queue_head = mark
+
+    def residual(self, clauses):
+        """The clauses not yet satisfied, reduced to their unassigned literals."""
+        remaining = []
+        for clause in clauses:
+            literals = []
+            for literal in clause:
+                value = self.value(literal)
+                if value > 0:
+                    break
+                if value == 0:
+                    literals.append(literal)
+            else:
+                remaining.append(tuple(literals))
+        return remaining
+
+    def components(self, clauses):
+        """Splits clauses into groups that share no variable (union-find over variables)."""
+        parent = {}
+
+        def find(v):
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+
+        for clause in clauses:
+            first = abs(clause[0])
+            parent.setdefault(first, first)
+            for literal in clause[1:]:
+                other = abs(literal)
+                parent.setdefault(other, other)
+                a, b = find(first), find(other)
+                if a != b:
+                    parent[a] = b
+        groups = {}
+        for clause in clauses:
+            groups.setdefault(find(abs(clause[0])), []).append(clause)
+        return list(groups.values())
+
+    def free_weight(self, variables, clauses):
+        """2 to the number of counted variables that are unassigned and occur in no clause."""
+        used = {abs(literal) for clause in clauses for literal in clause}
+        free = sum(1 for v in variables if not self.values[v] and v not in used and self.counted[v])
+        return 1 << free
+
+    def count_components(self, clauses):
+        result = 1
+        for component in sorted(self.components(clauses), key=len):
+            result *= self.count_component(component)
+            if not result:
+                break
+        return result
+
+    def count_component(self, clauses):
+        key = tuple(sorted(tuple(sorted(clause)) for clause in clauses))
+        if key in self.cache:
+            self.cache_hits += 1
+            return self.cache[key]
+        variables = {abs(literal) for clause in clauses for literal in clause}
+        occurrences = {}
+        for clause in clauses:
+            for literal in clause:
+                if self.counted[abs(literal)]:
+                    occurrences[abs(literal)] = occurrences.get(abs(literal), 0) + 1
+        if self.projected and not occurrences:
+            # Nothing left to count here: one model if any assignment satisfies the component
+            result = 1 if self.satisfiable(clauses) else 0
+        else:
+            if not occurrences:
+                occurrences = {abs(literal): 1 for clause in clauses for literal in clause}
+            branch = min(occurrences, key=lambda v: self.rank[v])
+            result = 0
+            for literal in (branch, -branch):
+                self.decisions += 1
+                mark = len(self.trail)
+                if self.assign(literal) and self.propagate():
+                    remaining = self.residual(clauses)
+                    weight = self.free_weight(variables, remaining)
+                    result += weight * self.count_components(remaining)
+                self.backtrack(mark)
+        self.cache[key] = result
+        return result
+
+    def satisfiable(self, clauses):
+        if not clauses:
+            return True
+        variable = abs(clauses[0][0])
+        for literal in (variable, -variable):
+            mark = len(self.trail)
+            found = False
+            if self.assign(literal) and self.propagate():
+                found = all(self.satisfiable(component) for component in self.components(self.residual(clauses)))
+            self.backtrack(mark)
+            if found:
+                return True
+        return False
+
+    def count(self):
+        if self.empty:
+            return 0
+        for literal in self.units:
+            if not self.assign(literal):
+                return 0
+        if not self.propagate():
+            self.backtrack(0)
+            return 0
+        remaining = self.residual(self.clauses)
+        result = self.free_weight(range(1, len(self.names)), remaining) * self.count_components(remaining)
+        self.backtrack(0)
+        return result
+
+
+def count_models(clauses, variables=None, projection=None):
+    """
+    Number of assignments satisfying resolver.py clauses. The count ranges over the variables of
+    the clauses plus any extra names in variables; with a projection, it counts the assignments
+    to the projected variables that extend to a model.
+    """
+    counter = ModelCounter(clauses, variables, projection)
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 4 * len(counter.names) + 1000))
+    try:
+        return counter.count()
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+if __name__ == "__main__":
+    import time
+
+    print(count_models([{"P", "Q"}, {"¬P", "R"}]))
+    print(count_models([{"P", "Q"}, {"¬P", "R"}], projection=["Q", "R"]))
+
+    # Independent sets of a 10x10 grid: no two neighbouring cells both chosen
+    size = 10
+    cells = [[f"X{row}0{column}" for column in range(size)] for row in range(size)]
+    clauses = [{f"¬{cells[r][c]}", f"¬{cells[r][c + 1]}"} for r in range(size) for c in range(size - 1)]
+    clauses += [{f"¬{cells[r][c]}", f"¬{cells[r + 1][c]}"} for r in range(size - 1) for c in range(size)]
+    start = time.perf_counter()
+    counter = ModelCounter(clauses)
+    print(f"{size * size} variables: {counter.count()} models in {time.perf_counter() - start:.2f}s",
+          f"({counter.decisions} decisions, {counter.cache_hits} cache hits)")
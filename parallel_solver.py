@@ -0,0 +1,355 @@
+import mmap
+import os
+import select
+import signal
+import struct
+from array import array
+
+from model_counter import encode_clauses
+from resolver import UNKNOWN, XorShift, local_search
+from sat_solver import SATSolver
+
+SAT, UNSAT, GAVE_UP = 1, 0, 2  # Worker result codes
+HEADER = struct.Struct("<iiB")  # Task index, size of the model bytes, result code
+
+
+def share_clauses(clauses):
+    """
+    Packs resolver.py clauses into an anonymous shared mmap, the compact form the workers read:
+    int32 words [variables, clauses, literals, name bytes], the clause start offsets, the literals
+    (-v for ¬v), then the variable names as NUL separated UTF-8, padded to whole words. A forked worker reads the buffer
+    in place instead of receiving a pickled copy of the clause sets.
+    """
+    # Sorted literals number the variables the same way in every run, whatever the string hashing
+    encoded, names, _ = encode_clauses([sorted(clause) for clause in clauses])
+    offsets = array("i", [0])
+    literals = array("i")
+    for clause in encoded:
+        literals.extend(clause)
+        offsets.append(len(literals))
+    text = "\0".join(names[1:]).encode("utf-8")
+    words = array("i", [len(names) - 1, len(encoded), len(literals), len(text)]) + offsets + literals
+    buffer = mmap.mmap(-1, words.itemsize * (len(words) + len(text) // words.itemsize + 1))
+    buffer.write(words.tobytes())
+    buffer.write(text)
+    return buffer
+
+
+def read_clauses(buffer):
+    """Decodes a share_clauses buffer back into (int clauses, names) with names[v] naming variable v."""
+    words = memoryview(buffer).cast("i")
+    variables, count, size, text_size = words[:4]
+    offsets = words[4:5 + count]
+    literals = words[5 + count:5 + count + size]
+    clauses = [list(literals[offsets[k]:offsets[k + 1]]) for k in range(count)]
+    start = 4 * (5 + count + size)
+    names = [None] + (bytes(buffer[start:start + text_size]).decode("utf-8").split("\0") if variables else [])
+    words.release()
+    return clauses, names
+
+
+def named_clauses(clauses, names):
+    return [[names[literal] if literal > 0 else "¬" + names[-literal] for literal in clause] for clause in clauses]
+
+
+def make_solver(clauses, seed=None):
+    """A SATSolver whose initial phases and branching order are shuffled by the seed, if any."""
+    solver = SATSolver(clauses)
+    if seed is not None:
+        random = XorShift(seed)
+        for variable in range(1, len(solver.names)):
+            solver.phases[variable] = random.below(2) == 1
+            solver.activity[variable] = random.uniform() * 1e-3
+        solver.rebuild_heap()
+    return solver
+
+
+def portfolio_configs(workers, seed=None):
+    """
+    Solver configurations raced in portfolio mode, as (method, seed): the CDCL solver first,
+    then alternately WalkSAT, a CDCL solver with shuffled phases and order, and ProbSAT.
+    """
+    base = 1 if seed is None else seed
+    methods = ["cdcl", "walksat", "cdcl", "probsat"]
+    configs = []
+    for k in range(max(1, workers)):
+        configs.append((methods[k % len(methods)], None if k == 0 and seed is None else base + k))
+    return configs
+
+
+def run_tasks(buffer, tasks):
+    """
+    Solves tasks in order, yielding (index, code, values) for each; values holds one byte per
+    variable when the code is SAT. A task is (index, method, seed, cube): the cube's literals are
+    assumptions for an incremental CDCL solver kept across the cubes, local search ignores them.
+    """
+    clauses, names = read_clauses(buffer)
+    strings = named_clauses(clauses, names)
+    solvers = {}
+    for index, method, seed, cube in tasks:
+        if method in ("walksat", "probsat"):
+            model = local_search(strings, method=method, seed=seed)
+            code = GAVE_UP if model == UNKNOWN else SAT
+        else:
+            if seed not in solvers:
+                solvers[seed] = make_solver(strings, seed)
+            solver = solvers[seed]
+            code = SAT if solver.solve(named_clauses([cube], names)[0]) else UNSAT
+            model = solver.model() if code == SAT else None
+        values = bytes(1 if model.get(names[v], False) else 0 for v in range(1, len(names))) if code == SAT else b""
+        yield index, code, values
+
+
+def collect(buffer, tasks, workers):
+    """
+    Yields (index, code, values) as the tasks are solved. The tasks are dealt round-robin to forked
+    workers, each writing its records to its own pipe; closing the generator kills the workers
+    still running. Without fork, or with one worker, the tasks run in this process.
+    """
+    workers = min(workers, len(tasks))
+    if workers <= 1 or not hasattr(os, "fork"):
+        yield from run_tasks(buffer, tasks)
+        return
+    children = {}  # Read end of the worker's pipe -> pid
+    for k in range(workers):
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                os.close(read_end)
+                for other in children:
+                    os.close(other)
+                for index, code, values in run_tasks(buffer, tasks[k::workers]):
+                    record = memoryview(HEADER.pack(index, len(values), code) + values)
+                    while record:
+                        record = record[os.write(write_end, record):]
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+        os.close(write_end)
+        children[read_end] = pid
+    pending = {read_end: b"" for read_end in children}
+    try:
+        while pending:
+            ready, _, _ = select.select(list(pending), [], [])
+            for read_end in ready:
+                chunk = os.read(read_end, 1 << 16)
+                if not chunk:
+                    os.close(read_end)
+                    del pending[read_end]
+                    continue
+                data = pending[read_end] + chunk
+                while len(data) >= HEADER.size:
+                    index, size, code = HEADER.unpack_from(data)
+                    if len(data) < HEADER.size + size:
+                        break
+                    yield index, code, data[HEADER.size:HEADER.size + size]
+                    data = data[HEADER.size + size:]
+                pending[read_end] = data
+    finally:
+        for read_end in pending:
+            os.close(read_end)
+        for pid in children.values():
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
+
+
+def propagate(clauses, occurrences, values, literals):
+    """
+    Unit propagation from the given literals for the lookahead; values[v] is 1, -1 or 0.
+    Returns the literals it assigned, or None on a conflict (with values restored).
+    """
+    trail = []
+    queue = list(literals)
+    while queue:
+        literal = queue.pop()
+        value = values[abs(literal)]
+        if value:
+            if (value > 0) != (literal > 0):
+                undo(values, trail)
+                return None
+            continue
+        values[abs(literal)] = 1 if literal > 0 else -1
+        trail.append(literal)
+        for index in occurrences.get(-literal, ()):
+            free = []
+            for other in clauses[index]:
+                value = values[abs(other)]
+                if not value:
+                    free.append(other)
+                elif (value > 0) == (other > 0):
+                    break
+            else:
+                if not free:
+                    undo(values, trail)
+                    return None
+                if len(free) == 1:
+                    queue.append(free[0])
+    return trail
+
+
+def undo(values, trail):
+    for literal in trail:
+        values[abs(literal)] = 0
+
+
+def make_cubes(clauses, variables, depth, candidates=16):
+    """
+    Splits int clauses into at most 2^depth cubes by lookahead. At each node the variables that
+    occur most in the open clauses are tried both ways: a side that propagates to a conflict is a
+    failed literal, so the other side is added to the cube, and otherwise the variable scores
+    (1 + a)(1 + b) for the a and b variables its two sides assign. The best one is branched on,
+    and cubes refuted by propagation are dropped. Returns the cubes as lists of literals.
+    """
+    occurrences = {}
+    for index, clause in enumerate(clauses):
+        for literal in clause:
+            occurrences.setdefault(literal, []).append(index)
+    values = [0] * (variables + 1)
+    cubes = []
+    if any(not clause for clause in clauses):
+        return cubes
+
+    def split(cube, level):
+        forced = []
+        while True:
+            counts = {}
+            for clause in clauses:
+                if any(values[abs(literal)] == (1 if literal > 0 else -1) for literal in clause):
+                    continue
+                for literal in clause:
+                    if not values[abs(literal)]:
+                        counts[abs(literal)] = counts.get(abs(literal), 0) + 1
+            if not level or not counts:
+                cubes.append(list(cube))
+                break
+            best, best_score, failed = None, -1, None
+            for variable in sorted(counts, key=lambda v: (-counts[v], v))[:candidates]:
+                sizes = []
+                for literal in (variable, -variable):
+                    trail = propagate(clauses, occurrences, values, [literal])
+                    sizes.append(None if trail is None else len(trail))
+                    if trail is not None:
+                        undo(values, trail)
+                if sizes[0] is None or sizes[1] is None:
+                    failed = variable
+                    break
+                if (1 + sizes[0]) * (1 + sizes[1]) > best_score:
+                    best, best_score = variable, (1 + sizes[0]) * (1 + sizes[1])
+            if failed is None:
+                for literal in (best, -best):
+                    trail = propagate(clauses, occurrences, values, [literal])
+                    if trail is not None:
+                        cube.append(literal)
+                        split(cube, level - 1)
+                        cube.pop()
+                        undo(values, trail)
+                break
+            literal = -failed if sizes[0] is None else failed
+            trail = propagate(clauses, occurrences, values, [literal])
+            if trail is None:
+                break
+            cube.append(literal)
+            forced.append(trail)
+        for trail in forced:
+            undo(values, trail)
+            cube.pop()
+
+    root = propagate(clauses, occurrences, values, [clause[0] for clause in clauses if len(clause) == 1])
+    if root is not None:
+        split([], depth)
+    return cubes
+
+
+def decides(code, cubes):
+    """A model always answers; unsatisfiability only answers for the whole problem, not a cube."""
+    return code == SAT or (code == UNSAT and not cubes)
+
+
+def verdict(results, count, cubes, ordered):
+    """
+    The (code, values) answering the problem from the task results so far, or None while
+    undecided. Unordered, the first answer to arrive wins; ordered, the answer of the lowest task,
+    once every task before it has reported. When every cube is unsatisfiable so is the problem.
+    """
+    if ordered:
+        for index in range(count):
+            if index not in results:
+                return None
+            if decides(results[index][0], cubes):
+                return results[index]
+    else:
+        for code, values in results.values():
+            if decides(code, cubes):
+                return code, values
+        if len(results) < count:
+            return None
+    return (UNSAT, b"") if cubes else (GAVE_UP, b"")
+
+
+def solve_parallel(clauses, mode="portfolio", workers=None, seed=None, depth=None):
+    """
+    Checks resolver.py clauses on several processes.
+    portfolio: differently configured solvers (see portfolio_configs) race on the whole problem,
+        and the others are killed as soon as one of them answers.
+    cubes: cube-and-conquer. A lookahead splits the problem into cubes (see make_cubes) that the
+        workers' incremental CDCL solvers take as assumptions; the clauses are satisfiable
+        exactly when some cube is.
+    The workers read the clauses from a shared buffer (see share_clauses) and are forked, so they
+    need a Unix-like system; elsewhere the tasks run one after the other in this process.
+    With a seed, an answer only counts once every task listed before it has reported, so the
+    same seed gives the same answer and model whatever the timing.
+    Returns a model, None if the clauses are unsatisfiable, or UNKNOWN.
+    """
+    workers = workers or os.cpu_count() or 1
+    buffer = share_clauses(clauses)
+    int_clauses, names = read_clauses(buffer)
+    cubes = mode == "cubes"
+    if cubes:
+        if depth is None:
+            depth = max(1, (4 * workers - 1).bit_length())
+        split = make_cubes(int_clauses, len(names) - 1, depth)
+        tasks = [(index, "cdcl", seed, cube) for index, cube in enumerate(split)]
+    else:
+        tasks = [(index, method, config_seed, ()) for index, (method, config_seed) in enumerate(portfolio_configs(workers, seed))]
+    results = {}
+    answer = verdict(results, len(tasks), cubes, seed is not None)
+    if answer is None:
+        results_stream = collect(buffer, tasks, workers)
+        try:
+            for index, code, values in results_stream:
+                results[index] = code, values
+                answer = verdict(results, len(tasks), cubes, seed is not None)
+                if answer is not None:
+                    break
+        finally:
+            results_stream.close()
+    buffer.close()
+    if answer is None or answer[0] == GAVE_UP:
+        return UNKNOWN
+    if answer[0] == UNSAT:
+        return None
+    return {names[v]: bool(answer[1][v - 1]) for v in range(1, len(names))}
+
+
+if __name__ == "__main__":
+    import time
+
+    def pigeonhole(pigeons, holes):
+        clauses = [{f"P{p}0{h}" for h in range(holes)} for p in range(pigeons)]
+        clauses += [{f"¬P{p}0{h}", f"¬P{q}0{h}"} for h in range(holes) for p in range(pigeons) for q in range(p)]
+        return clauses
+
+    for mode in ("portfolio", "cubes"):
+        start = time.perf_counter()
+        model = solve_parallel(pigeonhole(7, 7), mode, workers=4, seed=1)
+        print(f"{mode}, 7 pigeons in 7 holes:", sorted(name for name, value in model.items() if value),
+              f"in {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        print(f"{mode}, 8 pigeons in 7 holes:", solve_parallel(pigeonhole(8, 7), mode, workers=4),
+              f"in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,332 @@
+import time
+
+from resolver import ClauseDatabase, complement_of, is_tautology, strongly_connected_components
+
+
+def normalize_literal(literal):
+    """"¬¬P" -> "P": an even number of ¬ cancels out."""
+    name = literal.lstrip("¬")
+    return "¬" + name if (len(literal) - len(name)) % 2 else name
+
+
+def variable_of(literal):
+    return literal.lstrip("¬")
+
+
+class Preprocessor:
+    """
+    Simplifies a CNF given as resolver.py clauses (sets of literals such as "P" and "¬P") before
+    it goes to any solver. The steps, each of which can be switched off:
+    - unit propagation, subsumption and self-subsuming resolution (strengthening),
+    - equivalent-literal substitution: literals on a cycle of binary clauses are equivalent,
+      each strongly connected component of the implication graph is replaced by one literal,
+    - failed-literal probing: a literal whose propagation ends in a conflict is false,
+    - bounded variable elimination: a variable is resolved away when that does not add clauses,
+    - blocked clause elimination: a clause whose resolvents on one of its literals are all
+      tautologies is dropped.
+    The rounds repeat until nothing changes or the time budget (in seconds) runs out; stopping
+    early is always safe. Variables in frozen are never eliminated or substituted, so the
+    simplified clauses have the same models as the original ones when restricted to them.
+
+    Every clause removed by elimination, blocking or substitution, and every fixed literal, goes on
+    a reconstruction stack as (clause, literal). extend_model replays it backwards, making the
+    literal true whenever the clause is false, which turns a model of the simplified clauses into
+    a model of the original ones.
+    """
+
+    def __init__(self, clauses, subsumption=True, equivalences=True, probing=True, elimination=True,
+                 blocked=True, time_budget=1.0, frozen=(), max_growth=0, max_occurrences=16):
+        self.subsumption = subsumption
+        self.equivalences = equivalences
+        self.probing = probing
+        self.elimination = elimination
+        self.blocked = blocked
+        self.time_budget = time_budget
+        self.frozen = set(frozen)
+        self.max_growth = max_growth
+        self.max_occurrences = max_occurrences
+        self.database = ClauseDatabase()
+        self.stack = []
+        self.fixed = set()
+        self.units = []
+        self.touched = set()  # Clauses not yet used to strengthen others
+        self.unsatisfiable = False
+        self.deadline = None
+        self.stats = dict.fromkeys(["units", "subsumed", "strengthened", "substituted", "failed literals",
+                                    "eliminated variables", "blocked clauses"], 0)
+        clauses = [frozenset(normalize_literal(literal) for literal in clause) for clause in clauses]
+        self.variables = {variable_of(literal) for clause in clauses for literal in clause}
+        for clause in clauses:
+            self.add(clause)
+
+    def expired(self):
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def add(self, clause):
+        if self.unsatisfiable or is_tautology(clause) or any(literal in self.fixed for literal in clause):
+            return
+        clause = frozenset(literal for literal in clause if complement_of(literal) not in self.fixed)
+        if not clause:
+            self.unsatisfiable = True
+        elif len(clause) == 1:
+            self.units.append(next(iter(clause)))
+        elif self.database.subsumer(clause) is not None:
+            self.stats["subsumed"] += 1
+        else:
+            if self.subsumption:
+                for clause_id in self.database.subsumed_by(clause):
+                    self.remove(clause_id)
+                    self.stats["subsumed"] += 1
+            self.touched.add(self.database.add(clause))
+
+    def remove(self, clause_id):
+        self.database.remove(clause_id)
+        self.touched.discard(clause_id)
+
+    def occurrences(self, literal):
+        return list(self.database.occurrences.get(literal, ()))
+
+    def assign_units(self):
+        """Fixes the pending unit literals: satisfied clauses go, clauses with the complement shrink."""
+        while self.units and not self.unsatisfiable:
+            literal = self.units.pop()
+            if literal in self.fixed:
+                continue
+            if complement_of(literal) in self.fixed:
+                self.unsatisfiable = True
+                return
+            self.fixed.add(literal)
+            self.stack.append((frozenset([literal]), literal))
+            self.stats["units"] += 1
+            for clause_id in self.occurrences(literal):
+                self.remove(clause_id)
+            for clause_id in self.occurrences(complement_of(literal)):
+                clause = self.database.clauses[clause_id]
+                self.remove(clause_id)
+                self.add(clause)
+
+    def strengthen(self):
+        """
+        Self-subsuming resolution: if D ∨ ¬l and C ∨ l are clauses with D ⊆ C, resolving them gives C,
+        so l can be removed from C ∨ l. The clauses containing D and l are the intersection of
+        their occurrence lists. Each clause acts as the strengthener once, plus once more after
+        it changes; subsumption is checked whenever a clause is added.
+        """
+        while self.touched and not self.unsatisfiable and not self.expired():
+            clause_id = self.touched.pop()
+            clause = self.database.clauses.get(clause_id)
+            if clause is None:
+                continue
+            for literal in clause:
+                complement = complement_of(literal)
+                sets = [self.database.occurrences.get(other, set()) for other in clause if other != literal]
+                candidates = self.database.occurrences.get(complement, set()).intersection(*sets)
+                for candidate_id in list(candidates):
+                    candidate = self.database.clauses.get(candidate_id)
+                    if candidate is None:
+                        continue
+                    self.remove(candidate_id)
+                    self.stats["strengthened"] += 1
+                    self.add(candidate - {complement})
+                if clause_id not in self.database.clauses:
+                    break
+            self.assign_units()
+
+    def implication_graph(self):
+        """Binary clause a ∨ b gives the implications ¬a ⇒ b and ¬b ⇒ a."""
+        graph = {}
+        for clause in self.database.clauses.values():
+            if len(clause) == 2:
+                a, b = clause
+                graph.setdefault(complement_of(a), []).append(b)
+                graph.setdefault(complement_of(b), []).append(a)
+        return graph
+
+    def substitute_equivalences(self):
+        """
+        Literals in one strongly connected component of the implication graph imply each other,
+        so each of them is replaced by a representative: a frozen variable if there is one,
+        otherwise the smallest name. A component holding a literal and its complement means
+        the clauses are unsatisfiable.
+        """
+        representative = {}
+        for component in strongly_connected_components(self.implication_graph()):
+            if len(component) == 1:
+                continue
+            members = set(component)
+            if any(complement_of(literal) in members for literal in component):
+                self.unsatisfiable = True
+                return
+            chosen = min(component, key=lambda literal: (variable_of(literal) not in self.frozen, variable_of(literal)))
+            for literal in component:
+                if literal != chosen and variable_of(literal) not in self.frozen:
+                    representative[literal] = chosen
+        if not representative:
+            return
+        for literal, chosen in representative.items():
+            if not literal.startswith("¬"):
+                # literal ⇔ chosen, kept for extend_model
+                self.stack.append((frozenset([literal, complement_of(chosen)]), literal))
+                self.stack.append((frozenset([complement_of(literal), chosen]), complement_of(literal)))
+                self.stats["substituted"] += 1
+        affected = {clause_id for literal in representative for clause_id in self.occurrences(literal)}
+        for clause_id in affected:
+            clause = self.database.clauses.get(clause_id)
+            if clause is None:
+                continue
+            self.remove(clause_id)
+            self.add(frozenset(representative.get(literal, literal) for literal in clause))
+        self.assign_units()
+
+    def propagates_to_conflict(self, literal):
+        """Unit propagation from a single literal over the current clauses; True on a conflict."""
+        assigned = {literal}
+        queue = [literal]
+        while queue:
+            false_literal = complement_of(queue.pop())
+            for clause_id in self.database.occurrences.get(false_literal, ()):
+                open_literals = []
+                for other in self.database.clauses[clause_id]:
+                    if other in assigned:
+                        break
+                    if complement_of(other) not in assigned:
+                        open_literals.append(other)
+                else:
+                    if not open_literals:
+                        return True
+                    if len(open_literals) == 1:
+                        assigned.add(open_literals[0])
+                        queue.append(open_literals[0])
+        return False
+
+    def probe(self):
+        """Failed-literal probing on the literals of binary clauses, where propagation goes furthest."""
+        candidates = sorted({literal for clause in self.database.clauses.values() if len(clause) == 2
+                             for literal in clause})
+        for literal in candidates:
+            if self.unsatisfiable or self.expired():
+                return
+            if literal in self.fixed or complement_of(literal) in self.fixed:
+                continue
+            if self.propagates_to_conflict(literal):
+                self.stats["failed literals"] += 1
+                self.units.append(complement_of(literal))
+                self.assign_units()
+
+    def eliminate_variables(self):
+        """
+        Bounded variable elimination: a variable's clauses are replaced by all their non-tautological
+        resolvents on it, when there are no more than max_growth more of those than clauses removed.
+        Variables with few occurrences go first, those with many are skipped.
+        """
+        def cost(variable):
+            return len(self.database.occurrences.get(variable, ())) * len(self.database.occurrences.get("¬" + variable, ()))
+
+        for variable in sorted(self.variables - self.frozen, key=cost):
+            if self.unsatisfiable or self.expired():
+                return
+            positive = self.occurrences(variable)
+            negative = self.occurrences("¬" + variable)
+            if not positive and not negative:
+                continue
+            if len(positive) > self.max_occurrences or len(negative) > self.max_occurrences:
+                continue
+            limit = len(positive) + len(negative) + self.max_growth
+            resolvents = []
+            for p in positive:
+                for n in negative:
+                    resolvent = (self.database.clauses[p] - {variable}) | (self.database.clauses[n] - {"¬" + variable})
+                    if not is_tautology(resolvent):
+                        resolvents.append(resolvent)
+                if len(resolvents) > limit:
+                    break
+            if len(resolvents) > limit:
+                continue
+            for clause_ids, pivot in [(positive, variable), (negative, "¬" + variable)]:
+                for clause_id in clause_ids:
+                    self.stack.append((self.database.clauses[clause_id], pivot))
+                    self.remove(clause_id)
+            self.stats["eliminated variables"] += 1
+            for resolvent in resolvents:
+                self.add(resolvent)
+            self.assign_units()
+
+    def eliminate_blocked(self):
+        """Drops clauses blocked on a literal: every resolvent on it contains a complementary pair."""
+        changed = True
+        while changed and not self.unsatisfiable and not self.expired():
+            changed = False
+            for clause_id in list(self.database.clauses):
+                clause = self.database.clauses.get(clause_id)
+                if clause is None:
+                    continue
+                for literal in clause:
+                    if variable_of(literal) in self.frozen:
+                        continue
+                    partners = self.database.occurrences.get(complement_of(literal), ())
+                    if all(any(complement_of(other) in self.database.clauses[partner_id]
+                               for other in clause if other != literal) for partner_id in partners):
+                        self.stack.append((clause, literal))
+                        self.remove(clause_id)
+                        self.stats["blocked clauses"] += 1
+                        changed = True
+                        break
+
+    def run(self):
+        """Runs the enabled steps in rounds and returns the simplified clauses ([∅] if unsatisfiable)."""
+        self.deadline = time.perf_counter() + self.time_budget
+        self.assign_units()
+        while not self.unsatisfiable and not self.expired():
+            before = sum(self.stats.values())
+            if self.subsumption:
+                self.strengthen()
+            if self.equivalences and not self.unsatisfiable:
+                self.substitute_equivalences()
+            if self.probing and not self.unsatisfiable:
+                self.probe()
+            if self.elimination and not self.unsatisfiable:
+                self.eliminate_variables()
+            if self.blocked and not self.unsatisfiable:
+                self.eliminate_blocked()
+            if sum(self.stats.values()) == before:
+                break
+        return self.clauses()
+
+    def clauses(self):
+        if self.unsatisfiable:
+            return [frozenset()]
+        # Fixed frozen variables stay visible as units
+        units = [frozenset([literal]) for literal in sorted(self.fixed) if variable_of(literal) in self.frozen]
+        return units + list(self.database.clauses.values())
+
+    def extend_model(self, model):
+        """Turns a model of the simplified clauses ({name: bool}) into one of the original clauses."""
+        values = dict(model)
+        for variable in self.variables:
+            values.setdefault(variable, False)
+        for clause, literal in reversed(self.stack):
+            if not any(values[variable_of(other)] != other.startswith("¬") for other in clause):
+                values[variable_of(literal)] = not literal.startswith("¬")
+        return values
+
+
+def preprocess(clauses, **options):
+    """Runs a Preprocessor with the given options; returns the simplified clauses and the preprocessor."""
+    preprocessor = Preprocessor(clauses, **options)
+    return preprocessor.run(), preprocessor
+
+
+if __name__ == "__main__":
+    from resolver import find_satisfiable_interpretation, is_satisfied
+
+    # A chain of equivalences A1 ⇔ A2 ⇔ ... ⇔ A30 tied to a few constraints
+    clauses = []
+    for i in range(1, 30):
+        clauses += [{f"¬A{i}", f"A{i + 1}"}, {f"A{i}", f"¬A{i + 1}"}]
+    clauses += [{"A1", "B", "C"}, {"¬A30", "¬B"}, {"B", "¬C", "D"}, {"¬D", "A15"}, {"B", "C", "D", "E"}]
+    simplified, preprocessor = preprocess(clauses)
+    print(f"{len(clauses)} clauses over {len(preprocessor.variables)} variables ->",
+          f"{len(simplified)} clauses: {[set(clause) for clause in simplified]}")
+    print({name: count for name, count in preprocessor.stats.items() if count})
+    model = preprocessor.extend_model(find_satisfiable_interpretation(simplified) or {})
+    print("Extended model satisfies the original clauses:", is_satisfied(model, clauses))
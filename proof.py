@@ -0,0 +1,379 @@
+def literal_number(literal, index):
+    """"P" -> index["P"], "¬P" -> -index["P"]; an even number of ¬ cancels out."""
+    name = literal.lstrip("¬")
+    return -index[name] if (len(literal) - len(name)) % 2 else index[name]
+
+
+def write_dimacs(clauses, path):
+    """
+    Writes resolver.py clauses as a DIMACS CNF file, the formula a proof refers to. Variables are
+    numbered in order of appearance, and "c <number> <name>" comments keep their names.
+    Returns the numbering, {name: number}.
+    """
+    clauses = [sorted(clause) for clause in clauses]
+    index = {}
+    for clause in clauses:
+        for literal in clause:
+            index.setdefault(literal.lstrip("¬"), len(index) + 1)
+    with open(path, "w", encoding="utf-8") as file:
+        for name, number in index.items():
+            file.write(f"c {number} {name}\n")
+        file.write(f"p cnf {len(index)} {len(clauses)}\n")
+        for clause in clauses:
+            file.write(" ".join(str(literal_number(literal, index)) for literal in clause) + " 0\n")
+    return index
+
+
+def read_dimacs(path):
+    """Reads a DIMACS CNF file; returns (clauses as lists of ints, {number: name} from the comments)."""
+    clauses = []
+    names = {}
+    current = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            fields = line.split()
+            if not fields or fields[0] == "p":
+                continue
+            if fields[0] == "c":
+                if len(fields) == 3 and fields[1].isdigit():
+                    names[int(fields[1])] = fields[2]
+                continue
+            for field in fields:
+                if field == "0":
+                    clauses.append(current)
+                    current = []
+                else:
+                    current.append(int(field))
+    return clauses, names
+
+
+class DratWriter:
+    """
+    Streams a DRAT proof: one line per clause added ("1 -2 0") or deleted ("d 1 -2 0"), numbered as
+    in the CNF written by write_dimacs. The proof of an unsatisfiable formula ends with the empty
+    clause. Lines are written as the search runs.
+    """
+
+    def __init__(self, path, index):
+        self.file = open(path, "w", encoding="utf-8")
+        self.index = index
+
+    def write(self, numbers, delete=False):
+        self.file.write(("d " if delete else "") + "".join(f"{number} " for number in numbers) + "0\n")
+
+    def add(self, literals):
+        self.write([literal_number(literal, self.index) for literal in literals])
+
+    def delete(self, literals):
+        self.write([literal_number(literal, self.index) for literal in literals], True)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ResolutionTrace:
+    """
+    Streams a resolution proof as a DAG, one line per clause: "<id> <literals> 0 <antecedents> 0".
+    Original clauses have no antecedents; a derived clause follows from its antecedents by unit
+    propagation, which for two antecedents is a resolution step.
+    """
+
+    def __init__(self, path, index):
+        self.file = open(path, "w", encoding="utf-8")
+        self.index = index
+        self.ids = {}  # frozenset of literal numbers -> id of its first line
+        self.clauses = []  # Literal numbers of the clause with id k + 1
+
+    def write(self, clause, antecedents):
+        numbers = sorted({literal_number(literal, self.index) for literal in clause}, key=abs)
+        self.clauses.append(numbers)
+        clause_id = len(self.clauses)
+        self.ids.setdefault(frozenset(numbers), clause_id)
+        self.file.write(f"{clause_id} " + "".join(f"{number} " for number in numbers) + "0 "
+                        + "".join(f"{antecedent} " for antecedent in antecedents) + "0\n")
+        return clause_id
+
+    def original(self, clause):
+        """Id of an original clause, written on first use."""
+        key = frozenset(literal_number(literal, self.index) for literal in clause)
+        return self.ids.get(key) or self.write(clause, [])
+
+    def derive(self, clause, antecedents):
+        return self.write(clause, antecedents)
+
+    def id_of(self, clause):
+        return self.ids.get(frozenset(literal_number(literal, self.index) for literal in clause))
+
+    def derive_by_propagation(self, clause):
+        """
+        Derives a clause that unit propagation proves from the clauses written so far (as the
+        DP simplifications do), with the clauses the propagation used as antecedents.
+        Returns its id, or None if propagation does not prove it.
+        """
+        propagator = Propagator()
+        for numbers in self.clauses:
+            propagator.add(numbers)
+        used = propagator.rup([literal_number(literal, self.index) for literal in clause])
+        if used is None:
+            return None
+        return self.write(clause, sorted(index + 1 for index in used))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Propagator:
+    """
+    Clauses of ints watched by two literals, with an active flag each, for the proof checkers.
+    rup checks that a clause is a reverse unit propagation consequence of the active clauses
+    (asserting its negation propagates to a conflict) and reports the clauses the conflict
+    depends on. The watches stay valid between checks since every check starts unassigned.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.active = []
+        self.watches = {}
+        self.occurrences = {}
+        self.units = []  # Indices of the unit and empty clauses
+        self.values = {}  # Variable -> 1 or -1
+        self.reasons = {}
+
+    def add(self, literals):
+        clause = list(dict.fromkeys(literals))
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.active.append(True)
+        for literal in clause:
+            self.occurrences.setdefault(literal, []).append(index)
+        if len(clause) < 2:
+            self.units.append(index)
+        else:
+            self.watches.setdefault(clause[0], []).append(index)
+            self.watches.setdefault(clause[1], []).append(index)
+        return index
+
+    def value(self, literal):
+        value = self.values.get(abs(literal), 0)
+        return value if literal > 0 else -value
+
+    def rup(self, literals):
+        """The indices of the clauses used to refute the negation of literals, or None."""
+        if any(-literal in literals for literal in literals):
+            return []
+        trail = []
+        try:
+            for literal in literals:
+                if not self.value(literal):
+                    self.values[abs(literal)] = -1 if literal > 0 else 1
+                    self.reasons[abs(literal)] = None
+                    trail.append(-literal)
+            for index in self.units:
+                if not self.active[index]:
+                    continue
+                clause = self.clauses[index]
+                if not clause or self.value(clause[0]) < 0:
+                    return self.conflict_clauses(index)
+                if not self.value(clause[0]):
+                    self.values[abs(clause[0])] = 1 if clause[0] > 0 else -1
+                    self.reasons[abs(clause[0])] = index
+                    trail.append(clause[0])
+            conflict = self.propagate(trail)
+            return None if conflict is None else self.conflict_clauses(conflict)
+        finally:
+            for literal in trail:
+                del self.values[abs(literal)]
+
+    def propagate(self, trail):
+        head = 0
+        while head < len(trail):
+            false_literal = -trail[head]
+            head += 1
+            watchers = self.watches.get(false_literal, [])
+            kept = 0
+            position = 0
+            while position < len(watchers):
+                index = watchers[position]
+                position += 1
+                clause = self.clauses[index]
+                if not self.active[index]:
+                    watchers[kept] = index
+                    kept += 1
+                    continue
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) > 0:
+                    watchers[kept] = index
+                    kept += 1
+                    continue
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) >= 0:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(index)
+                        break
+                else:
+                    watchers[kept] = index
+                    kept += 1
+                    if self.value(clause[0]) < 0:
+                        while position < len(watchers):
+                            watchers[kept] = watchers[position]
+                            kept += 1
+                            position += 1
+                        del watchers[kept:]
+                        return index
+                    self.values[abs(clause[0])] = 1 if clause[0] > 0 else -1
+                    self.reasons[abs(clause[0])] = index
+                    trail.append(clause[0])
+            del watchers[kept:]
+        return None
+
+    def conflict_clauses(self, conflict):
+        """The conflicting clause and the reasons of every literal its falsification goes back to."""
+        used = {conflict}
+        stack = [conflict]
+        while stack:
+            for literal in self.clauses[stack.pop()]:
+                reason = self.reasons.get(abs(literal))
+                if reason is not None and reason not in used:
+                    used.add(reason)
+                    stack.append(reason)
+        return used
+
+
+def check_drat(cnf_path, proof_path):
+    """
+    Checks a DRAT proof of unsatisfiability independently of the search that wrote it.
+    The lemmas are replayed forwards, with deletions, up to the empty clause; then they are
+    checked backwards, each against the clauses active just before it, but only the lemmas the
+    refutation ends up depending on (backward core trimming). A lemma must be a RUP consequence
+    or, failing that, a RAT on its first literal: every resolvent with an active clause containing
+    its complement is RUP. Returns (True, core) with the indices of the original clauses used, or
+    (False, reason).
+    """
+    formula, _ = read_dimacs(cnf_path)
+    propagator = Propagator()
+    for clause in formula:
+        propagator.add(clause)
+    live = {}  # Sorted literals -> indices of the active copies
+    for index, clause in enumerate(formula):
+        live.setdefault(tuple(sorted(set(clause))), []).append(index)
+    steps = []
+    refuted = False
+    with open(proof_path, encoding="utf-8") as file:
+        for line in file:
+            fields = line.split()
+            if not fields or fields[0] == "c":
+                continue
+            delete = fields[0] == "d"
+            literals = [int(field) for field in fields[delete:] if field != "0"]
+            key = tuple(sorted(set(literals)))
+            if delete:
+                if live.get(key):
+                    index = live[key].pop()
+                    propagator.active[index] = False
+                    steps.append((True, index, None))
+                continue
+            index = propagator.add(literals)
+            live.setdefault(key, []).append(index)
+            # The watches reorder the clause, so the RAT pivot is kept aside
+            steps.append((False, index, literals[0] if literals else None))
+            if not literals:
+                refuted = True
+                break
+    if refuted:
+        marked = {steps[-1][1]}
+    else:
+        used = propagator.rup([])
+        if used is None:
+            return False, "the proof does not derive the empty clause"
+        marked = set(used)
+    for delete, index, pivot in reversed(steps):
+        if delete:
+            propagator.active[index] = True
+            continue
+        propagator.active[index] = False
+        if index not in marked:
+            continue
+        lemma = propagator.clauses[index]
+        used = propagator.rup(lemma)
+        if used is None and lemma:
+            used = set()
+            for other in propagator.occurrences.get(-pivot, ()):
+                if not propagator.active[other]:
+                    continue
+                resolvent_used = propagator.rup(lemma + [literal for literal in propagator.clauses[other] if literal != -pivot])
+                if resolvent_used is None:
+                    used = None
+                    break
+                used.update(resolvent_used)
+                used.add(other)
+        if used is None:
+            return False, f"lemma {' '.join(map(str, lemma))} 0 is neither RUP nor RAT"
+        marked.update(used)
+    return True, sorted(index for index in marked if index < len(formula))
+
+
+def check_trace(cnf_path, trace_path):
+    """
+    Checks a resolution trace (see ResolutionTrace) independently of the search that wrote it.
+    Starting from an empty clause, the antecedents are followed back, and only the clauses reached
+    are checked: an original clause must be in the CNF, a derived one must follow from its earlier
+    antecedents by unit propagation. Returns (True, core) with the indices of the original clauses
+    used, or (False, reason).
+    """
+    formula, _ = read_dimacs(cnf_path)
+    originals = {}
+    for index, clause in enumerate(formula):
+        originals.setdefault(frozenset(clause), index)
+    lines = {}
+    empty = None
+    with open(trace_path, encoding="utf-8") as file:
+        for line in file:
+            fields = [int(field) for field in line.split()]
+            if not fields:
+                continue
+            separator = fields.index(0, 1)
+            clause_id = fields[0]
+            lines[clause_id] = (fields[1:separator], fields[separator + 1:-1])
+            if separator == 1:
+                empty = clause_id
+                break
+    if empty is None:
+        return False, "the trace does not derive the empty clause"
+    core = set()
+    checked = set()
+    stack = [empty]
+    while stack:
+        clause_id = stack.pop()
+        if clause_id in checked:
+            continue
+        checked.add(clause_id)
+        if clause_id not in lines:
+            return False, f"clause {clause_id} is missing"
+        literals, antecedents = lines[clause_id]
+        if not antecedents:
+            if frozenset(literals) not in originals:
+                return False, f"clause {clause_id} is not in the formula"
+            core.add(originals[frozenset(literals)])
+            continue
+        if any(antecedent >= clause_id or antecedent not in lines for antecedent in antecedents):
+            return False, f"clause {clause_id} has an antecedent that is not an earlier clause"
+        propagator = Propagator()
+        for antecedent in antecedents:
+            propagator.add(lines[antecedent][0])
+        if propagator.rup(literals) is None:
+            return False, f"clause {clause_id} does not follow from its antecedents"
+        stack.extend(antecedents)
+    return True, sorted(core)
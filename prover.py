@@ -0,0 +1,464 @@
+import heapq
+import time
+
+from clausifier import FreshNames, clausify, format_clause, is_variable, negate_literal
+
+
+class Substitution:
+    """
+    Union-find over variables. A class of variables is either unbound or bound to a single
+    non-variable term, which is stored on its representative.
+    """
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, term):
+        """Returns the representative variable or the term a variable class is bound to."""
+        path = []
+        while is_variable(term) and term in self.parent:
+            path.append(term)
+            term = self.parent[term]
+        for variable in path[:-1]:
+            self.parent[variable] = term
+        return term
+
+    def occurs(self, variable, term):
+        stack = [term]
+        while stack:
+            current = self.find(stack.pop())
+            if current == variable:
+                return True
+            if isinstance(current, tuple):
+                stack.extend(current[1])
+        return False
+
+    def unify(self, left, right):
+        """Extends the substitution so that left and right become equal, with occurs check."""
+        stack = [(left, right)]
+        while stack:
+            a, b = stack.pop()
+            a, b = self.find(a), self.find(b)
+            if a == b:
+                continue
+            if is_variable(a):
+                if self.occurs(a, b):
+                    return False
+                self.parent[a] = b
+            elif is_variable(b):
+                if self.occurs(b, a):
+                    return False
+                self.parent[b] = a
+            elif isinstance(a, tuple) and isinstance(b, tuple):
+                if a[0] != b[0] or len(a[1]) != len(b[1]):
+                    return False
+                stack.extend(zip(a[1], b[1]))
+            else:
+                return False
+        return True
+
+    def apply(self, term):
+        term = self.find(term)
+        if isinstance(term, tuple):
+            if term[0] == "¬":
+                return "¬", self.apply(term[1])
+            return term[0], tuple(self.apply(argument) for argument in term[1])
+        return term
+
+
+def match(pattern, target, bindings):
+    """One-way matching: binds only variables of the pattern. Returns the extended bindings or None."""
+    stack = [(pattern, target)]
+    bindings = dict(bindings)
+    while stack:
+        p, t = stack.pop()
+        if is_variable(p):
+            if p in bindings:
+                if bindings[p] != t:
+                    return None
+            else:
+                bindings[p] = t
+        elif isinstance(p, tuple):
+            if not isinstance(t, tuple) or p[0] != t[0] or len(p[1]) != len(t[1]):
+                return None
+            stack.extend(zip(p[1], t[1]))
+        elif p != t:
+            return None
+    return bindings
+
+
+def literal_atom(literal):
+    return literal[1] if literal[0] == "¬" else literal
+
+
+def literal_sign(literal):
+    return literal[0] != "¬"
+
+
+def term_weight(term):
+    if isinstance(term, tuple):
+        return 1 + sum(term_weight(argument) for argument in term[1])
+    return 1
+
+
+def variable_occurrences(term, counts=None):
+    counts = {} if counts is None else counts
+    if is_variable(term):
+        counts[term] = counts.get(term, 0) + 1
+    elif isinstance(term, tuple):
+        for argument in term[1]:
+            variable_occurrences(argument, counts)
+    return counts
+
+
+def greater(left, right):
+    """
+    A weight-based ordering on atoms that is stable under substitution: left ≻ right if it is
+    heavier and every variable occurs in it at least as often as in right.
+    """
+    if term_weight(left) <= term_weight(right):
+        return False
+    left_counts = variable_occurrences(left)
+    return all(left_counts.get(variable, 0) >= count for variable, count in variable_occurrences(right).items())
+
+
+class Clause:
+    def __init__(self, literals, identifier, parents=(), rule="input"):
+        self.literals = tuple(literals)
+        self.id = identifier
+        self.parents = parents
+        self.rule = rule
+        self.deleted = False
+        self.weight = sum(term_weight(literal_atom(literal)) for literal in self.literals)
+        atoms = [literal_atom(literal) for literal in self.literals]
+        self.maximal = [literal for literal, atom in zip(self.literals, atoms)
+                        if not any(greater(other, atom) for other in atoms if other is not atom)]
+
+    def __repr__(self):
+        return format_clause(self.literals) if self.literals else "∅"
+
+
+class DiscriminationTree:
+    """
+    Indexes literals by the preorder sequence of their symbols, variables collapsed to '*'.
+    retrieve_unifiable walks the tree and the query together, skipping whole subterms
+    where either side has a variable, so only plausible partners are ever looked at.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    @staticmethod
+    def flatten(term, tokens):
+        if is_variable(term):
+            tokens.append("*")
+        elif isinstance(term, tuple):
+            tokens.append((term[0], len(term[1])))
+            for argument in term[1]:
+                DiscriminationTree.flatten(argument, tokens)
+        else:
+            tokens.append((term, 0))
+        return tokens
+
+    def key(self, literal):
+        return self.flatten(literal_atom(literal), [literal_sign(literal)])
+
+    def insert(self, literal, entry):
+        node = self.root
+        for token in self.key(literal):
+            node = node.setdefault(token, {})
+        node.setdefault(None, []).append(entry)
+        self.size += 1
+
+    def remove(self, literal, entry):
+        node = self.root
+        for token in self.key(literal):
+            node = node.get(token)
+            if node is None:
+                return
+        entries = node.get(None, [])
+        if entry in entries:
+            entries.remove(entry)
+            self.size -= 1
+
+    @staticmethod
+    def skip_tree(node):
+        """Yields the tree nodes reached after skipping exactly one term."""
+        stack = [(node, 1)]
+        while stack:
+            current, pending = stack.pop()
+            if pending == 0:
+                yield current
+                continue
+            for token, child in current.items():
+                if token is None:
+                    continue
+                arity = 0 if token == "*" else token[1]
+                stack.append((child, pending - 1 + arity))
+
+    def retrieve_unifiable(self, literal):
+        query = self.key(literal)
+        # Position after the subterm starting at each query position
+        ends = [0] * len(query)
+        for position in range(len(query) - 1, -1, -1):
+            end = position + 1
+            if position > 0 and query[position] != "*":
+                for _ in range(query[position][1]):
+                    end = ends[end]
+            ends[position] = end
+        results = []
+        stack = [(self.root, 0)]
+        while stack:
+            node, position = stack.pop()
+            if position == len(query):
+                results.extend(node.get(None, ()))
+                continue
+            token = query[position]
+            if position > 0 and token == "*":
+                for child in self.skip_tree(node):
+                    stack.append((child, position + 1))
+                continue
+            if token in node:
+                stack.append((node[token], position + 1))
+            if position > 0 and "*" in node:
+                stack.append((node["*"], ends[position]))
+        return results
+
+
+class GivenClauseProver:
+    """
+    Saturates a clause set with ordered binary resolution and factoring.
+    Clauses wait in a weight queue (with every fifth pick taken by age), get forward-subsumed
+    against everything kept so far and backward-subsume older clauses when they are selected.
+    """
+
+    def __init__(self, max_given=10000, time_limit=None, age_ratio=5):
+        self.max_given = max_given
+        self.time_limit = time_limit
+        self.age_ratio = age_ratio
+        self.fresh = FreshNames()
+        self.clauses = []
+        self.queue_weight = []
+        self.queue_age = []
+        self.processed = set()
+        self.resolution_index = DiscriminationTree()
+        self.subsumption_index = DiscriminationTree()
+        self.statistics = {"input": 0, "generated": 0, "kept": 0, "given": 0, "tautologies": 0,
+                           "forward_subsumed": 0, "backward_subsumed": 0, "factors": 0, "resolvents": 0}
+
+    def rename(self, literals):
+        """Standardizes a clause apart from every other stored clause."""
+        mapping = {}
+
+        def walk(term):
+            if is_variable(term):
+                if term not in mapping:
+                    mapping[term] = self.fresh.variable(term)
+                return mapping[term]
+            if isinstance(term, tuple):
+                if term[0] == "¬":
+                    return "¬", walk(term[1])
+                return term[0], tuple(walk(argument) for argument in term[1])
+            return term
+
+        return [walk(literal) for literal in literals]
+
+    def make_clause(self, literals, parents=(), rule="input"):
+        unique = list(dict.fromkeys(literals))
+        literal_set = set(unique)
+        if any(negate_literal(literal) in literal_set for literal in unique):
+            self.statistics["tautologies"] += 1
+            return None
+        clause = Clause(self.rename(unique), len(self.clauses), parents, rule)
+        self.clauses.append(clause)
+        return clause
+
+    def subsumes(self, general, specific):
+        """general subsumes specific if some substitution maps all its literals into specific."""
+        if len(general.literals) > len(specific.literals):
+            return False
+        literals = sorted(general.literals, key=lambda literal: -term_weight(literal_atom(literal)))
+
+        def search(index, bindings):
+            if index == len(literals):
+                return True
+            literal = literals[index]
+            for candidate in specific.literals:
+                if literal_sign(candidate) != literal_sign(literal):
+                    continue
+                extended = match(literal_atom(literal), literal_atom(candidate), bindings)
+                if extended is not None and search(index + 1, extended):
+                    return True
+            return False
+
+        return search(0, {})
+
+    def forward_subsumed(self, clause):
+        for literal in clause.literals:
+            for candidate in self.subsumption_index.retrieve_unifiable(literal):
+                if not candidate.deleted and candidate is not clause and self.subsumes(candidate, clause):
+                    return True
+        return False
+
+    def backward_subsume(self, clause):
+        if not clause.literals:
+            return
+        literal = max(clause.literals, key=lambda literal: term_weight(literal_atom(literal)))
+        for candidate in self.subsumption_index.retrieve_unifiable(literal):
+            if not candidate.deleted and candidate is not clause and self.subsumes(clause, candidate):
+                self.delete(candidate)
+                self.statistics["backward_subsumed"] += 1
+
+    def delete(self, clause):
+        clause.deleted = True
+        for literal in clause.literals:
+            self.subsumption_index.remove(literal, clause)
+        if clause.id in self.processed:
+            self.processed.discard(clause.id)
+            for literal in clause.maximal:
+                self.resolution_index.remove(literal, clause)
+
+    def keep(self, clause):
+        self.statistics["kept"] += 1
+        for literal in clause.literals:
+            self.subsumption_index.insert(literal, clause)
+        heapq.heappush(self.queue_weight, (clause.weight, clause.id))
+        heapq.heappush(self.queue_age, clause.id)
+
+    def add_clause(self, literals):
+        self.statistics["input"] += 1
+        clause = self.make_clause(literals)
+        if clause is not None and not self.forward_subsumed(clause):
+            self.keep(clause)
+        return clause
+
+    def select_given(self):
+        use_age = self.age_ratio and self.statistics["given"] % self.age_ratio == 0
+        queue = self.queue_age if use_age else self.queue_weight
+        while queue:
+            entry = heapq.heappop(queue)
+            clause = self.clauses[entry if use_age else entry[1]]
+            if not clause.deleted and clause.id not in self.processed:
+                return clause
+        if use_age and self.queue_weight:
+            self.age_ratio, ratio = 0, self.age_ratio
+            clause = self.select_given()
+            self.age_ratio = ratio
+            return clause
+        return None
+
+    def infer(self, given):
+        """Factors of the given clause and resolvents with processed clauses on maximal literals."""
+        inferred = []
+        for i, first in enumerate(given.literals):
+            for second in given.literals[i + 1:]:
+                if literal_sign(first) != literal_sign(second) or (first not in given.maximal and second not in given.maximal):
+                    continue
+                substitution = Substitution()
+                if substitution.unify(literal_atom(first), literal_atom(second)):
+                    literals = [substitution.apply(literal) for literal in given.literals if literal is not second]
+                    inferred.append((literals, (given.id,), "factor"))
+                    self.statistics["factors"] += 1
+        for literal in given.maximal:
+            complement = negate_literal(literal)
+            for partner in self.resolution_index.retrieve_unifiable(complement):
+                if partner.deleted:
+                    continue
+                # A clause resolving with itself needs a renamed copy
+                partner_literals = self.rename(partner.literals) if partner is given else partner.literals
+                for other, original in zip(partner_literals, partner.literals):
+                    if original not in partner.maximal or literal_sign(other) == literal_sign(literal):
+                        continue
+                    substitution = Substitution()
+                    if substitution.unify(literal_atom(literal), literal_atom(other)):
+                        literals = ([substitution.apply(l) for l in given.literals if l is not literal] +
+                                    [substitution.apply(l) for l in partner_literals if l is not other])
+                        inferred.append((literals, (given.id, partner.id), "resolution"))
+                        self.statistics["resolvents"] += 1
+        return inferred
+
+    def proof(self, clause):
+        """The derivation of a clause, in the order the steps were made."""
+        steps, stack, seen = [], [clause], set()
+        while stack:
+            current = stack.pop()
+            if current.id in seen:
+                continue
+            seen.add(current.id)
+            steps.append(current)
+            stack.extend(self.clauses[parent] for parent in current.parents)
+        return sorted(steps, key=lambda step: step.id)
+
+    def saturate(self):
+        """Returns 'Unsatisfiable', 'Satisfiable' (saturated) or 'Unknown' (limits reached), plus the empty clause."""
+        start = time.perf_counter()
+        for clause in self.clauses:
+            if not clause.literals and not clause.deleted:
+                return "Unsatisfiable", clause
+        while True:
+            if self.statistics["given"] >= self.max_given:
+                return "Unknown", None
+            if self.time_limit is not None and time.perf_counter() - start > self.time_limit:
+                return "Unknown", None
+            given = self.select_given()
+            if given is None:
+                return "Satisfiable", None
+            self.statistics["given"] += 1
+            self.backward_subsume(given)
+            self.processed.add(given.id)
+            for literal in given.maximal:
+                self.resolution_index.insert(literal, given)
+            for literals, parents, rule in self.infer(given):
+                self.statistics["generated"] += 1
+                clause = self.make_clause(literals, parents, rule)
+                if clause is None:
+                    continue
+                if not clause.literals:
+                    return "Unsatisfiable", clause
+                if self.forward_subsumed(clause):
+                    self.statistics["forward_subsumed"] += 1
+                    clause.deleted = True
+                    continue
+                self.keep(clause)
+
+
+def prove(formula, premises=(), max_given=10000, time_limit=None, do_print=True):
+    """
+    Tries to prove that a math.py formula follows from the premises by refuting premises ∧ ¬formula.
+    Returns the status ('Theorem', 'CounterSatisfiable' or 'Unknown') and the proof statistics.
+    """
+    prover = GivenClauseProver(max_given, time_limit)
+    fresh = FreshNames()
+    start = time.perf_counter()
+    for premise in premises:
+        for clause in clausify(premise, fresh):
+            prover.add_clause(clause)
+    for clause in clausify(formula, fresh, negated=True):
+        prover.add_clause(clause)
+    status, empty = prover.saturate()
+    statistics = dict(prover.statistics)
+    statistics["seconds"] = time.perf_counter() - start
+    result = {"Unsatisfiable": "Theorem", "Satisfiable": "CounterSatisfiable"}.get(status, "Unknown")
+    if empty is not None:
+        steps = prover.proof(empty)
+        statistics["proof_length"] = len(steps)
+        if do_print:
+            for step in steps:
+                origin = f" from {', '.join(f'({parent})' for parent in step.parents)} by {step.rule}" if step.parents else ""
+                print(f"({step.id}) {step}{origin}")
+    if do_print:
+        print(f"\nAnswer: {result}")
+        for key, value in statistics.items():
+            print(f"{key}: {value}")
+    return result, statistics
+
+
+if __name__ == "__main__":
+    from math import parser
+
+    for data in ["∀x∃y∀z(P(y, z)∨Q(x, y, z)) ⇒ (R(x, z, y)∨¬P(x, z))",
+                 "(∀x(P(x, x))) ⇒ (∀y∃z(P(y, z)))"]:
+        print(data)
+        prove(parser.parse(data), max_given=2000)
+        print()
@@ -1,157 +1,292 @@
 import re
+from heapq import heappush, heappop
+
+from model_counter import encode_clauses
+from budget import BudgetExceeded
+from sat_solver import SATSolver
+
+UNKNOWN = "UNKNOWN"  # local_search gave up; the clauses may still be satisfiable
+
+
 def resolve(clause1, clause2):
     """
-    Resolves two clauses and returns the resulting clause(s) if they can be resolved.
+    Resolves two clauses and returns the resulting clause(s) if they can be resolved,
+    one resolvent per complementary pair of literals.
     """
     resolved_clauses = []
     for literal in clause1:
         complement = "¬" + literal if not literal.startswith("¬") else literal[1:]
         if complement in clause2:
-            new_clause = (clause1 - {literal}) | (clause2 - {complement})
-            return [new_clause]
-    return []
+            resolved_clauses.append((clause1 - {literal}) | (clause2 - {complement}))
+    return resolved_clauses
+
+def complement_of(literal):
+    return "¬" + literal if not literal.startswith("¬") else literal[1:]
 
-def unit_propagation(clauses,indentation=""):
+
+def occurrence_lists(clauses):
+    """Maps each literal to the positions of the clauses containing it."""
+    occurrences = {}
+    for index, clause in enumerate(clauses):
+        for literal in clause:
+            occurrences.setdefault(literal, []).append(index)
+    return occurrences
+
+
+def unit_propagation(clauses, indentation="", verbose=True):
     """
     Apply unit propagation to simplify the clauses.
+    Each literal is mapped to the clauses containing it, and unit clauses wait in a queue: a unit
+    literal only touches the clauses that contain it (removed) or its complement (shortened), and
+    shortened clauses that became units join the queue. Returns False when a clause becomes empty.
     """
-    unit_clauses = [clause for clause in clauses if len(clause) == 1]
-    while unit_clauses:
-        unit = unit_clauses.pop()
-        literal = next(iter(unit))  # Get the single literal
-        print(f"{indentation}Found unit literal {literal}")
-        complement = "¬" + literal if not literal.startswith("¬") else literal[1:]
-        new_clauses = []
-        for clause in clauses:
-            if literal in clause:
-                print(f"{indentation}Removed clause {set(clause)}")
-                continue  # Remove clause if literal is found
-            if complement in clause:
-                new_clause = clause - {complement}
-                if len(new_clause) == 0:
+    current = list(clauses)
+    occurrences = occurrence_lists(current)
+    queue = [index for index, clause in enumerate(current) if len(clause) == 1]
+    changed = False
+    while queue:
+        clause = current[queue.pop()]
+        if clause is None:
+            continue  # Satisfied by an earlier unit
+        literal = next(iter(clause))  # Get the single literal
+        if verbose:
+            print(f"{indentation}Found unit literal {literal}")
+        complement = complement_of(literal)
+        for index in occurrences.get(literal, ()):
+            if current[index] is not None:
+                if verbose:
+                    print(f"{indentation}Removed clause {set(current[index])}")
+                current[index] = None  # Remove clause if literal is found
+                changed = True
+        for index in occurrences.get(complement, ()):
+            clause = current[index]
+            if clause is None:
+                continue
+            new_clause = clause - {complement}
+            if len(new_clause) == 0:
+                if verbose:
                     print(f"{indentation}Removed {complement} from clause {set(clause)} resulting in ∅")
-                    return False
+                return False
+            if verbose:
                 print(f"{indentation}Removed {complement} from clause {set(clause)} resulting {set(new_clause)}")
-                if len(new_clause) == 1:
-                    unit_clauses.append(new_clause)  # New unit clause found
-                new_clauses.append(new_clause)
-            else:
-                new_clauses.append(clause)
-        if clauses != list(map(frozenset, new_clauses)):
-            print(f"{indentation}Clauses after unit propagation:")
-            for i in new_clauses:
-                print(f"{indentation}{set(i)}")
-
-        clauses = new_clauses
+            current[index] = new_clause
+            changed = True
+            if len(new_clause) == 1:
+                queue.append(index)  # New unit clause found
+    clauses = [clause for clause in current if clause is not None]
+    if changed and verbose:
+        print(f"{indentation}Clauses after unit propagation:")
+        for i in clauses:
+            print(f"{indentation}{set(i)}")
     return clauses
 
-def pure_literal_elimination(clauses,indentation=""):
+
+def pure_literal_elimination(clauses, indentation="", verbose=True):
     """
     Apply pure literal elimination.
+    Every literal counts the clauses it occurs in; a literal whose complement has count zero is
+    pure, and removing a clause with a pure literal lowers the counts of its other literals, which
+    can make their complements pure in turn. Those are queued, so no pass over all clauses repeats.
     """
-    literals = set(literal for clause in clauses for literal in clause)
-    pure_literals = set()
+    current = list(clauses)
+    occurrences = occurrence_lists(current)
+    counts = {literal: len(indices) for literal, indices in occurrences.items()}
+    queue = [literal for literal in counts if not counts.get(complement_of(literal))]
     removed = False
-    for literal in literals:
-        if ('¬' + literal) not in literals and not literal.startswith('¬'):
-            pure_literals.add(literal)
-        elif literal[1:] not in literals and literal.startswith('¬'):
-            pure_literals.add(literal)
-    new_clauses = []
-    for clause in clauses:
-        new_clause = {lit for lit in clause if lit not in pure_literals}
-        if new_clause != clause:  # Keep clause if not empty
-            print(f"{indentation}Removed clause {set(clause)} because it contains a pure literal")
+    while queue:
+        literal = queue.pop()
+        for index in occurrences[literal]:
+            clause = current[index]
+            if clause is None:
+                continue
+            if verbose:
+                print(f"{indentation}Removed clause {set(clause)} because it contains a pure literal")
+            current[index] = None
             removed = True
-        else:
-            new_clauses.append(new_clause)
-    if clauses != list(map(frozenset, new_clauses)):
+            for other in clause:
+                counts[other] -= 1
+                complement = complement_of(other)
+                if not counts[other] and counts.get(complement):
+                    queue.append(complement)
+    new_clauses = [clause for clause in current if clause is not None]
+    if removed and verbose:
         print(f"{indentation}Clauses after pure literal elimination:")
         for i in new_clauses:
             print(f"{indentation}{set(i)}")
-    if removed:
-        new_clauses = pure_literal_elimination(new_clauses)
     return new_clauses
 
-def resolution(clauses, dp=True):
+
+class ClauseDatabase:
+    """
+    The clauses kept by the resolution loop, under integer ids, with an index from each literal
+    to the clauses containing it. The index gives the partners of a clause (those holding a
+    complementary literal) and both directions of subsumption without scanning every clause.
+    Each clause is also watched by one of its literals, the rarest when it was added: a subset
+    of a clause has its watched literal in it, so only those few clauses are candidates.
+    """
+
+    def __init__(self):
+        self.clauses = {}
+        self.occurrences = {}
+        self.watched = {}
+        self.watch = {}
+        self.next_id = 0
+
+    def add(self, clause):
+        clause_id = self.next_id
+        self.next_id += 1
+        self.clauses[clause_id] = clause
+        if clause:
+            watch = min(clause, key=lambda literal: len(self.occurrences.get(literal, ())))
+            self.watched.setdefault(watch, set()).add(clause_id)
+            self.watch[clause_id] = watch
+        for literal in clause:
+            self.occurrences.setdefault(literal, set()).add(clause_id)
+        return clause_id
+
+    def remove(self, clause_id):
+        for literal in self.clauses.pop(clause_id):
+            self.occurrences[literal].discard(clause_id)
+        if clause_id in self.watch:
+            self.watched[self.watch.pop(clause_id)].discard(clause_id)
+
+    def subsumer(self, clause):
+        """A stored clause that is a subset of the given one (forward subsumption), or None."""
+        for literal in clause:
+            for clause_id in self.watched.get(literal, ()):
+                if self.clauses[clause_id] <= clause:
+                    return self.clauses[clause_id]
+        return None
+
+    def subsumed_by(self, clause):
+        """Ids of the stored clauses that are supersets of the given one (backward subsumption)."""
+        sets = sorted((self.occurrences.get(literal, set()) for literal in clause), key=len)
+        if not sets:
+            return list(self.clauses)
+        return list(sets[0].intersection(*sets[1:]))
+
+
+def resolution(clauses, dp=True, strategy="all", support=None, budget=None, proof=None):
     """
     Determines if the set of clauses is satisfiable using the resolution method.
     Logs each step in the process.
+
+    Given-clause loop: clauses wait in a queue, shortest first, and each one taken from it is
+    resolved only against the clauses already processed that contain a complementary literal,
+    found through the literal index, so no pair is tried twice. A resolvent that an existing
+    clause subsumes is dropped, and the clauses it subsumes are removed.
+    Strategies:
+    - "all": every clause is resolved against every other one,
+    - "support": at least one parent comes from the set of support (the support clauses, by default
+      the clauses without a positive literal) or was derived from it; the other clauses must be
+      satisfiable for a saturated set to mean satisfiable, which holds for the default,
+    - "ordered": clauses are only resolved upon their greatest variable (by name).
+    With dp, unit propagation and pure literal elimination simplify the clauses first; afterwards
+    unit clauses come out of the queue first, and backward subsumption does the rest of the work.
+    With a budget, every resolvent built is a step, and a BudgetExceeded is returned once it runs out.
+    With a proof (a proof.ResolutionTrace), the input clauses, the clauses the DP simplifications
+    produce and every resolvent kept are written to it with their antecedents, ending with the
+    empty clause when the answer is unsatisfiable.
     """
     step = 1
     clauses = [frozenset(clause) for clause in clauses]
+    if proof is not None:
+        for clause in clauses:
+            proof.original(clause)
     for clause in clauses:
         print(f"({step}) {set(clause)}")
         step += 1
     print()
 
-    while True:
-        new = set()
-        if not clauses:
-            print("\nAnswer: Satisfiable")
-            return True
-        elif len(clauses) == 0:
+    if dp:
+        clauses = unit_propagation(clauses)
+        if clauses is False:
+            if proof is not None:
+                proof.derive_by_propagation(frozenset())
             print("\nAnswer: Unsatisfiable")
             return False
-        if dp:
-            clauses = unit_propagation(clauses)
-            if not clauses:
-                print("\nAnswer: Unsatisfiable")
-                return False
-            elif len(clauses) == 0:
-                print("\nAnswer: Satisfiable")
-                return True
-            clauses = pure_literal_elimination(clauses)
-            if len(clauses) == 0:
-                print("\nAnswer: Satisfiable")
-                return True
-        clauses = [frozenset(clause) for clause in clauses]
-        clauses_set = set(clauses)
-        pairs = [(clauses[i], clauses[j]) for i in range(len(clauses)) for j in range(i + 1, len(clauses))]
-        diff=False
-        for (c1, c2) in pairs:
-            resolvents = resolve(c1, c2)
-            for resolvent in resolvents:
-                if not resolvent:  # Empty clause found
-                    print(f"({step}) ∅ from {set(c1)} and {set(c2)}")
-                    print("\nAnswer: Unsatisfiable")
-                    return False
-                if frozenset(resolvent) not in clauses_set and not is_tautology(resolvent):
-                    print(f"({step}) {set(resolvent)} from {set(c1)} and {set(c2)}")
-                    clauses_set.add(frozenset(resolvent))
-                    new.add(frozenset(resolvent))
-                    step += 1
-                # elif frozenset(resolvent) in clauses_set:
-                #     print(f"{set(resolvent)} from {set(c1)} and {set(c2)} is already included")
-                if new and dp:
-                    new_clauses=clauses+list(new)
-                    unit_clauses=unit_propagation(new_clauses)
-                    if not unit_clauses:
-                        print("\nAnswer: Unsatisfiable")
-                        return False
-                    elif len(unit_clauses) == 0 :
-                        print("\nAnswer: Satisfiable")
-                        return True
-                    pure_clauses=pure_literal_elimination(unit_clauses)
-                    if len(pure_clauses) == 0:
-                        print("\nAnswer: Satisfiable")
-                        return True
-                    if new_clauses != pure_clauses:
-                        clauses = list(map(frozenset, pure_clauses)) # Updates clauses with the processed clauses
-                        diff = True
-                        break
-            if diff:
-                break
+        clauses = [frozenset(clause) for clause in pure_literal_elimination(clauses)]
+        if proof is not None:
+            for clause in clauses:
+                if proof.id_of(clause) is None:
+                    proof.derive_by_propagation(clause)
+    if frozenset() in clauses:
+        print("\nAnswer: Unsatisfiable (the clauses contain the empty clause)")
+        return False
+    if not clauses:
+        print("\nAnswer: Satisfiable")
+        return True
 
+    if support is None:
+        support = [clause for clause in clauses if all(literal.startswith("¬") for literal in clause)]
+    support = {frozenset(clause) for clause in support}
 
+    def eligible(clause):
+        if strategy != "ordered":
+            return clause
+        greatest = max(literal.lstrip("¬") for literal in clause)
+        return [literal for literal in clause if literal.lstrip("¬") == greatest]
 
-        if not new:
-            print("\nNo new resolvant to be added ")
-            print("Answer: Satisfiable")
-            return True
+    database = ClauseDatabase()
+    processed = set()
+    queue = []
+
+    def keep(clause):
+        if is_tautology(clause) or database.subsumer(clause) is not None:
+            return None
+        for clause_id in database.subsumed_by(clause):
+            print(f"Removed clause {set(database.clauses[clause_id])} because it is subsumed by {set(clause)}")
+            database.remove(clause_id)
+            processed.discard(clause_id)
+        return database.add(clause)
+
+    for clause in sorted(clauses, key=len):
+        clause_id = keep(clause)
+        if clause_id is None:
+            continue
+        if strategy == "support" and clause not in support:
+            processed.add(clause_id)
+        else:
+            heappush(queue, (len(clause), clause_id))
+
+    while queue:
+        given_id = heappop(queue)[1]
+        if given_id not in database.clauses:
+            continue  # Removed by backward subsumption while it waited
+        given = database.clauses[given_id]
+        processed.add(given_id)
+        for literal in eligible(given):
+            complement = "¬" + literal if not literal.startswith("¬") else literal[1:]
+            for partner_id in list(database.occurrences.get(complement, ())):
+                partner = database.clauses.get(partner_id)
+                if partner_id not in processed or partner is None or complement not in eligible(partner):
+                    continue
+                if budget is not None and budget.exhausted():
+                    stop = budget.exceeded(clauses=len(database.clauses), waiting=len(queue))
+                    print(f"\nAnswer: Unknown ({stop})")
+                    return stop
+                resolvent = (given - {literal}) | (partner - {complement})
+                if not resolvent:
+                    if proof is not None:
+                        proof.derive(resolvent, [proof.id_of(given), proof.id_of(partner)])
+                    print(f"({step}) ∅ from {set(given)} and {set(partner)}")
+                    print("\nAnswer: Unsatisfiable")
+                    return False
+                resolvent_id = keep(resolvent)
+                if resolvent_id is not None:
+                    if proof is not None:
+                        proof.derive(resolvent, [proof.id_of(given), proof.id_of(partner)])
+                    print(f"({step}) {set(resolvent)} from {set(given)} and {set(partner)}")
+                    step += 1
+                    heappush(queue, (len(resolvent), resolvent_id))
+                if given_id not in database.clauses:
+                    break
+            if given_id not in database.clauses:
+                break  # A resolvent subsumed the given clause, its other resolvents are redundant
 
-        if not diff:
-            clauses.extend(new)
+    print("\nNo new resolvant to be added ")
+    print("Answer: Satisfiable")
+    return True
 
 def is_tautology(clause):
     """
@@ -224,10 +359,13 @@ def is_satisfied(assignment, clauses):
     return True
 
 
-def backtrack(variables, clauses, assignment):
+def backtrack(variables, clauses, assignment, budget=None):
     """
     Try to find a satisfying assignment using backtracking.
+    With a budget, each assignment tried is a step; a BudgetExceeded is returned once it runs out.
     """
+    if budget is not None and budget.exhausted():
+        return budget.exceeded(assigned=len(assignment))
     # If we've assigned values to all variables, check if the formula is satisfied
     if len(assignment) == len(variables):
         if is_satisfied(assignment, clauses):
@@ -238,13 +376,13 @@ def backtrack(variables, clauses, assignment):
     # Try assigning True to the next unassigned variable
     var = variables[len(assignment)]
     assignment[var] = True
-    result = backtrack(variables, clauses, assignment)
+    result = backtrack(variables, clauses, assignment, budget)
     if result is not None:
         return result
 
     # Backtrack: try assigning False to the next variable
     assignment[var] = False
-    result = backtrack(variables, clauses, assignment)
+    result = backtrack(variables, clauses, assignment, budget)
     if result is not None:
         return result
 
@@ -253,33 +391,342 @@ def backtrack(variables, clauses, assignment):
     return None
 
 
-def find_satisfiable_interpretation(clauses):
+def find_satisfiable_interpretation(clauses, budget=None):
+    """
+    Find a satisfying interpretation for the formula: 2-SAT, Horn and XOR clause sets are solved in
+    linear time (see solve_fragment), the others by the CDCL solver. Returns None if there is none,
+    or a BudgetExceeded if the budget runs out first.
+    """
+    return solve_fragment(clauses, budget)[1]
+
+
+def strongly_connected_components(graph):
+    """Tarjan's algorithm without recursion; graph maps each node to its successors."""
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    nodes = set(graph) | {successor for successors in graph.values() for successor in successors}
+    for root in sorted(nodes):
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, position = work.pop()
+            if position == 0:
+                index[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack.add(node)
+            successors = graph.get(node, ())
+            if position < len(successors):
+                work.append((node, position + 1))
+                successor = successors[position]
+                if successor not in index:
+                    work.append((successor, 0))
+                elif successor in on_stack:
+                    low[node] = min(low[node], index[successor])
+                continue
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+    return components
+
+
+def solve_2sat(clauses):
+    """
+    2-SAT: clause a ∨ b gives the implications ¬a ⇒ b and ¬b ⇒ a (a unit clause gives ¬a ⇒ a).
+    The clauses are unsatisfiable exactly when a variable and its negation share a strongly
+    connected component. Tarjan's algorithm emits components sinks first, so making a literal true
+    when its component comes before its complement's never leads from true to false.
+    Returns a model, or None.
+    """
+    graph = {}
+    for clause in clauses:
+        if not clause:
+            return None
+        literals = list(clause)
+        a, b = literals[0], literals[-1]
+        graph.setdefault(complement_of(a), []).append(b)
+        graph.setdefault(complement_of(b), []).append(a)
+    position = {}
+    for index, component in enumerate(strongly_connected_components(graph)):
+        for literal in component:
+            position[literal] = index
+    model = {}
+    for literal in position:
+        if not literal.startswith("¬"):
+            if position[literal] == position["¬" + literal]:
+                return None
+            model[literal] = position[literal] < position["¬" + literal]
+    return model
+
+
+def solve_horn(clauses):
     """
-    Find a satisfying interpretation for the formula using backtracking.
+    Horn-SAT (at most one positive literal per clause) by unit resolution in linear time: every
+    variable starts false, and a clause whose negative literals have all become false forces its
+    positive literal true, or proves unsatisfiability if it has none. Each clause keeps a count of
+    its negative literals still unfalsified, lowered once per variable made true.
+    Returns the least model, or None.
     """
-    # Extract the set of variables from the clauses (positive and negative literals)
     variables = set()
+    heads = []
+    remaining = []
+    watchers = {}
+    queue = []
+    for index, clause in enumerate(clauses):
+        negatives = {literal[1:] for literal in clause if literal.startswith("¬")}
+        positives = [literal for literal in clause if not literal.startswith("¬")]
+        variables.update(negatives, positives)
+        heads.append(positives[0] if positives else None)
+        remaining.append(len(negatives))
+        for variable in negatives:
+            watchers.setdefault(variable, []).append(index)
+        if not negatives:
+            if not positives:
+                return None
+            queue.append(positives[0])
+    true = set()
+    while queue:
+        variable = queue.pop()
+        if variable in true:
+            continue
+        true.add(variable)
+        for index in watchers.get(variable, ()):
+            remaining[index] -= 1
+            if not remaining[index]:
+                if heads[index] is None:
+                    return None
+                queue.append(heads[index])
+    return {variable: variable in true for variable in variables}
+
+
+def xor_constraints(clauses):
+    """
+    Reads clauses as XOR constraints, as the CNF of a ⇔ chain comes out: x1 ⊕ ... ⊕ xk = b is the
+    2^(k-1) clauses over x1..xk whose number of negations has the parity of ¬b (each clause rules out
+    the one assignment falsifying it). Returns [(variables, b)], or None unless every clause
+    belongs to such a complete group.
+    """
+    groups = {}
     for clause in clauses:
-        for literal in clause:
-            # Add the variable without the '¬' symbol
-            variables.add(literal.lstrip('¬'))
+        variables = frozenset(literal.lstrip("¬") for literal in clause)
+        if len(variables) != len(clause) or len(variables) > 20:
+            return None
+        negations = sum(1 for literal in clause if literal.startswith("¬"))
+        groups.setdefault(variables, {}).setdefault(negations % 2, set()).add(frozenset(clause))
+    constraints = []
+    for variables, by_parity in groups.items():
+        if len(by_parity) != 1:
+            return None
+        (parity, group), = by_parity.items()
+        if len(group) != 1 << (len(variables) - 1):
+            return None
+        constraints.append((sorted(variables), 1 - parity))
+    return constraints
 
-    # Start the backtracking search with an empty assignment
-    assignment = {}
-    return backtrack(list(variables), clauses, assignment)
 
-def dpll(clauses, branch=None, indent=0):
+def solve_xor(constraints):
+    """
+    XOR-SAT by Gaussian elimination over GF(2). A constraint is a row packed into an int, one bit per
+    variable above bit 0, which holds the right-hand side, so adding two rows is one ⊕ of ints.
+    Rows are kept fully reduced: each pivot's bit is cleared from every other row, so with the
+    free variables false each pivot variable equals its row's right-hand side.
+    Returns a model, or None when some row reduces to 0 = 1.
+    """
+    names = sorted({variable for variables, _ in constraints for variable in variables})
+    bits = {name: position + 1 for position, name in enumerate(names)}
+    pivots = {}  # pivot bit -> row
+    for variables, parity in constraints:
+        row = parity & 1
+        for variable in variables:
+            row ^= 1 << bits[variable]
+        for bit, pivot_row in pivots.items():
+            if row >> bit & 1:
+                row ^= pivot_row
+        if row == 1:
+            return None
+        if not row:
+            continue
+        bit = row.bit_length() - 1
+        for other_bit, other_row in pivots.items():
+            if other_row >> bit & 1:
+                pivots[other_bit] = other_row ^ row
+        pivots[bit] = row
+    model = {name: False for name in names}
+    for bit, row in pivots.items():
+        model[names[bit - 1]] = bool(row & 1)
+    return model
+
+
+def solve_fragment(clauses, budget=None):
+    """
+    Sends clauses to the linear-time algorithm of their fragment: 2-SAT (at most two literals per
+    clause), Horn, dual Horn (at most one negative literal, solved as Horn with the polarities
+    flipped) or XOR. Anything else goes to the CDCL solver, which the budget applies to.
+    Returns (fragment, model or None), or (fragment, BudgetExceeded).
+    """
+    clauses = [frozenset(clause) for clause in clauses]
+    if all(len(clause) <= 2 for clause in clauses):
+        return "2-SAT", solve_2sat(clauses)
+    if all(sum(1 for literal in clause if not literal.startswith("¬")) <= 1 for clause in clauses):
+        return "Horn", solve_horn(clauses)
+    if all(sum(1 for literal in clause if literal.startswith("¬")) <= 1 for clause in clauses):
+        model = solve_horn([frozenset(complement_of(literal) for literal in clause) for clause in clauses])
+        return "dual Horn", None if model is None else {variable: not value for variable, value in model.items()}
+    constraints = xor_constraints(clauses)
+    if constraints is not None:
+        return "XOR", solve_xor(constraints)
+    solver = SATSolver(clauses)
+    found = solver.solve(budget=budget)
+    if isinstance(found, BudgetExceeded):
+        return "general", found
+    return "general", solver.model() if found else None
+
+
+class XorShift:
+    """Small xorshift64* generator, so seeded local search runs are reproducible."""
+
+    def __init__(self, seed=1):
+        self.state = (seed * 0x9E3779B97F4A7C15 or 1) & 0xFFFFFFFFFFFFFFFF
+
+    def next(self):
+        x = self.state
+        x ^= x >> 12
+        x ^= (x << 25) & 0xFFFFFFFFFFFFFFFF
+        x ^= x >> 27
+        self.state = x
+        return (x * 0x2545F4914F6CDD1D) & 0xFFFFFFFFFFFFFFFF
+
+    def below(self, n):
+        return (self.next() >> 11) % n
+
+    def uniform(self):
+        return (self.next() >> 11) / 9007199254740992.0
+
+
+def local_search(clauses, method="walksat", max_flips=100000, max_tries=10, noise=0.5, cb=2.3, seed=1):
+    """
+    Stochastic local search for a model of large satisfiable clause sets: start from a random
+    assignment and flip variables of unsatisfied clauses until none is left.
+    Each clause keeps its number of true literals and, as an xor of variables, its true variable
+    when it has only one, so the break count of every variable (the clauses it alone satisfies) and
+    the list of unsatisfied clauses are updated with each flip instead of being recomputed.
+    method picks the variable to flip in a random unsatisfied clause:
+        walksat: one that breaks no clause if any, else a random one with probability noise,
+            else one with the fewest breaks
+        probsat: a random one with probability proportional to (1 + breaks) ** -cb
+    Tries restart from a new random assignment after max_flips flips.
+    Returns a model, or UNKNOWN when the budget runs out (which proves nothing).
+    """
+    encoded, names, _ = encode_clauses(clauses)
+    if any(not clause for clause in encoded):
+        return UNKNOWN
+    count = len(names) - 1
+    occurrences = [[] for _ in range(2 * count + 2)]  # literal l at 2|l| + (l < 0)
+    for index, clause in enumerate(encoded):
+        for literal in clause:
+            occurrences[2 * abs(literal) + (literal < 0)].append(index)
+    random = XorShift(seed)
+    weights = [(1.0 + breaks) ** -cb for breaks in range(64)]
+    for _ in range(max_tries):
+        values = [False] + [random.below(2) == 1 for _ in range(count)]
+        true_count = [0] * len(encoded)
+        critical = [0] * len(encoded)
+        breaks = [0] * (count + 1)
+        unsatisfied = []
+        position = [-1] * len(encoded)
+        for index, clause in enumerate(encoded):
+            for literal in clause:
+                if values[abs(literal)] == (literal > 0):
+                    true_count[index] += 1
+                    critical[index] ^= abs(literal)
+            if true_count[index] == 1:
+                breaks[critical[index]] += 1
+            elif not true_count[index]:
+                position[index] = len(unsatisfied)
+                unsatisfied.append(index)
+        for _ in range(max_flips):
+            if not unsatisfied:
+                break
+            clause = encoded[unsatisfied[random.below(len(unsatisfied))]]
+            if method == "probsat":
+                scores = [weights[breaks[abs(literal)]] if breaks[abs(literal)] < 64 else 0.0 for literal in clause]
+                threshold = random.uniform() * sum(scores)
+                variable = abs(clause[-1])
+                for literal, score in zip(clause, scores):
+                    threshold -= score
+                    if threshold < 0:
+                        variable = abs(literal)
+                        break
+            else:
+                variable = min((abs(literal) for literal in clause), key=breaks.__getitem__)
+                if breaks[variable] and random.uniform() < noise:
+                    variable = abs(clause[random.below(len(clause))])
+            values[variable] = not values[variable]
+            becomes_true = 2 * variable + (not values[variable])
+            for index in occurrences[becomes_true ^ 1]:
+                true_count[index] -= 1
+                critical[index] ^= variable
+                if not true_count[index]:
+                    breaks[variable] -= 1
+                    position[index] = len(unsatisfied)
+                    unsatisfied.append(index)
+                elif true_count[index] == 1:
+                    breaks[critical[index]] += 1
+            for index in occurrences[becomes_true]:
+                true_count[index] += 1
+                if true_count[index] == 1:
+                    # Swap the clause out of the unsatisfied list
+                    last = unsatisfied.pop()
+                    if last != index:
+                        unsatisfied[position[index]] = last
+                        position[last] = position[index]
+                    position[index] = -1
+                    breaks[variable] += 1
+                elif true_count[index] == 2:
+                    breaks[critical[index]] -= 1
+                critical[index] ^= variable
+        if not unsatisfied:
+            return {names[v]: values[v] for v in range(1, count + 1)}
+    return UNKNOWN
+
+
+def dpll(clauses, branch=None, indent=0, budget=None, proof=None, decisions=()):
     """
     Implements the DPLL algorithm for satisfiability.
     Recursively applies unit propagation, pure literal elimination, and branching.
+    With a budget, each call is a step; once it runs out the BudgetExceeded is returned instead of
+    True or False, through every enclosing branch.
+    With a proof (a proof.DratWriter), each failed branch adds the clause that negates its decisions,
+    which unit propagation proves from the clauses of its two failed sub-branches; the top call
+    failing adds the empty clause, so an unsatisfiable answer leaves a DRAT refutation.
     """
     indentation = "  " * indent
+    if budget is not None and budget.exhausted():
+        stop = budget.exceeded(depth=indent, clauses=len(clauses))
+        print(f"{indentation}Answer: Unknown ({stop})")
+        return stop
     clauses = unit_propagation(clauses,indentation)
     if clauses is False:
         if branch:
             print(f"{indentation}Answer: Unsatisfiable (after unit propagation) for {branch} branch")
         else:
             print(f"{indentation}Answer: Unsatisfiable (after unit propagation)")
+        if proof is not None:
+            proof.add([complement_of(decision) for decision in decisions])
         return False
     elif not clauses:
         if branch:
@@ -309,16 +756,24 @@ def dpll(clauses, branch=None, indent=0):
 
     # Recursively solve the true branch
     print(f"\n{indentation}Branching on {literal} = True")
-    if dpll(clauses_true,literal, indent + 1):
+    result = dpll(clauses_true, literal, indent + 1, budget, proof, decisions + (literal,))
+    if isinstance(result, BudgetExceeded):
+        return result
+    if result:
         print(f"{indentation}Answer: Satisfiable with {literal} = True")
         return True
 
     # Recursively solve the false branch
     print(f"\n{indentation}Branching on {literal} = False")
-    if dpll(clauses_false, negation, indent + 1):
+    result = dpll(clauses_false, negation, indent + 1, budget, proof, decisions + (negation,))
+    if isinstance(result, BudgetExceeded):
+        return result
+    if result:
         print(f"{indentation}Answer: Satisfiable with {literal} = False")
         return True
 
     # If neither branch is satisfiable, the formula is unsatisfiable
     print(f"{indentation}Answer: Unsatisfiable (both branches failed for {literal})")
+    if proof is not None:
+        proof.add([complement_of(decision) for decision in decisions])
     return False
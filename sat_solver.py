@@ -0,0 +1,581 @@
+from heapq import heappush, heappop
+
+from budget import BudgetExceeded
+
+DECAY = 0.95  # Activities of variables outside recent conflicts fade by this factor per conflict
+RESTART_BASE = 100  # Conflicts per unit of the Luby restart sequence
+MIN_LEARNED = 2000  # Learned clauses kept before the first clean-up
+
+
+def luby(i):
+    """The i-th term (from 0) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ..."""
+    size, exponent = 1, 0
+    while size < i + 1:
+        exponent += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        exponent -= 1
+        i %= size
+    return 1 << exponent
+
+
+class SATSolver:
+    """
+    Conflict-driven clause learning over resolver.py clauses (sets of literals such as "P" and "¬P").
+    Variables are numbered from 1 and literals are ints, -v standing for ¬v. Clauses are watched by
+    two literals, conflicts are analysed up to the first unique implication point and the learned
+    clause makes the search jump back; branching follows variable activity (VSIDS) with saved
+    phases, and the search restarts along the Luby sequence.
+
+    The solver is incremental: clauses can be added between calls, solve takes assumptions
+    (literals decided first, before any other variable) and reports the assumptions behind a
+    failure in core, and push/pop open and close scopes of clauses. Learned clauses, activities
+    and saved phases carry over from one call to the next, and iter_models goes from one model
+    to the next without starting over.
+
+    With a proof (a proof.DratWriter for the CNF of the clauses given here), every learned and
+    deleted clause is logged, so an unsatisfiable answer comes with a checkable DRAT refutation.
+    The variables take the CNF's numbering. Scope and blocking clauses are logged with their fresh
+    activation literal first, which makes them RAT steps; clauses added without a scope after
+    construction are not part of the CNF, and a refutation that depends on them does not check.
+    """
+
+    def __init__(self, clauses=(), proof=None):
+        self.names = [None]
+        self.index = {}
+        self.values = [0]  # 1 true, -1 false, 0 unassigned
+        self.levels = [0]
+        self.reasons = [None]  # Index of the clause that implied the variable, None for decisions
+        self.activity = [0.0]
+        self.phases = [False]
+        self.priority = [1]  # Variables with a lower priority are branched on first
+        self.clauses = []
+        self.free = []  # Indices of deleted clauses, reused by new ones
+        self.learned = []
+        self.lbd = {}  # Learned clause index -> number of distinct levels when it was learned
+        self.max_learned = MIN_LEARNED
+        self.watches = {}
+        self.trail = []
+        self.trail_limits = []  # Trail position where each decision level starts
+        self.queue_head = 0
+        self.heap = []
+        self.blocks = []  # (level, index) of the live blocking clauses, by level
+        self.units = []  # Learned units first assigned above level 0, fixed at the next solve
+        self.assumptions = []
+        self.given = {}  # Assumed literal -> the string it was given as
+        self.core = []
+        self.scopes = []  # Activation variable of each open scope
+        self.internal = set()  # Activation variables, left out of models
+        self.increment = 1.0
+        self.ok = True
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.proof = proof
+        if proof is not None:
+            for name in sorted(proof.index, key=proof.index.get):
+                self.variable(name)
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def variable(self, name):
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+            self.values.append(0)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phases.append(False)
+            self.priority.append(1)
+            heappush(self.heap, (1, -0.0, len(self.names) - 1))
+        return self.index[name]
+
+    def literal(self, text):
+        """"P" -> v, "¬P" -> -v; an even number of ¬ cancels out."""
+        name = text.lstrip("¬")
+        variable = self.variable(name)
+        return -variable if (len(text) - len(name)) % 2 else variable
+
+    def internal_variable(self):
+        variable = self.variable(("scope", len(self.names)))
+        self.internal.add(variable)
+        return variable
+
+    def literal_name(self, literal):
+        return self.names[literal] if literal > 0 else "¬" + self.names[-literal]
+
+    def log(self, literals, delete=False):
+        """Writes an added or deleted clause to the DRAT proof, if there is one."""
+        if self.proof is not None:
+            if self.scopes and not delete:
+                # The activation literal goes first, as the pivot of the RAT check
+                literals = sorted(literals, key=lambda literal: literal != -self.scopes[-1])
+            self.proof.write(literals, delete)
+
+    def value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, clause):
+        """
+        Adds a clause of literal strings at level 0. Literals already false at level 0 are left out
+        and satisfied clauses are skipped. Inside a scope the clause is guarded by the scope's
+        activation variable, which solve assumes true until pop. Returns False once the clauses
+        are unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        literals = {self.literal(literal) for literal in clause}
+        if self.scopes:
+            literals.add(-self.scopes[-1])
+        self.backtrack(0)
+        if any(-literal in literals for literal in literals) or any(self.value(literal) > 0 for literal in literals):
+            return True
+        kept = [literal for literal in literals if self.value(literal) == 0]
+        if self.scopes:
+            self.log(kept)
+        if not kept:
+            self.ok = False
+        elif len(kept) == 1:
+            self.assign(kept[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(kept)
+        if not self.ok:
+            self.log([])
+        return self.ok
+
+    def attach(self, literals, lbd=None):
+        """Stores a clause watched by its first two literals; lbd is given for learned clauses."""
+        if self.free:
+            index = self.free.pop()
+            self.clauses[index] = literals
+        else:
+            index = len(self.clauses)
+            self.clauses.append(literals)
+        self.watches.setdefault(literals[0], []).append(index)
+        self.watches.setdefault(literals[1], []).append(index)
+        if lbd is not None:
+            self.learned.append(index)
+            self.lbd[index] = lbd
+        return index
+
+    def detach(self, index):
+        self.log(self.clauses[index], True)
+        for literal in self.clauses[index]:
+            watchers = self.watches.get(literal)
+            if watchers and index in watchers:
+                watchers.remove(index)
+        self.clauses[index] = None
+        self.free.append(index)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """Unit propagation over the watch lists; returns the index of a conflicting clause or None."""
+        values = self.values
+        clauses = self.clauses
+        while self.queue_head < len(self.trail):
+            false_literal = -self.trail[self.queue_head]
+            self.queue_head += 1
+            self.propagations += 1
+            watchers = self.watches.get(false_literal)
+            if not watchers:
+                continue
+            kept = 0
+            position = 0
+            conflict = None
+            while position < len(watchers):
+                index = watchers[position]
+                position += 1
+                clause = clauses[index]
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                first_value = values[first] if first > 0 else -values[-first]
+                if first_value > 0:
+                    watchers[kept] = index
+                    kept += 1
+                    continue
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    if (values[other] if other > 0 else -values[-other]) >= 0:
+                        clause[1], clause[k] = other, clause[1]
+                        self.watches.setdefault(other, []).append(index)
+                        break
+                else:
+                    watchers[kept] = index
+                    kept += 1
+                    if first_value < 0:
+                        conflict = index
+                        while position < len(watchers):
+                            watchers[kept] = watchers[position]
+                            kept += 1
+                            position += 1
+                    else:
+                        self.assign(first, index)
+            del watchers[kept:]
+            if conflict is not None:
+                return conflict
+        return None
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.rebuild_heap()
+        elif not self.values[variable]:
+            heappush(self.heap, (self.priority[variable], -self.activity[variable], variable))
+
+    def rebuild_heap(self):
+        self.heap = [(self.priority[v], -self.activity[v], v) for v in range(1, len(self.names)) if not self.values[v]]
+        self.heap.sort()
+
+    def analyze(self, conflict):
+        """
+        Resolves the conflicting clause with the reasons of the current level's literals, latest
+        first, until one literal of that level is left (the first unique implication point).
+        Returns the learned clause, asserting literal first, and the level to jump back to.
+        """
+        levels = self.levels
+        level = len(self.trail_limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        position = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        literal = None
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen or not levels[variable]:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            pending -= 1
+            if not pending:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+        learned[0] = -literal
+        # A literal implied by other literals of the clause adds nothing
+        minimized = [learned[0]]
+        for other in learned[1:]:
+            reason = self.reasons[abs(other)]
+            if reason is None or any(abs(l) not in seen and levels[abs(l)] for l in self.clauses[reason] if l != -other):
+                minimized.append(other)
+        if len(minimized) == 1:
+            return minimized, 0
+        deepest = max(range(1, len(minimized)), key=lambda k: levels[abs(minimized[k])])
+        minimized[1], minimized[deepest] = minimized[deepest], minimized[1]
+        return minimized, levels[abs(minimized[1])]
+
+    def backtrack(self, level):
+        if len(self.trail_limits) <= level:
+            return
+        mark = self.trail_limits[level]
+        for literal in reversed(self.trail[mark:]):
+            variable = abs(literal)
+            self.phases[variable] = literal > 0
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            heappush(self.heap, (self.priority[variable], -self.activity[variable], variable))
+        del self.trail[mark:]
+        del self.trail_limits[level:]
+        self.queue_head = mark
+        if len(self.heap) > 4 * len(self.names) + 100:
+            self.rebuild_heap()
+
+    def pick_branch(self):
+        while self.heap:
+            variable = heappop(self.heap)[2]
+            if not self.values[variable]:
+                return variable if self.phases[variable] else -variable
+        return None
+
+    def reduce_learned(self):
+        """Deletes the worse half of the learned clauses (most levels, then longest) not used as reasons."""
+        locked = {self.reasons[abs(literal)] for literal in self.trail}
+        self.learned.sort(key=lambda index: (self.lbd[index], len(self.clauses[index])))
+        removed = {index for index in self.learned[len(self.learned) // 2:]
+                   if index not in locked and self.lbd[index] > 2}
+        if removed:
+            for watchers in self.watches.values():
+                watchers[:] = [index for index in watchers if index not in removed]
+            for index in removed:
+                self.log(self.clauses[index], True)
+                self.clauses[index] = None
+                del self.lbd[index]
+                self.free.append(index)
+            self.learned = [index for index in self.learned if index not in removed]
+        self.max_learned *= 1.1
+
+    def floor(self):
+        """The search may not jump below the deepest live blocking clause, see exhaust."""
+        return self.blocks[-1][0] if self.blocks else 0
+
+    def learn(self, clause, level):
+        self.log(clause)
+        # Above the floor the clause is still unit, its literal is just given a later level
+        self.backtrack(max(level, self.floor()))
+        if len(clause) == 1:
+            if self.trail_limits:
+                self.units.append(clause[0])
+            self.assign(clause[0], None)
+        else:
+            lbd = len({self.levels[abs(literal)] for literal in clause})
+            self.assign(clause[0], self.attach(clause, lbd))
+
+    def search(self, conflict_limit, budget=None):
+        """
+        Runs until a model (True), unsatisfiability (False) or conflict_limit conflicts (None).
+        A budget is charged one step per conflict.
+        """
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if budget is not None:
+                    budget.charge()
+                if not self.trail_limits:
+                    self.ok = False
+                    self.log([])
+                    return False
+                if len(self.trail_limits) <= self.floor():
+                    if not self.exhaust(len(self.trail_limits)):
+                        return False
+                    continue
+                self.learn(*self.analyze(conflict))
+                self.increment /= DECAY
+            else:
+                if conflicts >= conflict_limit:
+                    return None
+                literal = None
+                while len(self.trail_limits) < len(self.assumptions):
+                    assumption = self.assumptions[len(self.trail_limits)]
+                    value = self.value(assumption)
+                    if value < 0:
+                        self.core = self.analyze_final(assumption)
+                        return False
+                    if not value:
+                        literal = assumption
+                        break
+                    # Already true: an empty level keeps levels and assumptions aligned
+                    self.trail_limits.append(len(self.trail))
+                if literal is None:
+                    if len(self.learned) >= self.max_learned:
+                        self.reduce_learned()
+                    literal = self.pick_branch()
+                    if literal is None:
+                        return True
+                self.decisions += 1
+                self.trail_limits.append(len(self.trail))
+                self.assign(literal, None)
+
+    def run(self, budget=None):
+        """Continues the search from the current trail, restarting from level 0 when a run ends."""
+        if not self.ok:
+            return False
+        restarts = 0
+        while True:
+            result = self.search(luby(restarts) * RESTART_BASE, budget)
+            if result is not None:
+                return result
+            restarts += 1
+            self.backtrack(self.floor())
+
+    def analyze_final(self, literal):
+        """
+        The assumptions that force the given assumption false: its implication graph is followed
+        back through the reasons, and the assumptions it reaches form the core.
+        """
+        core = {literal}
+        seen = {abs(literal)}
+        assumed = set(self.assumptions)
+        for other in reversed(self.trail[self.trail_limits[0]:] if self.trail_limits else []):
+            variable = abs(other)
+            if variable not in seen:
+                continue
+            reason = self.reasons[variable]
+            if reason is None:
+                if other in assumed:
+                    core.add(other)
+            else:
+                seen.update(abs(l) for l in self.clauses[reason] if self.levels[abs(l)])
+        return [self.given[l] for l in self.assumptions if l in core and l in self.given]
+
+    def solve(self, assumptions=(), budget=None):
+        """
+        True if the clauses are satisfiable with every assumption (a literal string) true; the
+        model is then read with model(). When the assumptions are to blame, core lists those
+        that already clash with the clauses, an empty core meaning the clauses themselves are
+        unsatisfiable. With a budget (see budget.py), the search may instead stop with a
+        BudgetExceeded; the solver can be called again afterwards.
+        """
+        self.backtrack(0)
+        self.blocks = []
+        self.core = []
+        if not self.ok:
+            return False
+        for literal in self.units:
+            if self.value(literal) < 0:
+                self.ok = False
+                self.log([])
+                return False
+            if not self.value(literal):
+                self.assign(literal, None)
+        self.units = []
+        self.given = {self.literal(literal): literal for literal in assumptions}
+        self.assumptions = self.scopes + list(self.given)
+        try:
+            return self.run(budget)
+        except BudgetExceeded as stop:
+            stop.stats.update(conflicts=self.conflicts, decisions=self.decisions, learned=len(self.learned))
+            return stop
+
+    def push(self):
+        """Opens a scope: clauses added until the matching pop are removed by it."""
+        self.scopes.append(self.internal_variable())
+
+    def pop(self):
+        """
+        Closes the innermost scope. Its activation variable is fixed false, which satisfies the
+        scope's clauses and every clause learned from them, so all of those are deleted.
+        """
+        variable = self.scopes.pop()
+        self.backtrack(0)
+        self.blocks = []
+        guarded = [index for index, clause in enumerate(self.clauses) if clause is not None and -variable in clause]
+        for index in guarded:
+            self.detach(index)
+            self.lbd.pop(index, None)
+        self.learned = [index for index in self.learned if self.clauses[index] is not None]
+        if self.ok and not self.value(variable):
+            self.log([-variable])
+            self.assign(-variable, None)
+            self.ok = self.propagate() is None
+            if not self.ok:
+                self.log([])
+
+    def model(self, variables=None):
+        """The current assignment as {name: bool}, over every variable or the given ones."""
+        if variables is None:
+            variables = [v for v in range(1, len(self.names)) if v not in self.internal]
+        return {self.names[v]: self.values[v] > 0 for v in variables}
+
+    def exhaust(self, level):
+        """
+        Records that no model left to enumerate agrees with the decisions up to level: the clause
+        of their negations flips the last of them one level up. Blocking clauses asserted at level
+        or deeper contain this one, so they are dropped and the live ones stay at most one per
+        literal on the trail. This only holds as long as the search never jumps back past a live
+        blocking clause, which is why conflicts and restarts stop at the floor, and a conflict at
+        the floor itself exhausts it in turn. Returns False once everything is enumerated.
+        """
+        if level <= len(self.assumptions):
+            return False
+        # Levels up to the assumptions may be empty, their decisions are the assumptions themselves
+        decisions = [-self.trail[self.trail_limits[k]] for k in reversed(range(len(self.assumptions), level))]
+        clause = list(dict.fromkeys(decisions + [-literal for literal in reversed(self.assumptions)]))
+        clause[1:] = sorted(clause[1:], key=lambda literal: -self.levels[abs(literal)])
+        while self.blocks and self.blocks[-1][0] >= level:
+            self.detach(self.blocks.pop()[1])
+        self.log(clause)
+        self.backtrack(level - 1)
+        if len(clause) == 1:
+            self.assign(clause[0], None)
+        else:
+            index = self.attach(clause)
+            self.blocks.append((level - 1, index))
+            self.assign(clause[0], index)
+        return True
+
+    def iter_models(self, projection=None, assumptions=()):
+        """
+        Yields the models one at a time as {name: bool}, under the given assumptions if any.
+        With a projection only the named variables are reported, and each assignment to them is
+        yielded once, however many models extend it. Each model is blocked by the negation of the decisions that fix it, and the
+        search goes on from there; blocking clauses replace the ones they subsume, so memory does
+        not grow with the number of models. The blocking clauses live in a scope of their own,
+        which is popped when the enumeration ends, so the solver can be used again afterwards.
+        """
+        if projection is None:
+            variables = [v for v in range(1, len(self.names)) if v not in self.internal]
+        else:
+            variables = [self.variable(name) for name in dict.fromkeys(projection)]
+        projected = set(variables)
+        self.priority = [0 if v in projected else 1 for v in range(len(self.names))]
+        self.rebuild_heap()
+        self.push()
+        try:
+            found = self.solve(assumptions)
+            while found:
+                yield self.model(variables)
+                # The given variables are decided first, so the decisions up to the deepest level
+                # where one of them is set fix them all
+                if not self.exhaust(max(self.levels[v] for v in variables) if variables else 0):
+                    return
+                found = self.run()
+        finally:
+            self.pop()
+            self.priority = [1] * len(self.names)
+            self.rebuild_heap()
+
+
+def iter_models(clauses, projection=None, assumptions=()):
+    """Streams the models of resolver.py clauses, see SATSolver.iter_models."""
+    yield from SATSolver(clauses).iter_models(projection, assumptions)
+
+
+if __name__ == "__main__":
+    import time
+    from itertools import islice
+
+    clauses = [{"P", "Q"}, {"¬P", "R"}]
+    print(list(iter_models(clauses)))
+    print(list(iter_models(clauses, projection=["Q", "R"])))
+
+    # One base theory, many questions: a chain X0 ⇒ X1 ⇒ ... ⇒ X199 entails every Xk from X0
+    solver = SATSolver([{f"¬X{k}", f"X{k + 1}"} for k in range(199)])
+    start = time.perf_counter()
+    entailed = [k for k in range(200) if not solver.solve(["X0", f"¬X{k}"])]
+    print(f"X0 entails {len(entailed)} of 200 conclusions in {time.perf_counter() - start:.2f}s,",
+          f"core of X0, ¬X7, ¬X150: {solver.solve(['X0', '¬X7', '¬X150']) or solver.core}")
+    solver.push()
+    solver.add_clause({"¬X100"})
+    print("With ¬X100 in a scope, X0 is", "satisfiable" if solver.solve(["X0"]) else "unsatisfiable")
+    solver.pop()
+    print("After pop, X0 is", "satisfiable" if solver.solve(["X0"]) else "unsatisfiable")
+
+    # Pigeonhole: 9 pigeons in 8 holes is unsatisfiable, 8 in 8 has 8! models
+    def pigeonhole(pigeons, holes):
+        clauses = [{f"P{p}0{h}" for h in range(holes)} for p in range(pigeons)]
+        clauses += [{f"¬P{p}0{h}", f"¬P{q}0{h}"} for h in range(holes) for p in range(pigeons) for q in range(p)]
+        return clauses
+
+    start = time.perf_counter()
+    solver = SATSolver(pigeonhole(8, 7))
+    print(f"8 pigeons, 7 holes: {solver.solve()} in {time.perf_counter() - start:.2f}s",
+          f"({solver.conflicts} conflicts, {solver.decisions} decisions)")
+    start = time.perf_counter()
+    print(f"8 pigeons, 8 holes: {sum(1 for _ in iter_models(pigeonhole(8, 8)))} models",
+          f"in {time.perf_counter() - start:.2f}s")
+    print("First 3 models:", [sorted(name for name, value in model.items() if value)
+                              for model in islice(iter_models(pigeonhole(3, 3)), 3)])
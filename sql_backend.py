@@ -0,0 +1,396 @@
+import sqlite3
+import time
+
+from lexer import user_defined_symbols
+
+COMPARISONS = {"≥": ">=", "≤": "<=", ">": ">", "<": "<", "=": "=", "≠": "<>"}
+ARITHMETIC = {"+": "+", "−": "-", "*": "*", "□□": "*", "/": "/"}
+QUANTIFIERS = ("∀", "∃", "∄", "∃!")
+
+
+def sql_power(base, exponent):
+    try:
+        result = base ** exponent
+    except (ZeroDivisionError, OverflowError):
+        return None
+    return None if isinstance(result, complex) else result
+
+
+def sql_sqrt(value):
+    return None if value is None or value < 0 else value ** 0.5
+
+
+def sql_factorial(value):
+    if value is None or value < 0 or int(value) != value:
+        return None
+    result = 1
+    for k in range(2, int(value) + 1):
+        result *= k
+    return result
+
+
+python_functions = {
+    "+": lambda *values: sum(values[1:], values[0]),
+    "−": lambda a, b: a - b,
+    "*": lambda *values: values[0] if len(values) == 1 else python_functions["*"](*values[:-1]) * values[-1],
+    "□□": lambda a, b: a * b,
+    "/": lambda a, b: None if b == 0 else a / b,
+    "^": sql_power,
+    "√": sql_sqrt,
+    "!": sql_factorial,
+    "-": lambda a: -a,
+    "|": abs,
+}
+
+python_comparisons = {
+    "≥": lambda a, b: a >= b,
+    "≤": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+    "=": lambda a, b: a == b,
+    "≠": lambda a, b: a != b,
+}
+
+
+def sql_literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def term_arguments(node):
+    """Arguments of a math.py term or atom: prefix symbols carry a list, infix and postfix ones carry them inline."""
+    if len(node) == 2 and isinstance(node[1], list):
+        return node[1]
+    return list(node[1:])
+
+
+def flatten(node, operator):
+    if isinstance(node, tuple) and node[0] == operator:
+        return [part for child in node[1:] for part in flatten(child, operator)]
+    return [node]
+
+
+class SQLiteModel:
+    """
+    Evaluates math.py formulas over relational data kept in SQLite.
+    Each predicate symbol is backed by a table with one column per argument; quantifiers range
+    over the domain table unless a guarding atom lets them range over a predicate table instead,
+    in which case ∀ becomes an anti-join and ∃ a semi-join that SQLite can answer from its indexes.
+    """
+
+    def __init__(self, database=":memory:"):
+        self.connection = sqlite3.connect(database)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS domain (value UNIQUE)")
+        self.tables = {}
+        self.functions = {}
+        self.alias_counter = 0
+        self.connection.create_function("wff_pow", 2, sql_power, deterministic=True)
+        self.connection.create_function("wff_sqrt", 1, sql_sqrt, deterministic=True)
+        self.connection.create_function("wff_factorial", 1, sql_factorial, deterministic=True)
+
+    def add_domain(self, values):
+        self.connection.executemany("INSERT OR IGNORE INTO domain VALUES (?)", ((value,) for value in values))
+        self.connection.commit()
+
+    def add_predicate(self, symbol, rows, index=True):
+        """Creates the table for a predicate symbol, loads its rows and indexes every column."""
+        arity = user_defined_symbols["predicates"][symbol]["arity"]
+        table = f"pred_{symbol}"
+        columns = [f"c{i}" for i in range(arity)]
+        self.connection.execute(f"DROP TABLE IF EXISTS {quote_identifier(table)}")
+        self.connection.execute(f"CREATE TABLE {quote_identifier(table)} ({', '.join(columns)})")
+        rows = [tuple(row) for row in rows]
+        self.connection.executemany(
+            f"INSERT INTO {quote_identifier(table)} VALUES ({', '.join('?' for _ in columns)})", rows)
+        if index:
+            for column in columns:
+                self.connection.execute(
+                    f"CREATE INDEX {quote_identifier(f'{table}_{column}')} ON {quote_identifier(table)} ({column})")
+            if arity > 1:
+                self.connection.execute(
+                    f"CREATE INDEX {quote_identifier(f'{table}_all')} ON {quote_identifier(table)} ({', '.join(columns)})")
+        self.add_domain(value for row in rows for value in row)
+        self.bind_predicate(symbol, table, columns)
+
+    def bind_predicate(self, symbol, table, columns):
+        """Maps a predicate symbol to an existing table and its argument columns."""
+        self.tables[symbol] = (table, list(columns))
+
+    def add_function(self, symbol, function, arity):
+        """Registers a Python implementation for an uninterpreted function such as f or g."""
+        name = f"wff_fn_{len(self.functions)}"
+        self.functions[symbol] = (name, function)
+        self.connection.create_function(name, arity, function, deterministic=True)
+
+    def new_alias(self, prefix):
+        self.alias_counter += 1
+        return f"{prefix}{self.alias_counter}"
+
+    def compile_term(self, term, environment):
+        if isinstance(term, (int, float)):
+            return sql_literal(term)
+        if isinstance(term, str):
+            return environment.get(term, sql_literal(term))
+        name = term[0]
+        arguments = [self.compile_term(argument, environment) for argument in term_arguments(term)]
+        if name in ARITHMETIC:
+            if name == "/":
+                return f"({arguments[0]} * 1.0 / NULLIF({arguments[1]}, 0))"
+            return "(" + f" {ARITHMETIC[name]} ".join(arguments) + ")"
+        if name == "-":
+            return f"(-{arguments[0]})"
+        if name == "|":
+            return f"ABS({arguments[0]})"
+        if name == "^":
+            return f"wff_pow({arguments[0]}, {arguments[1]})"
+        if name == "√":
+            return f"wff_sqrt({arguments[0]})"
+        if name == "!":
+            return f"wff_factorial({arguments[0]})"
+        if name in self.functions:
+            return f"{self.functions[name][0]}({', '.join(arguments)})"
+        raise Exception(f"Error: Function '{name}' has no SQL translation, register it with add_function.")
+
+    def compile_atom(self, atom, environment):
+        name = atom[0]
+        if name in COMPARISONS:
+            left, right = (self.compile_term(argument, environment) for argument in term_arguments(atom))
+            # Comparisons involving undefined terms are false
+            return f"COALESCE({left} {COMPARISONS[name]} {right}, 0)"
+        if name == "∈":
+            value = self.compile_term(atom[1], environment)
+            if atom[2] in ("ℝ", "ℂ"):
+                return f"(typeof({value}) IN ('integer', 'real'))"
+            if atom[2] == "ℤ":
+                return f"(typeof({value}) IN ('integer', 'real') AND {value} = CAST({value} AS INTEGER))"
+            if atom[2] == "ℕ":
+                return f"(typeof({value}) IN ('integer', 'real') AND {value} = CAST({value} AS INTEGER) AND {value} >= 0)"
+            return f"(typeof({value}) IN ('integer', 'real'))"
+        if name not in self.tables:
+            raise Exception(f"Error: Predicate '{name}' is not bound to a table.")
+        table, columns = self.tables[name]
+        alias = self.new_alias("t")
+        conditions = [f"{alias}.{column} = {self.compile_term(argument, environment)}"
+                      for column, argument in zip(columns, term_arguments(atom))]
+        return f"EXISTS (SELECT 1 FROM {quote_identifier(table)} {alias} WHERE {' AND '.join(conditions)})"
+
+    def range_over(self, variables, candidates, environment):
+        """
+        FROM sources, join conditions and environment for a block of quantified variables.
+        Positive table atoms among the candidates that mention the variables become their range,
+        the variables left over range over the domain table. Also returns the atoms used as guards.
+        """
+        remaining = list(variables)
+        inner = dict(environment)
+        for variable in variables:
+            inner.pop(variable, None)
+        sources, conditions, guards = [], [], []
+        for atom in candidates:
+            if not remaining:
+                break
+            if not isinstance(atom, tuple) or atom[0] not in self.tables:
+                continue
+            arguments = term_arguments(atom)
+            if any(isinstance(argument, tuple) for argument in arguments) or not set(arguments) & set(remaining):
+                continue
+            table, columns = self.tables[atom[0]]
+            alias = self.new_alias("t")
+            sources.append(f"{quote_identifier(table)} {alias}")
+            guards.append(atom)
+            for column, argument in zip(columns, arguments):
+                reference = f"{alias}.{column}"
+                if argument in remaining:
+                    inner[argument] = reference
+                    remaining.remove(argument)
+                else:
+                    conditions.append(f"{reference} = {self.compile_term(argument, inner)}")
+        for variable in remaining:
+            alias = self.new_alias("d")
+            sources.append(f"domain {alias}")
+            inner[variable] = f"{alias}.value"
+        return ", ".join(sources), conditions, inner, guards
+
+    def compile_formula(self, node, environment):
+        name = node[0]
+        if name == "¬":
+            return f"(NOT {self.compile_formula(node[1], environment)})"
+        if name in ("∧", "∨"):
+            joiner = " AND " if name == "∧" else " OR "
+            return "(" + joiner.join(self.compile_formula(child, environment) for child in node[1:]) + ")"
+        if name == "⇒":
+            return f"((NOT {self.compile_formula(node[1], environment)}) OR {self.compile_formula(node[2], environment)})"
+        if name == "⇔":
+            return f"({self.compile_formula(node[1], environment)} = {self.compile_formula(node[2], environment)})"
+        if name in QUANTIFIERS:
+            return self.compile_quantifier(node, environment)
+        return self.compile_atom(node, environment)
+
+    def compile_quantifier(self, node, environment):
+        quantifier, variables, body = node[0], [node[1]], node[2]
+        # Blocks like ∀x∀y or ∃x∃y are ranged over together
+        block = "∀" if quantifier == "∀" else "∃" if quantifier in ("∃", "∄") else None
+        while block and body[0] == block:
+            variables.append(body[1])
+            body = body[2]
+        if quantifier == "∀":
+            # ∀x̄(A(x̄) ⇒ φ) becomes an anti-join against A's table
+            premises, conclusion = (flatten(body[1], "∧"), body[2]) if body[0] == "⇒" else ([], body)
+            source, conditions, inner, guards = self.range_over(variables, premises, environment)
+            rest = [self.compile_formula(premise, inner) for premise in premises if premise not in guards]
+            violation = f"NOT {self.compile_formula(conclusion, inner)}"
+            return f"(NOT EXISTS (SELECT 1 FROM {source} WHERE {' AND '.join(conditions + rest + [violation])}))"
+        # ∃x̄(A(x̄) ∧ φ) becomes a semi-join with A's table
+        conjuncts = flatten(body, "∧")
+        source, conditions, inner, guards = self.range_over(variables, conjuncts, environment)
+        rest = [self.compile_formula(conjunct, inner) for conjunct in conjuncts if conjunct not in guards]
+        where = " AND ".join(conditions + rest) or "1"
+        if quantifier == "∃":
+            return f"EXISTS (SELECT 1 FROM {source} WHERE {where})"
+        if quantifier == "∄":
+            return f"(NOT EXISTS (SELECT 1 FROM {source} WHERE {where}))"
+        return f"((SELECT COUNT(DISTINCT {inner[variables[0]]}) FROM {source} WHERE {where}) = 1)"
+
+    def compile(self, formula, free_variables=()):
+        """
+        SQL for a formula. Without free variables the query returns a single 0/1 row,
+        otherwise it returns every binding of the free variables from the domain that satisfies the formula.
+        """
+        self.alias_counter = 0
+        if not free_variables:
+            return f"SELECT CASE WHEN {self.compile_formula(formula, {})} THEN 1 ELSE 0 END"
+        sources, environment = [], {}
+        for variable in free_variables:
+            alias = self.new_alias("d")
+            sources.append(f"domain {alias}")
+            environment[variable] = f"{alias}.value"
+        columns = ", ".join(environment[variable] for variable in free_variables)
+        return f"SELECT {columns} FROM {', '.join(sources)} WHERE {self.compile_formula(formula, environment)}"
+
+    def evaluate(self, formula, bindings=None):
+        """Truth value of a formula whose free variables are given by bindings."""
+        environment = {variable: sql_literal(value) for variable, value in (bindings or {}).items()}
+        self.alias_counter = 0
+        query = f"SELECT CASE WHEN {self.compile_formula(formula, environment)} THEN 1 ELSE 0 END"
+        return bool(self.connection.execute(query).fetchone()[0])
+
+    def query(self, formula, free_variables):
+        """All bindings of the free variables that satisfy the formula."""
+        return [dict(zip(free_variables, row))
+                for row in self.connection.execute(self.compile(formula, free_variables))]
+
+    def explain(self, formula, free_variables=()):
+        """SQLite's query plan for the compiled formula."""
+        return self.connection.execute("EXPLAIN QUERY PLAN " + self.compile(formula, free_variables)).fetchall()
+
+    def load_relations(self):
+        """The domain and predicate tables as Python sets, for the naive evaluator."""
+        domain = [row[0] for row in self.connection.execute("SELECT value FROM domain")]
+        relations = {}
+        for symbol, (table, columns) in self.tables.items():
+            relations[symbol] = set(self.connection.execute(
+                f"SELECT {', '.join(columns)} FROM {quote_identifier(table)}"))
+        return domain, relations
+
+    def evaluate_naive(self, formula, bindings=None, relations=None):
+        """Reference evaluator that enumerates every binding of every quantified variable in Python."""
+        domain, relations = relations or self.load_relations()
+
+        def term_value(term, environment):
+            if isinstance(term, (int, float)):
+                return term
+            if isinstance(term, str):
+                return environment.get(term, term)
+            values = [term_value(argument, environment) for argument in term_arguments(term)]
+            if any(value is None for value in values):
+                return None
+            if term[0] in self.functions:
+                return self.functions[term[0]][1](*values)
+            try:
+                return python_functions[term[0]](*values)
+            except TypeError:
+                return None
+
+        def holds(node, environment):
+            name = node[0]
+            if name == "¬":
+                return not holds(node[1], environment)
+            if name == "∧":
+                return all(holds(child, environment) for child in node[1:])
+            if name == "∨":
+                return any(holds(child, environment) for child in node[1:])
+            if name == "⇒":
+                return not holds(node[1], environment) or holds(node[2], environment)
+            if name == "⇔":
+                return holds(node[1], environment) == holds(node[2], environment)
+            if name in QUANTIFIERS:
+                count = 0
+                for value in domain:
+                    if holds(node[2], {**environment, node[1]: value}):
+                        count += 1
+                        if name in ("∃", "∄"):
+                            break
+                    elif name == "∀":
+                        return False
+                return {"∀": True, "∃": count > 0, "∄": count == 0, "∃!": count == 1}[name]
+            if name in python_comparisons:
+                left, right = (term_value(argument, environment) for argument in term_arguments(node))
+                try:
+                    return left is not None and right is not None and python_comparisons[name](left, right)
+                except TypeError:
+                    return False
+            if name == "∈":
+                value = term_value(node[1], environment)
+                if not isinstance(value, (int, float)):
+                    return False
+                if node[2] == "ℤ":
+                    return value == int(value)
+                if node[2] == "ℕ":
+                    return value == int(value) and value >= 0
+                return True
+            return tuple(term_value(argument, environment) for argument in term_arguments(node)) in relations[name]
+
+        return holds(formula, dict(bindings or {}))
+
+
+def benchmark(model, formula, bindings=None, repeat=3):
+    """Compares the compiled SQL query with the naive evaluator on the same data."""
+    relations = model.load_relations()
+    timings = {}
+    for label, run in (("sql", lambda: model.evaluate(formula, bindings)),
+                       ("naive", lambda: model.evaluate_naive(formula, bindings, relations))):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[label] = (result, best)
+    return timings
+
+
+if __name__ == "__main__":
+    from math import parser
+
+    size = 300
+    model = SQLiteModel()
+    model.add_domain(range(size))
+    model.add_predicate("Z", [(value,) for value in range(0, size, 3)])
+    model.add_predicate("P", [(value, (value * 7 + 3) % size) for value in range(size)])
+    model.add_predicate("Q", [(value, (value * 7 + 3) % size, value % 5) for value in range(size)])
+    for data in ["∀x(Z(x) ⇒ ∃y(P(x, y)))",
+                 "∀x∀y(P(x, y) ⇒ ∃z(Q(x, y, z)))",
+                 "∃x(Z(x) ∧ ∀y(P(x, y) ⇒ y > x))",
+                 "∃!x(P(x, 3))"]:
+        formula = parser.parse(data)
+        print(data)
+        print(model.compile(formula))
+        for row in model.explain(formula):
+            print("   ", row)
+        for label, (result, seconds) in benchmark(model, formula).items():
+            print(f"{label}: {result} in {seconds:.4f}s")
+        print()
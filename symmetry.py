@@ -0,0 +1,244 @@
+from resolver import complement_of, is_tautology
+
+
+class SymmetryGraph:
+    """
+    The colored graph of a clause set (resolver.py clauses): one vertex per literal, joined to the
+    vertex of its complement, and one vertex per clause, joined to its literals. Literals and
+    clauses get different colors, so an automorphism of the graph maps literals to literals,
+    keeps complementary pairs together and maps the clause set onto itself: it is a symmetry of
+    the clauses that may permute variables and flip their signs.
+    Literal vertices are 2·i (positive) and 2·i + 1 (negative) for the i-th variable in sorted order.
+    """
+
+    def __init__(self, clauses):
+        clauses = {frozenset(clause) for clause in clauses if not is_tautology(clause)}
+        self.clauses = clauses
+        self.variables = sorted({literal.lstrip("¬") for clause in clauses for literal in clause})
+        self.index = {name: i for i, name in enumerate(self.variables)}
+        literal_count = 2 * len(self.variables)
+        self.size = literal_count + len(clauses)
+        self.adjacency = [[] for _ in range(self.size)]
+        for i in range(len(self.variables)):
+            self.connect(2 * i, 2 * i + 1)
+        for position, clause in enumerate(sorted(clauses, key=sorted), literal_count):
+            for literal in clause:
+                self.connect(position, self.vertex(literal))
+        self.edges = {(u, v) for u in range(self.size) for v in self.adjacency[u]}
+        # Clauses are split by length from the start; refinement would find it after one round anyway
+        lengths = sorted({len(clause) for clause in clauses})
+        self.colors = [list(range(literal_count))] + [
+            [vertex for vertex in range(literal_count, self.size) if len(self.adjacency[vertex]) == length]
+            for length in lengths]
+
+    def connect(self, u, v):
+        self.adjacency[u].append(v)
+        self.adjacency[v].append(u)
+
+    def vertex(self, literal):
+        return 2 * self.index[literal.lstrip("¬")] + literal.startswith("¬")
+
+    def literal(self, vertex):
+        name = self.variables[vertex // 2]
+        return "¬" + name if vertex % 2 else name
+
+    def is_automorphism(self, permutation):
+        return all((permutation[u], permutation[v]) in self.edges for u, v in self.edges)
+
+
+def refine(partition, adjacency, splitters):
+    """
+    Refines an ordered partition (a list of cells) until it is equitable: every vertex of a cell
+    has the same number of neighbors in every other cell. Each splitter cell splits the cells
+    it touches by neighbor count, the parts ordered by count so the result does not depend on
+    vertex names. Returns the new partition and its trace, the sequence of splits, which two
+    branches must share for their leaves to be related by an automorphism.
+    """
+    partition = [list(cell) for cell in partition]
+    cell_of = {vertex: position for position, cell in enumerate(partition) for vertex in cell}
+    queue = [partition[position] for position in splitters]
+    trace = []
+    while queue:
+        splitter = queue.pop()
+        if partition[cell_of[splitter[0]]] is not splitter:
+            continue  # Split since it was queued; its parts are queued too
+        counts = {}
+        for vertex in splitter:
+            for neighbor in adjacency[vertex]:
+                counts[neighbor] = counts.get(neighbor, 0) + 1
+        touched = sorted({cell_of[neighbor] for neighbor in counts}, reverse=True)
+        for position in touched:
+            cell = partition[position]
+            if len(cell) == 1:
+                continue
+            groups = {}
+            for vertex in cell:
+                groups.setdefault(counts.get(vertex, 0), []).append(vertex)
+            if len(groups) == 1:
+                continue
+            parts = [groups[count] for count in sorted(groups)]
+            trace.append((position, tuple((count, len(groups[count])) for count in sorted(groups))))
+            partition[position:position + 1] = parts
+            for shifted in range(position, len(partition)):
+                for vertex in partition[shifted]:
+                    cell_of[vertex] = shifted
+            queue.extend(parts)
+    return partition, trace
+
+
+def individualize(partition, position, vertex):
+    """Splits a vertex off its cell, in front of the others."""
+    cell = partition[position]
+    rest = [other for other in cell if other != vertex]
+    return partition[:position] + [[vertex], rest] + partition[position + 1:]
+
+
+def target_cell(partition):
+    return next((position for position, cell in enumerate(partition) if len(cell) > 1), None)
+
+
+def find_symmetries(clauses, max_nodes=2000):
+    """
+    Generators of the symmetry group of a clause set, as {literal: image} dictionaries over the
+    moved literals, found by individualization-refinement on its SymmetryGraph:
+    - refine the coloring, then individualize the first vertex of the first non-trivial cell
+      and refine again, down to a discrete partition (the first leaf);
+    - at every level of that path, from the deepest up, try the other vertices of the cell:
+      search below each for a leaf with the same traces and check whether matching it to
+      the first leaf is an automorphism;
+    - vertices already in the orbit of the first path's choice under the generators found so
+      far are skipped, since those generators fix the path above that level.
+    Every generator is checked against the graph, so a search stopped by max_nodes (the number
+    of partitions refined) only finds fewer symmetries, never wrong ones.
+    """
+    graph = SymmetryGraph(clauses)
+    if not graph.variables:
+        return []
+    nodes = [0]
+    root, root_trace = refine(graph.colors, graph.adjacency, range(len(graph.colors)))
+    # The first path: the partition at each level, the cell split there and the traces below it
+    path = [root]
+    choices = []
+    traces = [root_trace]
+    while (position := target_cell(path[-1])) is not None:
+        vertex = path[-1][position][0]
+        partition, trace = refine(individualize(path[-1], position, vertex), graph.adjacency, [position])
+        choices.append((position, vertex))
+        path.append(partition)
+        traces.append(trace)
+    first_leaf = [cell[0] for cell in path[-1]]
+
+    parent = list(range(graph.size))  # Orbits of the generators found, as a union-find forest
+
+    def find(vertex):
+        while parent[vertex] != vertex:
+            parent[vertex] = parent[parent[vertex]]
+            vertex = parent[vertex]
+        return vertex
+
+    def search(partition, level):
+        nodes[0] += 1
+        if nodes[0] > max_nodes:
+            return None
+        if level == len(choices):
+            permutation = [0] * graph.size
+            for original, image in zip(first_leaf, (cell[0] for cell in partition)):
+                permutation[original] = image
+            return permutation if graph.is_automorphism(permutation) else None
+        position = choices[level][0]
+        for vertex in partition[position]:
+            refined, trace = refine(individualize(partition, position, vertex), graph.adjacency, [position])
+            if trace == traces[level + 1]:
+                if (found := search(refined, level + 1)) is not None:
+                    return found
+        return None
+
+    generators = []
+    for level in reversed(range(len(choices))):
+        position, chosen = choices[level]
+        tried = [chosen]
+        for vertex in path[level][position]:
+            if nodes[0] > max_nodes or find(vertex) in {find(other) for other in tried}:
+                continue
+            tried.append(vertex)
+            refined, trace = refine(individualize(path[level], position, vertex), graph.adjacency, [position])
+            if trace != traces[level + 1]:
+                continue
+            permutation = search(refined, level + 1)
+            if permutation is None:
+                continue
+            for original, image in enumerate(permutation):
+                parent[find(original)] = find(image)
+            generators.append({graph.literal(original): graph.literal(image)
+                               for original, image in enumerate(permutation[:2 * len(graph.variables)])
+                               if original != image})
+    return generators
+
+
+def lex_leader_clauses(generators, variables, prefix="e"):
+    """
+    Symmetry-breaking clauses keeping, in every orbit of assignments, the lexicographically smallest
+    (false < true, variables in the given order). For a generator σ they state
+    (x1, ..., xn) ≤lex (σ(x1), ..., σ(xn)) over the variables σ moves, with a chain of auxiliary
+    variables <prefix><generator>_<j> that are true while the first j positions are equal:
+    e(j-1) ⇒ (xj ⇒ σ(xj)), and e(j-1) ∧ (xj ⇔ σ(xj)) ⇒ ej. The smallest model of any orbit
+    satisfies them all, so the clauses keep the set satisfiable, and they only add constraints:
+    a model of the extended set is one of the original clauses once the auxiliaries are dropped.
+    """
+    clauses = []
+    for number, generator in enumerate(generators, 1):
+        moved = [variable for variable in variables if variable in generator]
+        previous = None
+        for variable in moved:
+            image = generator[variable]
+            guard = set() if previous is None else {"¬" + previous}
+            clauses.append(guard | {"¬" + variable, image})
+            if image == complement_of(variable) or variable == moved[-1]:
+                break  # The tuples can no longer be equal, or there is nothing left to compare
+            equal = f"{prefix}{number}_{variable}"
+            clauses.append(guard | {"¬" + variable, complement_of(image), equal})
+            clauses.append(guard | {variable, image, equal})
+            previous = equal
+    return clauses
+
+
+def break_symmetries(clauses, max_nodes=2000):
+    """Adds lex-leader clauses for the symmetries found; returns the extended clauses and the generators."""
+    generators = find_symmetries(clauses, max_nodes)
+    variables = sorted({literal.lstrip("¬") for clause in clauses for literal in clause})
+    return [set(clause) for clause in clauses] + lex_leader_clauses(generators, variables), generators
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+    import time
+
+    from budget import Budget
+    from resolver import dpll
+    from sat_solver import SATSolver
+
+    def pigeonhole(pigeons, holes):
+        clauses = [{f"P{p}0{h}" for h in range(holes)} for p in range(pigeons)]
+        clauses += [{f"¬P{p}0{h}", f"¬P{q}0{h}"} for h in range(holes) for p in range(pigeons) for q in range(p)]
+        return clauses
+
+    # n + 1 pigeons in n holes is unsatisfiable, and every pigeon and every hole is interchangeable
+    for holes in range(5, 9):
+        clauses = pigeonhole(holes + 1, holes)
+        start = time.perf_counter()
+        extended, generators = break_symmetries(clauses)
+        print(f"{holes + 1} pigeons, {holes} holes: {len(generators)} generators and",
+              f"{len(extended) - len(clauses)} clauses in {time.perf_counter() - start:.2f}s")
+        for label, instance in [("without", clauses), ("with", extended)]:
+            budget = Budget(seconds=60)  # Also counts the DPLL calls
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                answer = dpll([set(clause) for clause in instance], budget=budget)
+            elapsed = time.perf_counter() - start
+            solver = SATSolver(instance)
+            cdcl_start = time.perf_counter()
+            solver.solve()
+            print(f"  {label} symmetry breaking: DPLL {'unsatisfiable' if answer is False else answer}",
+                  f"after {budget.used} calls in {elapsed:.2f}s, CDCL {solver.conflicts} conflicts",
+                  f"in {time.perf_counter() - cdcl_start:.2f}s")
@@ -0,0 +1,210 @@
+from lexer import user_defined_symbols
+
+ASSOCIATIVE = ("+", "*")
+LOGICAL = ("¬", "∧", "∨", "⇒", "⇔")
+QUANTIFIERS = ("∀", "∃", "∄", "∃!")
+MAX_FACTORIAL = 1000
+MAX_POWER_BITS = 10000
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def term_arguments(node):
+    """Arguments of a math.py term: prefix symbols carry a list, infix and postfix ones carry them inline."""
+    if len(node) == 2 and isinstance(node[1], list):
+        return node[1]
+    return list(node[1:])
+
+
+def fold_power(base, exponent):
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        if abs(base) > 1 and exponent * abs(base).bit_length() > MAX_POWER_BITS:
+            return None
+    return base ** exponent
+
+
+def fold_factorial(value):
+    if not isinstance(value, int) or value < 0 or value > MAX_FACTORIAL:
+        return None
+    result = 1
+    for k in range(2, value + 1):
+        result *= k
+    return result
+
+
+def fold_sqrt(value):
+    return None if value < 0 else value ** 0.5
+
+
+# Point semantics of the arithmetic symbols: plain Python arithmetic, so 4/5 is 0.8 and √4 is 2.0.
+# A None result means the value is undefined and the term is left as it is.
+point_functions = {
+    "+": lambda *values: sum(values[1:], values[0]),
+    "−": lambda a, b: a - b,
+    "*": lambda *values: multiply_all(values),
+    "□□": lambda a, b: a * b,
+    "/": lambda a, b: a / b,
+    "^": fold_power,
+    "√": fold_sqrt,
+    "!": fold_factorial,
+    "-": lambda a: -a,
+    "|": abs,
+}
+
+
+def multiply_all(values):
+    result = values[0]
+    for value in values[1:]:
+        result = result * value
+    return result
+
+
+def fold(name, values):
+    """Evaluates a symbol on numbers, or returns None when the result is undefined or not a plain number."""
+    if name not in point_functions or not all(is_number(value) for value in values):
+        return None
+    try:
+        result = point_functions[name](*values)
+    except (ArithmeticError, ValueError):
+        return None
+    if not is_number(result):
+        return None
+    if isinstance(result, float) and (result != result or result in (float("inf"), float("-inf"))):
+        return None
+    return result
+
+
+class TermSimplifier:
+    """
+    Simplifies math.py terms without changing their value:
+    - folds subterms whose arguments are all numbers,
+    - removes double negation and pushes NEG (-) into − and + where IEEE arithmetic is exact,
+    - flattens left-nested + and * chains into one node, evaluated left to right,
+    - hash-conses the result, so identical subterms are a single shared object.
+    Results are memoized per subtree and simplifying a result again returns it unchanged.
+    """
+
+    def __init__(self):
+        self.interned = {}
+        self.memo = {}
+
+    def key(self, node):
+        if is_number(node):
+            return type(node).__name__, repr(node)
+        if not isinstance(node, tuple):
+            return "atom", node
+        arguments = term_arguments(node)
+        return (node[0], isinstance(node[1], list) and len(node) == 2,
+                tuple(id(argument) if isinstance(argument, tuple) else self.key(argument) for argument in arguments))
+
+    def intern(self, node):
+        """Returns the shared copy of a node whose arguments are already interned."""
+        return self.interned.setdefault(self.key(node), node)
+
+    def simplify(self, term):
+        if not isinstance(term, tuple):
+            return term
+        cached = self.memo.get(id(term))
+        if cached is not None and cached[0] is term:
+            return cached[1]
+        result = self.simplify_node(term)
+        self.memo[id(term)] = (term, result)
+        if isinstance(result, tuple):
+            self.memo[id(result)] = (result, result)
+        return result
+
+    def build(self, name, arguments, prefix):
+        node = (name, list(arguments)) if prefix else (name, *arguments)
+        return self.intern(node)
+
+    def simplify_node(self, term):
+        name = term[0]
+        prefix = len(term) == 2 and isinstance(term[1], list)
+        arguments = [self.simplify(argument) for argument in term_arguments(term)]
+        if name == "□□":
+            name = "*"
+        if name in ASSOCIATIVE:
+            first = arguments[0]
+            if isinstance(first, tuple) and first[0] == name:
+                arguments = term_arguments(first) + arguments[1:]
+            # Only the leading run of numbers is evaluated first, so only it can be folded
+            folded = arguments[0]
+            index = 1
+            while index < len(arguments) and is_number(folded) and is_number(arguments[index]):
+                value = fold(name, [folded, arguments[index]])
+                if value is None:
+                    break
+                folded = value
+                index += 1
+            arguments = [folded] + arguments[index:]
+            if len(arguments) == 1:
+                return arguments[0]
+        else:
+            value = fold(name, arguments)
+            if value is not None:
+                return value
+        return self.normalize_negation(name, arguments, prefix)
+
+    def normalize_negation(self, name, arguments, prefix):
+        def negated(argument):
+            return argument[1] if isinstance(argument, tuple) and argument[0] == "-" else None
+
+        if name == "-" and negated(arguments[0]) is not None:
+            return negated(arguments[0])
+        if name == "+" and len(arguments) > 2 and negated(arguments[-1]) is not None:
+            return self.simplify_node(("−", self.build("+", arguments[:-1], False), negated(arguments[-1])))
+        if len(arguments) == 2:
+            left, right = arguments
+            # a − (−b) = a + b and a + (−b) = a − b hold exactly in integer and IEEE arithmetic
+            if name == "−" and negated(right) is not None:
+                return self.simplify_node(("+", left, negated(right)))
+            if name == "+" and negated(right) is not None:
+                return self.simplify_node(("−", left, negated(right)))
+            if name == "*" and negated(left) is not None and negated(right) is not None:
+                return self.simplify_node(("*", negated(left), negated(right)))
+        return self.build(name, arguments, prefix)
+
+    def simplify_formula(self, formula):
+        """Simplifies every term inside a math.py formula, keeping its logical structure."""
+        if not isinstance(formula, tuple):
+            return formula
+        name = formula[0]
+        if name in LOGICAL:
+            return (name,) + tuple(self.simplify_formula(child) for child in formula[1:])
+        if name in QUANTIFIERS:
+            return name, formula[1], self.simplify_formula(formula[2])
+        if name in user_defined_symbols["predicates"]:
+            if len(formula) == 2 and isinstance(formula[1], list):
+                return name, [self.simplify(argument) for argument in formula[1]]
+            return (name,) + tuple(self.simplify(argument) for argument in formula[1:])
+        return self.simplify(formula)
+
+    def evaluate(self, term, environment, memo=None):
+        """
+        Point value of a simplified term, or None where it is undefined.
+        Shared subterms are evaluated once per environment.
+        """
+        memo = {} if memo is None else memo
+        if is_number(term):
+            return term
+        if not isinstance(term, tuple):
+            return environment.get(term)
+        if id(term) in memo:
+            return memo[id(term)]
+        values = [self.evaluate(argument, environment, memo) for argument in term_arguments(term)]
+        value = None if any(value is None for value in values) else fold(term[0], values)
+        memo[id(term)] = value
+        return value
+
+
+default_simplifier = TermSimplifier()
+
+
+def simplify_term(term):
+    return default_simplifier.simplify(term)
+
+
+def simplify_formula(formula):
+    return default_simplifier.simplify_formula(formula)
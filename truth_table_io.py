@@ -0,0 +1,202 @@
+import csv
+import mmap
+
+from minimizer import ON, OFF, DONT_CARE
+
+# Expands one packed byte into eight care-table bytes, most significant bit first
+EXPANDED = [bytes((byte >> (7 - k)) & 1 for k in range(8)) for byte in range(256)]
+DONT_CARE_CHARACTERS = "-xX"
+# Whole CSV cells accepted as outputs
+OUTPUT_VALUES = {"0": OFF, "1": ON, "-": DONT_CARE, "x": DONT_CARE, "X": DONT_CARE}
+
+
+def rows_to_inputs(row_count):
+    """Number of inputs of a table with the given number of rows, which must be a power of two."""
+    if row_count < 1 or row_count & (row_count - 1):
+        raise ValueError(f"A truth table needs a power of two rows, got {row_count}.")
+    return row_count.bit_length() - 1
+
+
+class PackedTruthTable:
+    """
+    The output column of a truth table over n inputs, one bit per row, with an optional second
+    bit array marking don't-care rows. Row r is bit 7 - r % 8 of byte r // 8 (most significant bit
+    first); the first input is the most significant bit of the row index, so row 0 has every
+    input false. A table with 2^24 rows takes 2 MB, or 4 MB with don't cares.
+    """
+
+    def __init__(self, n, bits=None, dont_care=None):
+        self.n = n
+        size = max(1, (1 << n) // 8)
+        self.bits = bits if bits is not None else bytearray(size)
+        self.dont_care = dont_care
+        if len(self.bits) < size or (dont_care is not None and len(dont_care) < size):
+            raise ValueError(f"A table over {n} inputs needs {size} bytes per bit array.")
+
+    @classmethod
+    def from_bitstring(cls, text, n=None):
+        """Reads the output column as '0'/'1' characters, with '-' or 'x' for don't cares."""
+        text = "".join(text.split())
+        n = rows_to_inputs(len(text)) if n is None else n
+        if len(text) != 1 << n:
+            raise ValueError(f"Expected {1 << n} outputs, got {len(text)}.")
+        on = text.translate(str.maketrans(DONT_CARE_CHARACTERS, "000"))
+        dont_care = None
+        if on != text:
+            dont_care = pack_bitstring(text.translate(str.maketrans("01" + DONT_CARE_CHARACTERS, "00111")))
+        return cls(n, pack_bitstring(on), dont_care)
+
+    @classmethod
+    def from_hex(cls, text, n=None, dont_care=None):
+        """Reads the output column as hexadecimal, optionally with a second hex string of don't cares."""
+        digits = strip_hex(text)
+        n = rows_to_inputs(len(digits) * 4) if n is None else n
+        bits = bytearray.fromhex(pad_hex(digits))
+        mask = bytearray.fromhex(pad_hex(strip_hex(dont_care))) if dont_care else None
+        return cls(n, bits, mask)
+
+    @classmethod
+    def from_binary_file(cls, path, n=None, dont_care_path=None):
+        """
+        Memory-maps a file holding the packed output column, so nothing is read up front and
+        only the pages that are used get loaded. A second file may hold the don't-care bits.
+        """
+        bits = map_file(path)
+        n = rows_to_inputs(len(bits) * 8) if n is None else n
+        return cls(n, bits, map_file(dont_care_path) if dont_care_path else None)
+
+    @classmethod
+    def from_csv(cls, path, n=None):
+        """
+        Reads a CSV file with one row per line. A line is either the inputs followed by the output,
+        or the output alone for rows given in order. Outputs are 0, 1, or '-'/'x' for a don't care;
+        a first line that is not made of such values is taken as a header.
+        """
+        with open(path, newline="", encoding="utf-8") as file:
+            lines = [line for line in csv.reader(file) if line]
+        if lines and not all(value.strip() in OUTPUT_VALUES for value in lines[0]):
+            lines = lines[1:]
+        if not lines:
+            raise ValueError("The CSV file holds no rows.")
+        if n is None:
+            n = len(lines[0]) - 1 if len(lines[0]) > 1 else rows_to_inputs(len(lines))
+        table = cls(n, dont_care=bytearray(max(1, (1 << n) // 8)))
+        for position, line in enumerate(lines):
+            *inputs, output = [value.strip() for value in line]
+            index = position
+            if inputs:
+                if len(inputs) != n:
+                    raise ValueError(f"Each row must contain {n + 1} values (including the output).")
+                if any(value not in ("0", "1") for value in inputs):
+                    raise ValueError(f"Invalid inputs {inputs} in CSV row {position + 1}, expected 0 or 1.")
+                index = int("".join(inputs), 2)
+            if output not in OUTPUT_VALUES:
+                raise ValueError(f"Invalid output {output!r} in CSV row {position + 1}, expected 0, 1, '-' or 'x'.")
+            table[index] = OUTPUT_VALUES[output]
+        if not any(table.dont_care):
+            table.dont_care = None
+        return table
+
+    def __len__(self):
+        return 1 << self.n
+
+    def __getitem__(self, row):
+        byte, bit = row >> 3, 7 - (row & 7)
+        if self.dont_care is not None and self.dont_care[byte] >> bit & 1:
+            return DONT_CARE
+        return self.bits[byte] >> bit & 1
+
+    def __setitem__(self, row, value):
+        byte, bit = row >> 3, 7 - (row & 7)
+        if value not in (OFF, ON, DONT_CARE):
+            raise ValueError(f"Invalid output value {value}, expected 0, 1 or a don't care.")
+        self.bits[byte] = self.bits[byte] & ~(1 << bit) | (1 << bit if value == ON else 0)
+        if self.dont_care is not None:
+            self.dont_care[byte] = self.dont_care[byte] & ~(1 << bit) | (1 << bit if value == DONT_CARE else 0)
+        elif value == DONT_CARE:
+            self.dont_care = bytearray(len(self.bits))
+            self.dont_care[byte] = 1 << bit
+
+    def minterms(self):
+        """Yields the ON rows in increasing order, skipping empty bytes without looking at their bits."""
+        dont_care = self.dont_care
+        count = len(self)
+        for byte_index, byte in enumerate(self.bits[:max(1, count // 8)]):
+            if dont_care is not None:
+                byte &= ~dont_care[byte_index] & 0xFF
+            while byte:
+                bit = byte.bit_length() - 1
+                row = byte_index * 8 + 7 - bit
+                # Tables with fewer than 8 rows only use the leading bits of their byte
+                if row >= count:
+                    return
+                yield row
+                byte ^= 1 << bit
+
+    def rows(self):
+        """Yields rows as [input..., output] lists, the format generate_dnf_formula takes."""
+        for row in range(len(self)):
+            yield [row >> (self.n - 1 - i) & 1 for i in range(self.n)] + [self[row]]
+
+    def to_care_table(self):
+        """Unpacks into the one byte per row care table used by minimizer.py."""
+        count = len(self)
+        care = b"".join(EXPANDED[byte] for byte in self.bits[:max(1, count // 8)])[:count]
+        if self.dont_care is None:
+            return bytearray(care)
+        marks = b"".join(EXPANDED[byte] for byte in self.dont_care[:max(1, count // 8)])[:count]
+        # A don't care row is 2 whatever its output bit says: clear the bit, then add the mark twice
+        combined = (int.from_bytes(care, "big") & ~int.from_bytes(marks, "big")) | (int.from_bytes(marks, "big") << 1)
+        return bytearray(combined.to_bytes(count, "big"))
+
+    def to_bitstring(self):
+        return "".join("-" if value == DONT_CARE else str(value) for value in (self[row] for row in range(len(self))))
+
+    def save(self, path):
+        """Writes the packed output column so it can be memory-mapped back with from_binary_file."""
+        with open(path, "wb") as file:
+            file.write(self.bits)
+
+
+def pack_bitstring(text):
+    """Packs '0'/'1' characters, most significant bit first, padding short tables to one byte."""
+    if len(text) < 8:
+        text = text.ljust(8, "0")
+    return bytearray(int(text, 2).to_bytes(len(text) // 8, "big"))
+
+
+def strip_hex(text):
+    text = "".join(text.split())
+    return text[2:] if text.lower().startswith("0x") else text
+
+
+def pad_hex(digits):
+    return digits if len(digits) % 2 == 0 else digits + "0"
+
+
+def map_file(path):
+    with open(path, "rb") as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+if __name__ == "__main__":
+    import os
+    import time
+
+    table = PackedTruthTable.from_bitstring("1101-011")
+    print(table.to_bitstring(), list(table.minterms()), list(table.to_care_table()))
+
+    n = 24
+    start = time.perf_counter()
+    table = PackedTruthTable.from_hex("96" * ((1 << n) // 8))
+    print(f"Loaded {len(table)} rows from hex in {time.perf_counter() - start:.3f}s")
+    path = "wff_table.bin"
+    table.save(path)
+    start = time.perf_counter()
+    mapped = PackedTruthTable.from_binary_file(path)
+    print(f"Mapped {len(mapped)} rows in {time.perf_counter() - start:.3f}s, row 5 is {mapped[5]}")
+    start = time.perf_counter()
+    care = mapped.to_care_table()
+    print(f"Unpacked into a care table in {time.perf_counter() - start:.3f}s")
+    mapped.bits.close()
+    os.remove(path)
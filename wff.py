@@ -3,10 +3,24 @@ import re
 
 from resolver import *
 from formula_converter import *
+from minimizer import care_table, minimal_dnf, minimal_cnf, variable_name, DONT_CARE
+from truth_table_io import PackedTruthTable
+from bdd import BDD
+from cardinality import CONSTRAINTS, CONSTRAINT_REGEX, constraint_node, constraint_holds, formula_clauses, is_auxiliary
+from parallel_solver import solve_parallel
+from preprocessor import preprocess
+from symmetry import break_symmetries
+from proof import write_dimacs, DratWriter, ResolutionTrace, check_drat, check_trace
 from ShuntingYard import ShuntingYardConverter
 from anytree import Node, RenderTree
 
 
+# Diagrams of every parsed formula share one manager, so equivalence is a node comparison
+bdd_manager = BDD()
+# Frozen formulas are shared the same way, so what-if queries reuse each other's restrictions
+formula_table = FormulaTable()
+
+
 class LogicalWFFParser:
     def __init__(self, proposition):
         self.proposition = proposition.replace(" ", "")
@@ -14,6 +28,7 @@ class LogicalWFFParser:
         self.length = len(self.proposition)
         self.operation_count = 0
         self.root = None
+        self.bdd = None
         self.atomic_regex = re.compile(r"[A-Z][0-9]*|⊤|⊥")  # Regex for atomic propositions
 
     def is_atomic(self, char):
@@ -39,6 +54,15 @@ class LogicalWFFParser:
             return Node(atomic_token)
         return None
 
+    def parse_constraint(self):
+        match = CONSTRAINT_REGEX.match(self.proposition, self.index)
+        if match:
+            constraint_token = match.group(0)
+            self.advance(len(constraint_token))
+            print(f"{constraint_token} is a cardinality constraint")
+            return constraint_node(constraint_token)
+        return None
+
     def parse_unary(self, print_tree):
         if self.current_char() == "(" and self.proposition[self.index + 1] == "¬":
             self.operation_count += 1
@@ -67,7 +91,7 @@ class LogicalWFFParser:
                         raise Exception("Error: Missing closing parenthesis after ¬ operation")
                 else:
                     raise Exception("Error: Invalid expression after ¬ connective")
-            elif sub_node := self.parse_atomic():
+            elif sub_node := self.parse_constraint() or self.parse_atomic():
                 if self.current_char() == ")":
                     print("Detected closing parenthesis after ¬ operation")
                     self.advance()
@@ -135,7 +159,10 @@ class LogicalWFFParser:
         return None
 
     def parse_expression(self,print_tree):
-        # Try parsing atomic, unary, or binary and return the Node
+        # Try parsing a constraint, atomic, unary, or binary and return the Node
+        # (constraints first, since AtMost would otherwise be read as the atom A)
+        if node := self.parse_constraint():
+            return node
         if node := self.parse_atomic():
             return node
         if node := self.parse_unary(print_tree):
@@ -259,6 +286,11 @@ class LogicalWFFParser:
             right_result = self.evaluate_truth_table(node.children[1], values, intermediary_results)
             result = (left_result == right_result)
             print(f"Result of biconditional {node_desc}: {result}")
+        elif node.name in CONSTRAINTS:
+            print(f"Evaluating cardinality constraint {node_desc}")
+            child_results = [self.evaluate_truth_table(child, values, intermediary_results) for child in node.children]
+            result = constraint_holds(node, child_results)
+            print(f"Result of cardinality constraint {node_desc}: {result}")
         else:
             result = values[node.name]
             print(f"Evaluating variable {node_desc}: {result}")
@@ -295,12 +327,16 @@ class LogicalWFFParser:
         traverse(node)
         return subexpressions
 
-    def generate_truth_table(self, do_print=False):
+    def generate_truth_table(self, do_print=False, budget=None):
+        """
+        One row per assignment of the free variables, with the value of every subexpression.
+        With a budget each row is a step; once it runs out a BudgetExceeded is returned instead.
+        """
         variables = sorted(self.get_variables(self.root))
         always_true = '⊤' in variables
         always_false = '⊥' in variables
         free_variables = [var for var in variables if var not in ['⊤', '⊥']]
-        truth_values = list(product([False, True], repeat=len(free_variables)))
+        truth_values = product([False, True], repeat=len(free_variables))
         table = []
 
         subexpressions = self.get_subexpressions(self.root)
@@ -310,6 +346,8 @@ class LogicalWFFParser:
         col_widths = {header: len(header) + 2 for header in headers}
 
         for values in truth_values:
+            if budget is not None and budget.exhausted():
+                return budget.exceeded(rows=len(table), of=2 ** len(free_variables))
             assignment = dict(zip(free_variables, values))
             if always_true:
                 assignment['⊤'] = True
@@ -372,50 +410,47 @@ class LogicalWFFParser:
             stack.extend(current_node.children)
         return None
 
+    def to_bdd(self):
+        """The formula's diagram in the shared BDD manager, built once per parser."""
+        if self.bdd is None:
+            self.bdd = bdd_manager.build(self.root)
+        return self.bdd
+
+    def release_bdd(self):
+        """Drops the parser's reference to its diagram, so the manager's GC can reclaim it."""
+        if self.bdd is not None:
+            bdd_manager.deref(self.bdd)
+            self.bdd = None
+        bdd_manager.safe_point()
+
+    def restrict(self, values):
+        """The formula with the variables of a partial assignment replaced by their values, simplified."""
+        return formula_table.thaw(formula_table.restrict(formula_table.freeze(self.root), values))
+
     def check_validity(self):
-        truth_table = self.generate_truth_table()
-        formula_values = [entry[list(entry.keys())[-1]] for entry in truth_table]
-        is_satisfiable = any(formula_values)
-        is_unsatisfiable = all(not value for value in formula_values)
-        is_valid = all(formula_values)
-        if is_valid:
-            return "The formula is valid and satisfiable."
-        elif is_unsatisfiable:
-            return "The formula is unsatisfiable and invalid."
-        elif is_satisfiable:
-            return "The formula is satisfiable but invalid."
+        formula = self.to_bdd()
+        if bdd_manager.is_tautology(formula):
+            result = "The formula is valid and satisfiable."
+        elif not bdd_manager.is_satisfiable(formula):
+            result = "The formula is unsatisfiable and invalid."
+        else:
+            result = "The formula is satisfiable but invalid."
+        self.release_bdd()
+        return result
 
     def check_equivalence(self, other_parser):
-        self_table = self.generate_truth_table()
-        other_table = other_parser.generate_truth_table()
-
-        self_vars = set(self.get_variables(self.root))
-        other_vars = set(other_parser.get_variables(other_parser.root))
-
-        common_vars = self_vars.intersection(other_vars)
-
-        # Build filtered truth tables based on common variables
-        filtered_self_table = [
-            {var: row[var] for var in common_vars} | {'result': self.evaluate_truth_table(self.root, row)}
-            for row in self_table
-        ]
-
-        filtered_other_table = [
-            {var: row[var] for var in common_vars} | {
-                'result': other_parser.evaluate_truth_table(other_parser.root, row)}
-            for row in other_table
-        ]
-        # Compare the truth values of both tables row by row based on the common variable assignments
-        # Create a mapping of results based on common variables for self
-        self_result_map = {tuple(row[var] for var in common_vars): row['result'] for row in filtered_self_table}
-        other_result_map = {tuple(row[var] for var in common_vars): row['result'] for row in filtered_other_table}
-        for key in self_result_map:
-            if key in other_result_map:
-                if self_result_map[key] != other_result_map[key]:
-                    return False
-            else:
-                return False
-        return True
+        # Both diagrams live in the same manager, where equal functions are the same node
+        equivalent = bdd_manager.equivalent(self.to_bdd(), other_parser.to_bdd())
+        self.release_bdd()
+        other_parser.release_bdd()
+        return equivalent
+
+    def count_models(self):
+        """Number of satisfying assignments over the formula's variables."""
+        variables = self.get_variables(self.root) - {"⊤", "⊥"}
+        models = bdd_manager.count_models(self.to_bdd(), variables)
+        self.release_bdd()
+        return models
 
     def check_consequence(self, premises, conclusion):
         # Generate the truth table for the given premises and conclusion
@@ -505,32 +540,101 @@ class LogicalWFFParser:
 
         print()
 
-def generate_dnf_formula(truth_table):
-    n=len(truth_table[0])-1
-
-    def get_variable_name(index):
-        return chr(ord("A")+index)
+MAX_PRINTED_ROWS = 256
+
+
+def preprocess_clauses(clauses):
+    """Simplifies clauses with the CNF preprocessor, printing what it did."""
+    simplified, preprocessor = preprocess(clauses)
+    steps = ", ".join(f"{count} {name}" for name, count in preprocessor.stats.items() if count)
+    print(f"Preprocessing: {steps or 'nothing to simplify'}")
+    simplified = [set(clause) for clause in simplified]
+    print(f"Preprocessed CNF: {clauses_to_expression(simplified, 'cnf')}")
+    return simplified, preprocessor
+
+
+def break_clause_symmetries(clauses):
+    """Adds lex-leader symmetry-breaking clauses, printing the symmetries they break."""
+    extended, generators = break_symmetries(clauses)
+    print(f"Symmetries: {len(generators)} generators, {len(extended) - len(clauses)} symmetry-breaking clauses added")
+    for generator in generators:
+        print("  " + ", ".join(f"{literal} ↦ {image}" for literal, image in generator.items() if not literal.startswith("¬")))
+    return extended
+
+
+def check_satisfiability(clauses, use_dpll, dp, strategy, proof_path=""):
+    """
+    Runs DPLL or resolution on the clauses. With a proof path the clauses are written to
+    <path>.cnf and the proof to <path>.drat (DPLL) or <path>.trace (resolution), and an
+    unsatisfiable answer is checked against them by the independent proof checker.
+    """
+    if not proof_path:
+        return dpll(clauses) if use_dpll else resolution(clauses, dp, strategy)
+    index = write_dimacs(clauses, proof_path + ".cnf")
+    if use_dpll:
+        with DratWriter(proof_path + ".drat", index) as proof:
+            result = dpll(clauses, proof=proof)
+        checker, extension = check_drat, ".drat"
+    else:
+        with ResolutionTrace(proof_path + ".trace", index) as proof:
+            result = resolution(clauses, dp, strategy, proof=proof)
+        checker, extension = check_trace, ".trace"
+    if result is False:
+        valid, details = checker(proof_path + ".cnf", proof_path + extension)
+        if valid:
+            print(f"Proof written to {proof_path}{extension} and checked: the refutation uses {len(details)} of {len(clauses)} clauses")
+        else:
+            print(f"Proof written to {proof_path}{extension} does not check: {details}")
+    return result
+
+
+def generate_dnf_formula(truth_table, minimize=True):
+    """
+    Prints the truth table and a formula for it. With minimize=True the formula is a minimal DNF
+    (with the minimal CNF printed next to it) instead of one full minterm per true row.
+    Outputs equal to DONT_CARE may be covered or not, whichever gives the smaller formula.
+    The table is either a list of [input..., output] rows or a PackedTruthTable; packed tables
+    with more than MAX_PRINTED_ROWS rows are not printed.
+    """
+    packed = isinstance(truth_table, PackedTruthTable)
+    n = truth_table.n if packed else len(truth_table[0])-1
+    print_rows = not packed or len(truth_table) <= MAX_PRINTED_ROWS
 
     dnf_clauses = []
-    variables = [get_variable_name(i) for i in range(n)]
-    print(" | ".join(variables) + " | Output")
-    print("-" * (4 * n + 9))
-
-    for row in truth_table:
+    variables = [variable_name(i) for i in range(n)]
+    if print_rows:
+        print(" | ".join(variables) + " | Output")
+        print("-" * (4 * n + 9))
+    else:
+        print(f"Truth table with {len(truth_table)} rows over {n} variables (too large to print).")
+
+    rows = truth_table
+    if packed:
+        rows = truth_table.rows() if print_rows or not minimize else []
+    for row in rows:
         *input_values, output = row
         row_values = [f"{'T' if val == 1 else 'F'}" for val in input_values]
-        print(" | ".join(row_values) + f" |   {'T' if output else 'F'}")
+        if print_rows:
+            print(" | ".join(row_values) + f" |   {'X' if output == DONT_CARE else 'T' if output else 'F'}")
 
-        if output:
+        if output == 1 and not minimize:
             conjunction = []
             for j, val in enumerate(input_values):
-                var = get_variable_name(j)
+                var = variables[j]
                 if val == 1:
                     conjunction.append(var)
                 else:
                     conjunction.append(f"¬{var}")
 
             dnf_clauses.append("(" + " ∧ ".join(conjunction) + ")")
+
+    if minimize:
+        table = truth_table.to_care_table() if packed else care_table(truth_table)[1]
+        dnf_formula = minimal_dnf(table, n)
+        print("\nMinimal DNF:", dnf_formula)
+        print("Minimal CNF:", minimal_cnf(table, n))
+        return dnf_formula
+
     dnf_formula = " ∨ ".join(dnf_clauses) if dnf_clauses else "False"
 
     print("\nFormula:", dnf_formula)
@@ -625,9 +729,15 @@ def main():
                     else:
                         print("Invalid input. Please enter 'True' or 'False'.")
 
-                # Evaluate the truth value of the proposition
-                result = parser.evaluate_truth_table(root, values)
-                print(f"The truth value of the proposition '{proposition}' with the given values is: {result}")
+                missing_vars = parser.get_variables(root) - values.keys()
+                if missing_vars:
+                    # Partial assignment: show what is left of the proposition
+                    residual = parser.restrict(values)
+                    print(f"No truth value for {missing_vars - {'⊤', '⊥'}}, the proposition reduces to: {get_node_expression(residual)}")
+                else:
+                    # Evaluate the truth value of the proposition
+                    result = parser.evaluate_truth_table(root, values)
+                    print(f"The truth value of the proposition '{proposition}' with the given values is: {result}")
 
             except Exception as e:
                 print(e)
@@ -657,20 +767,37 @@ def main():
                 print("An error occurred during conversion or entailment checking.")
         elif choice == "6":
             try:
-                # Prompt the user for the number of variables
-                n = int(input("Enter the number of variables in the truth table: "))
-                print("Enter the truth table as rows of values (0 or 1), ending with the output value.")
-                print("Example for 2 variables:\n  0 0 0\n  0 1 1\n  1 0 1\n  1 1 0")
-
-                # Collect each row of the truth table
-                matrix = []
-                for i in range(2 ** n):
-                    row = input(f"Enter row {i + 1} (e.g., '0 0 1'): ").split()
-                    if len(row) != n + 1:
-                        raise ValueError(f"Each row must contain {n + 1} values (including the output).")
-                    # Convert inputs to integers and add to the matrix
-                    matrix.append([int(value) for value in row])
-                generate_dnf_formula(matrix)
+                table_format = input("Input format (rows/bits/hex/binary/csv) [rows]: ").strip().lower() or "rows"
+                if table_format == "bits":
+                    print("Enter the output column as 0/1 characters, '-' or 'x' for don't cares (row 0 has every input false).")
+                    generate_dnf_formula(PackedTruthTable.from_bitstring(input("Outputs: ")))
+                elif table_format == "hex":
+                    text = input("Enter the output column in hexadecimal, first row in the most significant bit: ")
+                    dont_care = input("Enter the don't-care rows in hexadecimal (leave empty for none): ").strip()
+                    generate_dnf_formula(PackedTruthTable.from_hex(text, dont_care=dont_care or None))
+                elif table_format == "binary":
+                    path = input("Enter the path of the packed binary file: ").strip()
+                    dont_care_path = input("Enter the path of the don't-care file (leave empty for none): ").strip()
+                    generate_dnf_formula(PackedTruthTable.from_binary_file(path, dont_care_path=dont_care_path or None))
+                elif table_format == "csv":
+                    generate_dnf_formula(PackedTruthTable.from_csv(input("Enter the path of the CSV file: ").strip()))
+                else:
+                    # Prompt the user for the number of variables
+                    n = int(input("Enter the number of variables in the truth table: "))
+                    print("Enter the truth table as rows of values (0 or 1), ending with the output value.")
+                    print("The output may also be '-' or 'x' when it does not matter (don't care).")
+                    print("Example for 2 variables:\n  0 0 0\n  0 1 1\n  1 0 1\n  1 1 -")
+
+                    # Collect each row of the truth table
+                    matrix = []
+                    for i in range(2 ** n):
+                        row = input(f"Enter row {i + 1} (e.g., '0 0 1'): ").split()
+                        if len(row) != n + 1:
+                            raise ValueError(f"Each row must contain {n + 1} values (including the output).")
+                        # Convert inputs to integers and add to the matrix
+                        output = DONT_CARE if row[-1].lower() in ["-", "x"] else int(row[-1])
+                        matrix.append([int(value) for value in row[:-1]] + [output])
+                    generate_dnf_formula(matrix)
             except ValueError as e:
                 print("Invalid input. Please make sure to follow the input format.")
             except Exception as e:
@@ -683,7 +810,7 @@ def main():
                 parser = LogicalWFFParser(converted_proposition)
                 root = parser.parse()
 
-                nnf=transform_to_nnf(root)
+                nnf=transform_to_nnf(root, trace=True)
                 nnf_2=deepcopy(nnf)
                 print()
                 print(f"NNF: {get_node_expression(nnf)}")
@@ -701,8 +828,17 @@ def main():
         elif choice == "8":
             option = input("Formula or clauses?:")
             use_dpll = input("Use DPLL? (True/False): ").strip().lower() == 'true'
+            dp, strategy = True, "all"
             if not use_dpll:
                 dp=input("Use DP? (True/False): ").strip().lower() == 'true'
+                strategy=input("Resolution strategy (all/support/ordered): ").strip().lower()
+                if strategy not in ["all", "support", "ordered"]:
+                    strategy = "all"
+            simplify = input("Preprocess the clauses first? (True/False): ").strip().lower() == 'true'
+            symmetric = input("Break clause symmetries first? (True/False): ").strip().lower() == 'true'
+            parallel = input("Search for a model in parallel? (no/portfolio/cubes): ").strip().lower()
+            proof_path = input("Write the unsatisfiability proof to (file name without extension, empty for none): ").strip()
+            preprocessor = None
             if option.lower() == "formula":
                 proposition = input("Enter a formula to check satisfiability: ")
                 converter = ShuntingYardConverter(proposition)
@@ -710,15 +846,28 @@ def main():
                     converted_proposition = converter.convert()
                     parser = LogicalWFFParser(converted_proposition)
                     root = parser.parse()
-                    nnf=transform_to_nnf(root)
-                    cnf=transform_to_normal_form(nnf, "cnf")
-                    print(f"CNF: {get_node_expression(cnf)}")
-                    clauses=cnf_tree_to_clauses(cnf)
-                    if use_dpll:
-                        dpll(clauses)
+                    nnf=transform_to_nnf(root, trace=True)
+                    # Cardinality constraints are encoded with counters instead of being expanded
+                    clauses=formula_clauses(nnf)
+                    print(f"CNF: {clauses_to_expression(clauses, 'cnf')}")
+                    if symmetric and set() not in clauses:
+                        clauses = break_clause_symmetries(clauses)
+                    if simplify and set() not in clauses:
+                        clauses, preprocessor = preprocess_clauses(clauses)
+                    if set() in clauses:
+                        print("\nAnswer: Unsatisfiable (the CNF contains the empty clause)")
                     else:
-                        resolution(clauses, dp)
-                    print(find_satisfiable_interpretation(clauses))
+                        check_satisfiability(clauses, use_dpll, dp, strategy, proof_path)
+                    if parallel in ["portfolio", "cubes"]:
+                        model = solve_parallel(clauses, parallel)
+                    else:
+                        model = find_satisfiable_interpretation(clauses)
+                    # A model of the preprocessed clauses is mapped back to the original variables
+                    if preprocessor and model not in [None, UNKNOWN]:
+                        model = preprocessor.extend_model(model)
+                    if isinstance(model, dict):
+                        model = {name: value for name, value in model.items() if not is_auxiliary(name)}
+                    print(model)
                 except Exception as e:
                     print(e)
                     print("The string is not a well-formed formula or an error occurred during conversion.")
@@ -731,11 +880,23 @@ def main():
                     elif {''} in clauses:
                         print("At least one empty clause resulting in the formula being unsatisfiable.")
                     else:
-                        if use_dpll:
-                            dpll(clauses)
+                        if symmetric:
+                            clauses = break_clause_symmetries(clauses)
+                        if simplify:
+                            clauses, preprocessor = preprocess_clauses(clauses)
+                        if set() in clauses:
+                            print("\nAnswer: Unsatisfiable (preprocessing derived the empty clause)")
+                        else:
+                            check_satisfiability(clauses, use_dpll, dp, strategy, proof_path)
+                        if parallel in ["portfolio", "cubes"]:
+                            model = solve_parallel(clauses, parallel)
                         else:
-                            resolution(clauses, dp)
-                        print(find_satisfiable_interpretation(clauses))
+                            model = find_satisfiable_interpretation(clauses)
+                        if preprocessor and model not in [None, UNKNOWN]:
+                            model = preprocessor.extend_model(model)
+                        if isinstance(model, dict):
+                            model = {name: value for name, value in model.items() if not is_auxiliary(name)}
+                        print(model)
                 except Exception as e:
                     print(e)
         elif choice == 9: